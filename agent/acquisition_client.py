@@ -1,5 +1,3 @@
-from app.acquisition.mediapipe_adapter import MediaPipeAdapter
-from app.acquisition.camera_manager import CameraManager
 import time
 import argparse
 import requests
@@ -9,6 +7,9 @@ import os
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from agent.gaze_mapping import load_calibration
+from agent.rate_controller import MIN_INFERENCE_SCALE, RateController
+
 try:
     from agent.agent_config import AGENT_API_KEY as EMBEDDED_API_KEY
 
@@ -50,11 +51,36 @@ def parse_args():
 
 
 def run_acquisition(
-    session_uid, api_url, fps, batch_size=None, stop_event=None, camera_ref_holder=None
+    session_uid,
+    api_url,
+    fps,
+    batch_size=None,
+    stop_event=None,
+    camera_ref_holder=None,
+    camera=None,
+    adapter=None,
+    gaze_mapper=None,
 ):
-    """Run acquisition with direct parameters (for use in threads or standalone)"""
-    camera = CameraManager()
-    adapter = MediaPipeAdapter()
+    """
+    Run acquisition with direct parameters (for use in threads or standalone).
+
+    A camera and adapter may be passed in to reuse already-open resources;
+    they are then left open on exit for their owner to release. Records get
+    screen-space gaze when the session was calibrated on this agent (or a
+    gaze_mapper is given).
+    """
+    if gaze_mapper is None:
+        gaze_mapper = load_calibration(session_uid)
+    owns_camera = camera is None
+    if owns_camera:
+        from app.acquisition.camera_manager import CameraManager
+
+        camera = CameraManager()
+    owns_adapter = adapter is None
+    if owns_adapter:
+        from app.acquisition.mediapipe_adapter import MediaPipeAdapter
+
+        adapter = MediaPipeAdapter()
 
     if camera_ref_holder is not None:
         camera_ref_holder[0] = camera
@@ -71,16 +97,28 @@ def run_acquisition(
         except Exception as e:
             logging.warning(f"Could not store camera reference in app.state: {e}")
 
-    camera.start_camera()
-    adapter.initialize()
-
-    interval = 1.0 / fps
+    if owns_camera:
+        camera.start_camera()
+    if owns_adapter:
+        adapter.initialize()
+
+    rate = RateController(
+        fps,
+        min_scale=(
+            MIN_INFERENCE_SCALE
+            if getattr(adapter, "supports_inference_scale", False) is True
+            else 1.0
+        ),
+    )
     batch_size = batch_size or int(fps)
 
     base = api_url.rstrip("/")
     batch_url = base.rsplit("/", 1)[0] + "/batch"
 
-    logging.info(f"Starting acquisition client: {fps} FPS, batch size {batch_size}")
+    logging.info(
+        f"Starting acquisition client: {fps} FPS, batch size {batch_size}, "
+        f"{'screen-space' if gaze_mapper is not None else 'raw'} gaze"
+    )
 
     buffer = []
     try:
@@ -89,8 +127,10 @@ def run_acquisition(
                 logging.info("Stop flag detected, stopping acquisition...")
                 break
 
+            rate.frame_started()
             try:
-                frame = camera.get_frame()
+                with rate.stage("capture"):
+                    frame = camera.get_frame()
             except RuntimeError as e:
                 if "Camera not started" in str(e) or "Failed to read frame" in str(e):
                     logging.info("Camera was released, stopping acquisition...")
@@ -103,7 +143,11 @@ def run_acquisition(
                 )
                 break
 
-            result = adapter.analyze_frame(frame)
+            with rate.stage("analyze"):
+                if rate.scale < 1.0:
+                    result = adapter.analyze_frame(frame, scale=rate.scale)
+                else:
+                    result = adapter.analyze_frame(frame)
 
             le = result.get("eye_centers", [])
             record = {
@@ -133,31 +177,25 @@ def run_acquisition(
                     break
 
                 logging.info(f"Sending batch of {len(buffer)} records to backend")
-                try:
-                    resp = requests.post(
-                        batch_url,
-                        json=buffer,
-                        headers={"X-API-Key": AGENT_API_KEY},
-                        timeout=5,
-                    )
-                    resp.raise_for_status()
-                    logging.debug("Batch response: {resp.json()}")
-                except requests.RequestException as e:
-                    logging.warning(f"Failed to send batch: {e}")
-                buffer.clear()
-
-            if stop_event:
-                if stop_event.is_set():
-                    logging.info("Stop flag already set, stopping acquisition...")
-                    break
-                event_set = stop_event.wait(interval)
-                if event_set:
-                    logging.info(
-                        "Stop flag detected during sleep, stopping acquisition..."
-                    )
-                    break
-            else:
-                time.sleep(interval)
+                with rate.stage("send"):
+                    if gaze_mapper is not None:
+                        gaze_mapper.map_records(buffer)
+                    try:
+                        resp = requests.post(
+                            batch_url,
+                            json={"records": buffer, "metadata": rate.take_metadata()},
+                            headers={"X-API-Key": AGENT_API_KEY},
+                            timeout=5,
+                        )
+                        resp.raise_for_status()
+                        logging.debug("Batch response: {resp.json()}")
+                    except requests.RequestException as e:
+                        logging.warning(f"Failed to send batch: {e}")
+                buffer = []
+
+            if rate.wait(stop_event):
+                logging.info("Stop flag detected during sleep, stopping acquisition...")
+                break
 
     except KeyboardInterrupt:
         logging.info("Interrupted by user, flushing remaining data...")
@@ -169,9 +207,11 @@ def run_acquisition(
     finally:
         if buffer:
             try:
+                if gaze_mapper is not None:
+                    gaze_mapper.map_records(buffer)
                 resp = requests.post(
                     batch_url,
-                    json=buffer,
+                    json={"records": buffer, "metadata": rate.take_metadata()},
                     headers={"X-API-Key": AGENT_API_KEY},
                     timeout=5,
                 )
@@ -180,7 +220,8 @@ def run_acquisition(
             except Exception as e:
                 logging.warning(f"Failed to send final batch: {e}")
 
-        camera.release_camera()
+        if owns_camera:
+            camera.release_camera()
         try:
             import sys
 
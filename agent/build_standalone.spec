@@ -65,9 +65,14 @@ a = Analysis(
         'app.acquisition.camera_manager',
         'app.acquisition.mediapipe_adapter',
         'app.acquisition.eye_tracker_adapter',
+        'app.acquisition.calibration',
+        'app.acquisition.clock_sync',
         'agent',  # Import the agent package
         'agent.local_agent',
         'agent.acquisition_client',
+        'agent.rate_controller',
+        'agent.point_sampler',
+        'agent.gaze_mapping',
         'agent.launcher',
         'agent.setup_autostart',
     ],
@@ -0,0 +1,100 @@
+"""
+Screen-space gaze from the calibration transform.
+
+calibrate_finish fits a map from the mean of both eye centres (camera pixels)
+to the calibration targets (app.acquisition.calibration) and saves it to
+calibration.json together with the session it was fitted for. During
+acquisition the map is applied to a whole batch at once and each record gets
+a "gaze" point normalised to the screen (0-1 on both axes), next to the raw
+eye centres.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.acquisition.calibration import CalibrationModel, model_from_transform
+
+CALIBRATION_PATH = os.path.join(os.path.dirname(__file__), "calibration.json")
+
+
+class GazeMapper:
+    """Calibration model mapping raw eye centres to normalised screen coordinates."""
+
+    def __init__(self, model: CalibrationModel, scale: float = 1.0):
+        self.model = model
+        self.scale = float(scale)
+
+    @classmethod
+    def from_transform(cls, transform: Dict[str, Any]) -> "GazeMapper":
+        return cls(model_from_transform(transform), transform.get("target_scale", 1.0))
+
+    def apply(self, raw: np.ndarray) -> np.ndarray:
+        """
+        Map an (n, 2) array of raw eye centres to screen space.
+
+        NaN rows (no eyes tracked) stay NaN.
+        """
+        return self.model.predict(raw) / self.scale
+
+    def map_records(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add a normalised "gaze" point to each acquisition record in place."""
+        if not records:
+            return records
+        eyes = np.array(
+            [
+                [
+                    _coord(record.get("left_eye"), "x"),
+                    _coord(record.get("left_eye"), "y"),
+                    _coord(record.get("right_eye"), "x"),
+                    _coord(record.get("right_eye"), "y"),
+                ]
+                for record in records
+            ],
+            dtype=float,
+        )
+        # Calibration used the midpoint of both eyes; one eye alone would be
+        # biased, so such samples get no gaze point.
+        raw = (eyes[:, 0:2] + eyes[:, 2:4]) / 2.0
+        gaze = self.apply(raw)
+        tracked = np.isfinite(gaze).all(axis=1)
+        for record, point, ok in zip(records, gaze.tolist(), tracked.tolist()):
+            record["gaze"] = (
+                {"x": point[0], "y": point[1]} if ok else {"x": None, "y": None}
+            )
+        return records
+
+
+def _coord(eye: Optional[Dict[str, Any]], axis: str) -> float:
+    value = (eye or {}).get(axis)
+    return np.nan if value is None else value
+
+
+def save_calibration(
+    transform: Dict[str, Any], session_uid: Optional[str], path: Optional[str] = None
+):
+    with open(path or CALIBRATION_PATH, "w") as f:
+        json.dump({**transform, "session_uid": session_uid}, f)
+
+
+def load_calibration(
+    session_uid: str, path: Optional[str] = None
+) -> Optional[GazeMapper]:
+    """
+    The saved calibration, if it was fitted for this session.
+
+    A calibration from another session (or another person) is never applied.
+    """
+    try:
+        with open(path or CALIBRATION_PATH) as f:
+            transform = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not session_uid or transform.get("session_uid") != session_uid:
+        return None
+    try:
+        return GazeMapper.from_transform(transform)
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -1,19 +1,20 @@
-import json
 import os
+import queue
 import subprocess
 import sys
 import threading
 import time
 import uuid
 from contextlib import asynccontextmanager
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-import numpy as np
 import requests
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
+from app.acquisition.clock_sync import ClockFilter
+
 task_proc = None
 task_thread = None
 heartbeat_thread = None
@@ -21,6 +22,9 @@ agent_id = str(uuid.uuid4())
 current_session_uid = None
 acquisition_stop_flag = threading.Event()
 acquisition_camera = None
+agent_registered = threading.Event()
+# Offset of this machine's clock from the backend's, from heartbeat timings.
+clock_filter = ClockFilter()
 
 try:
     from agent.agent_config import AGENT_API_KEY as EMBEDDED_API_KEY
@@ -32,23 +36,206 @@ except ImportError:
     )
 
 
+HEARTBEAT_WAIT = float(os.getenv("AGENT_HEARTBEAT_WAIT", "20"))
+
+# Seconds a finished command result waits for others before the flusher
+# sends them together (a heartbeat starting meanwhile takes them instead).
+RESULT_FLUSH_DELAY = float(os.getenv("AGENT_RESULT_FLUSH_DELAY", "0.1"))
+
+# Seconds an unused camera stays open so acquisition can reuse the handle
+# opened for calibration. 0 releases it as soon as nobody holds it.
+CAMERA_IDLE_TIMEOUT = float(os.getenv("AGENT_CAMERA_IDLE_TIMEOUT", "120"))
+
+# Calibration upload at calibrate_finish: attempts and first retry delay
+# (doubled after each failure).
+CALIBRATION_UPLOAD_ATTEMPTS = int(os.getenv("AGENT_CALIBRATION_UPLOAD_ATTEMPTS", "5"))
+CALIBRATION_UPLOAD_BACKOFF = float(os.getenv("AGENT_CALIBRATION_UPLOAD_BACKOFF", "1"))
+
+
+class ResourceManager:
+    """
+    Owns the agent's single MediaPipe adapter and webcam handle.
+
+    The FaceMesh graph is loaded once, in the background at startup. The
+    camera is opened on first use and shared between calibration and
+    acquisition; when nobody holds it any more it is released after
+    idle_timeout seconds.
+    """
+
+    def __init__(self, idle_timeout: float = CAMERA_IDLE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.RLock()
+        self._adapter_lock = threading.Lock()
+        self._adapter = None
+        self._camera = None
+        self._leases = 0
+        self._idle_timer = None
+        self._warmup_thread = None
+        self.model_state = "idle"
+        self.model_error = None
+
+    def warm_up(self):
+        """Load the FaceMesh model on a background thread."""
+        with self._lock:
+            if self._adapter is not None or self._warmup_thread is not None:
+                return
+            self.model_state = "loading"
+            self._warmup_thread = threading.Thread(
+                target=self._warm_up, name="agent-model-warmup", daemon=True
+            )
+            self._warmup_thread.start()
+
+    def _warm_up(self):
+        start = time.perf_counter()
+        try:
+            self.get_adapter()
+        except Exception as e:
+            self.model_state = "error"
+            self.model_error = str(e)
+            print(f"⚠️  Could not pre-load FaceMesh model: {e}")
+            return
+        print(f"🔥 FaceMesh model ready in {time.perf_counter() - start:.2f}s")
+
+    @property
+    def adapter_ready(self) -> bool:
+        return self._adapter is not None
+
+    def get_adapter(self, fresh: bool = False):
+        """
+        Return the shared adapter, building it if needed (waits for a warm-up
+        in progress). fresh=True clears per-session blink state.
+        """
+        with self._adapter_lock:
+            if self._adapter is None:
+                from app.acquisition.mediapipe_adapter import MediaPipeAdapter
+
+                adapter = MediaPipeAdapter()
+                adapter.initialize()
+                self._adapter = adapter
+                self.model_state = "ready"
+                self.model_error = None
+            elif fresh:
+                self._adapter.reset()
+            return self._adapter
+
+    def acquire_camera(self):
+        """Take a lease on the shared camera, opening it if necessary."""
+        with self._lock:
+            self._cancel_idle_timer()
+            if self._camera is None or self._camera.capture is None:
+                from app.acquisition.camera_manager import CameraManager
+
+                camera = CameraManager()
+                camera.start_camera()
+                self._camera = camera
+                self._leases = 0
+            self._leases += 1
+            return self._camera
+
+    def release_camera(self, camera=None, close: bool = False):
+        """
+        Give back a lease. The camera stays open for idle_timeout seconds
+        unless close=True. Cameras not owned by the manager are released.
+        """
+        with self._lock:
+            if camera is not None and camera is not self._camera:
+                camera.release_camera()
+                return
+            if self._camera is None:
+                return
+            self._leases = max(0, self._leases - 1)
+            if close:
+                self._close_camera()
+            elif self._leases == 0:
+                if self.idle_timeout <= 0:
+                    self._close_camera()
+                else:
+                    self._idle_timer = threading.Timer(
+                        self.idle_timeout, self._release_if_idle
+                    )
+                    self._idle_timer.daemon = True
+                    self._idle_timer.start()
+
+    def _release_if_idle(self):
+        with self._lock:
+            if self._leases == 0 and self._camera is not None:
+                self._close_camera()
+                print("📷 Released idle camera")
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _close_camera(self):
+        self._cancel_idle_timer()
+        if self._camera is not None:
+            self._camera.release_camera()
+        self._camera = None
+        self._leases = 0
+
+    def close_camera(self):
+        with self._lock:
+            self._close_camera()
+
+    def reset(self):
+        """Release the camera and drop the adapter."""
+        self.close_camera()
+        with self._adapter_lock:
+            self._adapter = None
+        self._warmup_thread = None
+        self.model_state = "idle"
+        self.model_error = None
+
+
+resources = ResourceManager()
+
+
 def send_heartbeat():
-    """Send periodic heartbeat to backend and execute any pending commands"""
+    """
+    Long-poll the backend for commands and execute them as they arrive.
+
+    The backend holds each heartbeat open for up to HEARTBEAT_WAIT seconds and
+    answers as soon as a command is queued. Backends that do not support
+    long-polling answer immediately, in which case we fall back to polling
+    once per second.
+
+    Every heartbeat answer also carries the backend's receive and send times;
+    the resulting clock offset estimate goes out with the next heartbeat so
+    the backend can put acquisition timestamps on its own clock.
+    """
     backend_url = os.getenv("BACKEND_URL", "http://20.74.82.26:8000")
+    executor = CommandExecutor(backend_url)
     while True:
+        long_poll = False
+        results = []
         try:
-            heartbeat_data = {"agent_id": agent_id}
+            heartbeat_data = {"agent_id": agent_id, "wait": HEARTBEAT_WAIT}
             if current_session_uid:
                 heartbeat_data["session_uid"] = current_session_uid
-
+                clock = clock_filter.estimate()
+                if clock:
+                    heartbeat_data["clock"] = clock
+            if executor.batch_results:
+                results = executor.take_results()
+                if results:
+                    heartbeat_data["command_results"] = results
+
+            sent = time.time()
             response = requests.post(
                 f"{backend_url}/agent/heartbeat",
                 json=heartbeat_data,
                 headers={"X-API-Key": AGENT_API_KEY},
-                timeout=5,
+                timeout=HEARTBEAT_WAIT + 5,
             )
+            answered = time.time()
             if response.status_code == 200:
+                # The backend records presence on every heartbeat.
+                agent_registered.set()
                 data = response.json()
+                clock_filter.add_response(sent, answered, data)
+                long_poll = bool(data.get("long_poll"))
+                executor.batch_results = long_poll
 
                 if data.get("status") == "stopped":
                     print(
@@ -61,41 +248,63 @@ def send_heartbeat():
                 if commands:
                     print(f"📥 Received {len(commands)} command(s) from backend")
                 for command in commands:
-                    print(f"⚙️  Executing command: {command.get('type')}")
-                    command_thread = threading.Thread(
-                        target=execute_command,
-                        args=(command, backend_url),
-                        daemon=True,
-                    )
-                    command_thread.start()
+                    executor.submit(command)
         except requests.RequestException as e:
             print(f"⚠️  Heartbeat error: {e}")
-            pass
-        time.sleep(1)
+            executor.return_results(results)
+        if not long_poll:
+            time.sleep(1)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Startup and shutdown events"""
-    backend_url = os.getenv("BACKEND_URL", "http://20.74.82.26:8000")
+def register_with_backend(backend_url: str) -> bool:
+    """Announce this agent to the backend; heartbeats keep it registered."""
     try:
-        requests.post(
+        response = requests.post(
             f"{backend_url}/agent/register",
             json={"agent_id": agent_id},
             headers={"X-API-Key": AGENT_API_KEY},
             timeout=5,
         )
-        print(f"✅ Registered with backend: {backend_url}")
     except requests.RequestException as e:
         print(f"⚠️  Could not register with backend: {e}")
         print("   Agent will continue running, but frontend may not detect it.")
+        return False
+    if response.status_code != 200:
+        print(f"⚠️  Backend rejected registration: HTTP {response.status_code}")
+        return False
+    agent_registered.set()
+    print(f"✅ Registered with backend: {backend_url}")
+    return True
+
+
+def start_agent_services(backend_url: str):
+    """
+    Background startup: register, then load the model, then long-poll.
+
+    Runs off the event loop so uvicorn binds port 9000 straight away; the
+    model warm-up starts only after registration so it does not compete
+    with it for the GIL.
+    """
+    register_with_backend(backend_url)
+    resources.warm_up()
+    send_heartbeat()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown events"""
+    backend_url = os.getenv("BACKEND_URL", "http://20.74.82.26:8000")
 
     global heartbeat_thread
-    heartbeat_thread = threading.Thread(target=send_heartbeat, daemon=True)
+    heartbeat_thread = threading.Thread(
+        target=start_agent_services, args=(backend_url,), daemon=True
+    )
     heartbeat_thread.start()
 
     yield
 
+    resources.close_camera()
+
     try:
         requests.delete(
             f"{backend_url}/agent/unregister",
@@ -107,8 +316,228 @@ async def lifespan(app: FastAPI):
         pass
 
 
-def execute_command(command: dict, backend_url: str):
-    """Execute a command from the backend"""
+def calibration_engine():
+    """The running calibration engine, rebuilt from cal_data if needed"""
+    from app.acquisition.calibration import CalibrationEngine
+
+    engine = getattr(app.state, "cal_engine", None)
+    if engine is None or len(engine) != len(app.state.cal_data):
+        engine = CalibrationEngine.from_points(app.state.cal_data)
+        app.state.cal_engine = engine
+    return engine
+
+
+def sample_calibration_point(cam, adapter, duration, samples) -> Dict[str, Any]:
+    """Robust eye-centre estimate for one target, with its fit weight"""
+    from agent.point_sampler import sample_point
+    from app.acquisition.calibration import point_weight
+
+    sample = sample_point(cam, adapter, duration, samples)
+    sample["weight"] = point_weight(sample["samples"], sample["dispersion"], samples)
+    return sample
+
+
+def record_calibration_point(
+    point: Dict[str, Any], weight: float = 1.0
+) -> Dict[str, Any]:
+    """Add a measured point to the calibration and return the fit quality"""
+    engine = calibration_engine()
+    data = (
+        point["screen_x"],
+        point["screen_y"],
+        point["measured_x"],
+        point["measured_y"],
+        weight,
+    )
+    app.state.cal_data.append(data)
+    # Uploaded together with the transform at calibrate_finish.
+    app.state.cal_points.append(point)
+    return engine.add_point(*data)
+
+
+def start_calibration_run():
+    """Forget the previous calibration run and open the camera for a new one"""
+    app.state.cal_data = []
+    app.state.cal_points = []
+    app.state.cal_run_id = str(uuid.uuid4())
+    app.state.cal_engine = None
+    app.state.cal_reuse = None
+    app.state.cal_session_uid = None
+    if app.state.cal_camera is not None:
+        resources.release_camera(app.state.cal_camera)
+    app.state.cal_camera = resources.acquire_camera()
+    app.state.cal_adapter = resources.get_adapter(fresh=True)
+
+
+def validate_calibration_point(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Measure one target and check a previous calibration against it"""
+    from app.acquisition.calibration import (
+        CALIBRATION_VALIDATION_MAX_ERROR,
+        validation_error,
+    )
+
+    cam = app.state.cal_camera
+    adapter = app.state.cal_adapter
+    if cam is None or adapter is None:
+        raise Exception("Calibration not started")
+
+    samples = params.get("samples", 30)
+    sample = sample_calibration_point(
+        cam, adapter, params.get("duration", 1.0), samples
+    )
+    if not sample["samples"]:
+        raise Exception(f"No eye data captured from {sample['frames']} frames")
+
+    transform = params["transform"]
+    error = validation_error(
+        transform, params["x"], params["y"], sample["x"], sample["y"]
+    )
+    reuse = app.state.cal_reuse
+    if reuse is None or reuse["calibration_id"] != params.get("calibration_id"):
+        reuse = app.state.cal_reuse = {
+            "calibration_id": params.get("calibration_id"),
+            "transform": transform,
+            "errors": [],
+        }
+    reuse["errors"].append(error)
+    app.state.cal_session_uid = params.get("session_uid")
+
+    valid = error <= CALIBRATION_VALIDATION_MAX_ERROR
+    print(
+        f"{'✅' if valid else '⚠️ '} Calibration check at ({params['x']}, {params['y']}): "
+        f"error {error:.2f}% of the screen"
+    )
+    return {
+        "screen_x": params["x"],
+        "screen_y": params["y"],
+        "measured_x": sample["x"],
+        "measured_y": sample["y"],
+        "error": error,
+        "valid": valid,
+    }
+
+
+def finish_calibration(backend_url: str) -> Dict[str, Any]:
+    """
+    Settle the calibration for the session and save it for acquisition.
+
+    A previous calibration whose validation points all passed is adopted
+    when no grid was recorded; otherwise the grid points are fitted. The
+    backend is told which one the session uses.
+
+    Raises:
+        ValueError: If there is neither a validated calibration nor a grid
+    """
+    from app.acquisition.calibration import CALIBRATION_VALIDATION_MAX_ERROR
+
+    data = app.state.cal_data
+    reuse = app.state.cal_reuse
+    session_uid = app.state.cal_session_uid
+    cam = app.state.cal_camera
+    if cam:
+        # Keep the camera warm for the acquisition that follows.
+        resources.release_camera(cam)
+        app.state.cal_camera = None
+        app.state.cal_adapter = None
+
+    if (
+        len(data) < 3
+        and reuse
+        and reuse["errors"]
+        and max(reuse["errors"]) <= CALIBRATION_VALIDATION_MAX_ERROR
+    ):
+        transform = reuse["transform"]
+        save_calibration(transform, session_uid)
+        upload_calibration(
+            backend_url,
+            session_uid,
+            "reuse",
+            {
+                "calibration_id": reuse["calibration_id"],
+                "error": max(reuse["errors"]),
+                "run_id": app.state.cal_run_id,
+            },
+        )
+        print(f"♻️  Reusing calibration {reuse['calibration_id']}")
+        return {**transform, "reused_calibration_id": reuse["calibration_id"]}
+
+    if len(data) < 3:
+        raise ValueError(
+            f"At least 3 calibration points required. Current points: {len(data)}"
+        )
+    transform = calibration_engine().transform()
+    save_calibration(transform, session_uid)
+    upload_calibration(
+        backend_url,
+        session_uid,
+        "batch",
+        {
+            "run_id": app.state.cal_run_id,
+            "points": list(app.state.cal_points),
+            "transform": transform,
+        },
+    )
+    return transform
+
+
+def upload_calibration(backend_url: str, session_uid, action: str, payload):
+    """
+    Send the session's calibration to the backend in the background.
+
+    The endpoints are idempotent on the run_id in the payload, so failed
+    attempts are retried with backoff without risking duplicates.
+    """
+    if not session_uid:
+        return
+    thread = threading.Thread(
+        target=_upload_calibration,
+        args=(f"{backend_url}/session/{session_uid}/calibration/{action}", payload),
+        name="calibration-upload",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+
+def _upload_calibration(url: str, payload: Dict[str, Any]) -> bool:
+    delay = CALIBRATION_UPLOAD_BACKOFF
+    for attempt in range(1, CALIBRATION_UPLOAD_ATTEMPTS + 1):
+        try:
+            response = requests.post(
+                url,
+                json=payload,
+                headers={"X-API-Key": AGENT_API_KEY},
+                timeout=5,
+            )
+            if response.status_code < 300:
+                print(f"📤 Calibration uploaded ({attempt} attempt(s))")
+                return True
+            if response.status_code < 500 and response.status_code != 429:
+                print(
+                    f"❌ Calibration upload rejected: {response.status_code} {response.text}"
+                )
+                return False
+            error = f"status {response.status_code}"
+        except requests.RequestException as e:
+            error = str(e)
+        print(
+            f"⚠️  Calibration upload attempt {attempt}/{CALIBRATION_UPLOAD_ATTEMPTS} failed: {error}"
+        )
+        if attempt < CALIBRATION_UPLOAD_ATTEMPTS:
+            time.sleep(delay)
+            delay *= 2
+    return False
+
+
+def save_calibration(transform: Dict[str, Any], session_uid):
+    """Persist the fitted transform for the acquisition of session_uid"""
+    from agent.gaze_mapping import save_calibration as save
+
+    save(transform, session_uid)
+
+
+def run_command(command: dict, backend_url: str) -> Dict[str, Any]:
+    """Execute a command from the backend and return its result payload"""
     global task_proc, task_thread, acquisition_stop_flag, current_session_uid, acquisition_camera
 
     command_id = command.get("command_id")
@@ -117,17 +546,7 @@ def execute_command(command: dict, backend_url: str):
 
     try:
         if command_type == "calibrate_start":
-            from app.acquisition.camera_manager import CameraManager
-            from app.acquisition.mediapipe_adapter import MediaPipeAdapter
-
-            app.state.cal_data = []
-            cam = CameraManager()
-            adapter = MediaPipeAdapter()
-            cam.start_camera()
-            adapter.initialize()
-            app.state.cal_camera = cam
-            app.state.cal_adapter = adapter
-
+            start_calibration_run()
             result = {"status": "calibration_started"}
 
         elif command_type == "calibrate_point":
@@ -136,107 +555,39 @@ def execute_command(command: dict, backend_url: str):
             if cam is None or adapter is None:
                 raise Exception("Calibration not started")
 
-            pts = []
             samples = params.get("samples", 30)
             duration = params.get("duration", 1.0)
-            max_attempts = samples * 2
-            attempt = 0
-            successful_samples = 0
-
             print(
                 f"📸 Starting calibration point capture: {samples} samples over {duration}s"
             )
 
-            start_time = time.time()
-            timeout = duration + 5
+            sample = sample_calibration_point(cam, adapter, duration, samples)
+            if not sample["samples"]:
+                raise Exception(f"No eye data captured from {sample['frames']} frames")
 
-            while successful_samples < samples and attempt < max_attempts:
-                if time.time() - start_time > timeout:
-                    print(f"⏱️  Calibration point timeout after {timeout}s")
-                    break
-
-                try:
-                    frame = cam.get_frame()
-                    if frame is None:
-                        print(f"⚠️  Failed to get frame (attempt {attempt + 1})")
-                        attempt += 1
-                        time.sleep(0.05)
-                        continue
-
-                    res = adapter.analyze_frame(frame)
-                    centers = res.get("eye_centers", [])
-                    if centers and len(centers) >= 2:
-                        xs = [c[0] for c in centers]
-                        ys = [c[1] for c in centers]
-                        pts.append((sum(xs) / len(xs), sum(ys) / len(ys)))
-                        successful_samples += 1
-                        if successful_samples % 10 == 0:
-                            print(
-                                f"📊 Collected {successful_samples}/{samples} samples"
-                            )
-                    else:
-                        pass
-
-                    time.sleep(duration / samples)
-                    attempt += 1
-
-                except Exception as e:
-                    print(f"⚠️  Error during calibration sample {attempt + 1}: {e}")
-                    attempt += 1
-                    time.sleep(0.05)
-
-            if not pts:
-                raise Exception(f"No eye data captured after {attempt} attempts")
-
-            mean_x = sum([p[0] for p in pts]) / len(pts)
-            mean_y = sum([p[1] for p in pts]) / len(pts)
-            app.state.cal_data.append((params["x"], params["y"], mean_x, mean_y))
-
-            result = {
+            mean_x, mean_y = sample["x"], sample["y"]
+            point = {
                 "screen_x": params["x"],
                 "screen_y": params["y"],
                 "measured_x": mean_x,
                 "measured_y": mean_y,
+                "dispersion": sample["dispersion"],
+                "samples": sample["samples"],
             }
+            quality = record_calibration_point(point, sample["weight"])
+            app.state.cal_session_uid = params.get("session_uid")
+            result = {**point, "rejected": sample["rejected"], "quality": quality}
 
             print(
-                f"✅ Calibration point completed: ({params['x']}, {params['y']}) -> ({mean_x:.2f}, {mean_y:.2f})"
+                f"✅ Calibration point completed: ({params['x']}, {params['y']}) -> ({mean_x:.2f}, {mean_y:.2f}), "
+                f"{sample['samples']} samples, ±{sample['dispersion']:.2f}px"
             )
 
-            try:
-                requests.post(
-                    f"{backend_url}/session/{params.get('session_uid')}/calibration/point",
-                    json=result,
-                    headers={"X-API-Key": AGENT_API_KEY},
-                    timeout=1,
-                )
-            except Exception:
-                pass
+        elif command_type == "calibrate_validate":
+            result = validate_calibration_point(params)
 
         elif command_type == "calibrate_finish":
-            data = app.state.cal_data
-            cam = app.state.cal_camera
-            if cam:
-                cam.release_camera()
-            if not data or len(data) < 3:
-                raise Exception("At least 3 calibration points required")
-
-            raw = np.array([[d[2], d[3]] for d in data])
-            scr = np.array([[d[0], d[1]] for d in data])
-            ones = np.ones((raw.shape[0], 1))
-            X = np.hstack([raw, ones])
-            params_x, _, _, _ = np.linalg.lstsq(X, scr[:, 0], rcond=None)
-            params_y, _, _, _ = np.linalg.lstsq(X, scr[:, 1], rcond=None)
-            A = [[params_x[0], params_x[1]], [params_y[0], params_y[1]]]
-            b = [params_x[2], params_y[2]]
-            transform = {"A": A, "b": b}
-
-            with open(
-                os.path.join(os.path.dirname(__file__), "calibration.json"), "w"
-            ) as f:
-                json.dump(transform, f)
-
-            result = transform
+            result = finish_calibration(backend_url)
 
         elif command_type == "start_acquisition":
             if task_thread and task_thread.is_alive():
@@ -276,6 +627,8 @@ def execute_command(command: dict, backend_url: str):
                 env = os.environ.copy()
                 current_dir = os.getcwd()
                 env["PYTHONPATH"] = current_dir + ":" + env.get("PYTHONPATH", "")
+                # The child process opens the webcam itself.
+                resources.close_camera()
                 task_proc = subprocess.Popen(cmd, env=env, cwd=current_dir)
                 result = {
                     "status": "acquisition_started",
@@ -309,7 +662,9 @@ def execute_command(command: dict, backend_url: str):
 
                         traceback.print_exc()
                 else:
-                    print("⚠️  No acquisition_camera in app.state, using stop flag only")
+                    print(
+                        "⚠️  No acquisition_camera in app.state, using stop flag only"
+                    )
 
                 result = {"status": "acquisition_stopped", "mode": "thread"}
 
@@ -334,41 +689,154 @@ def execute_command(command: dict, backend_url: str):
             raise Exception(f"Unknown command type: {command_type}")
 
         print(f"✅ Command {command_id} executed successfully")
+        return {"command_id": command_id, "result": result, "success": True}
+    except Exception as e:
+        print(f"❌ Command {command_id} failed: {e}")
+        return {
+            "command_id": command_id,
+            "result": None,
+            "success": False,
+            "error": str(e),
+        }
+
+
+def report_command_results(
+    backend_url: str, results: list, batched: bool = False
+) -> list:
+    """
+    Send command results to the backend. With batched=True all results go in
+    one request; otherwise one request per result (backends without
+    long-poll support only understand a single command_result).
+
+    The requests are marked results_only so the backend leaves queued
+    commands for the heartbeat. Backends that predate the flag hand them out
+    anyway; those commands are returned so the caller can run them.
+    """
+    if batched and len(results) > 1:
+        payloads = [{"agent_id": agent_id, "command_results": results}]
+    else:
+        payloads = [
+            {"agent_id": agent_id, "command_result": result} for result in results
+        ]
+    commands = []
+    for payload in payloads:
+        payload["results_only"] = True
         try:
-            requests.post(
+            response = requests.post(
                 f"{backend_url}/agent/heartbeat",
-                json={
-                    "agent_id": agent_id,
-                    "command_result": {
-                        "command_id": command_id,
-                        "result": result,
-                        "success": True,
-                    },
-                },
+                json=payload,
                 headers={"X-API-Key": AGENT_API_KEY},
                 timeout=2,
             )
-            print(f"📤 Reported success for command {command_id}")
+            if response.status_code == 200:
+                commands.extend(response.json().get("commands") or [])
         except Exception as e:
             print(f"❌ Failed to report command result: {e}")
-    except Exception as e:
-        try:
-            requests.post(
-                f"{backend_url}/agent/heartbeat",
-                json={
-                    "agent_id": agent_id,
-                    "command_result": {
-                        "command_id": command_id,
-                        "result": None,
-                        "success": False,
-                        "error": str(e),
-                    },
-                },
-                headers={"X-API-Key": AGENT_API_KEY},
-                timeout=2,
+    print(f"📤 Reported {len(results)} command result(s)")
+    return commands
+
+
+def execute_command(command: dict, backend_url: str):
+    """Execute a command from the backend and report its result immediately"""
+    report_command_results(backend_url, [run_command(command, backend_url)])
+
+
+# Commands on the same lane run one at a time in arrival order; different
+# lanes run in parallel. Stop gets its own lane so it is never stuck behind
+# a calibration point capture.
+COMMAND_LANES = {"stop_acquisition": "control"}
+DEFAULT_COMMAND_LANE = "ordered"
+
+
+class CommandExecutor:
+    """
+    Per-agent command pipeline: one worker thread per lane executes commands
+    in order, and results are collected in an outbox. The outbox is drained
+    either into the next heartbeat or by a flusher thread, which waits until
+    the oldest result is flush_delay seconds old and sends all results
+    accumulated by then in a single request.
+    """
+
+    def __init__(
+        self,
+        backend_url: str,
+        lanes: Dict[str, str] = COMMAND_LANES,
+        flush_delay: float = RESULT_FLUSH_DELAY,
+    ):
+        self.backend_url = backend_url
+        self.lanes = lanes
+        self.flush_delay = flush_delay
+        self.batch_results = False
+        self._queues: Dict[str, queue.Queue] = {}
+        self._outbox: list = []
+        self._outbox_since = 0.0
+        self._outbox_ready = threading.Condition()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def submit(self, command: dict):
+        lane = self.lanes.get(command.get("type"), DEFAULT_COMMAND_LANE)
+        with self._lock:
+            lane_queue = self._queues.get(lane)
+            if lane_queue is None:
+                lane_queue = queue.Queue()
+                self._queues[lane] = lane_queue
+                threading.Thread(
+                    target=self._run_lane,
+                    args=(lane_queue,),
+                    name=f"agent-lane-{lane}",
+                    daemon=True,
+                ).start()
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_loop, name="agent-result-flusher", daemon=True
+                )
+                self._flusher.start()
+        lane_queue.put(command)
+
+    def _run_lane(self, lane_queue: queue.Queue):
+        while True:
+            command = lane_queue.get()
+            print(f"⚙️  Executing command: {command.get('type')}")
+            result = run_command(command, self.backend_url)
+            with self._outbox_ready:
+                if not self._outbox:
+                    self._outbox_since = time.monotonic()
+                self._outbox.append(result)
+                self._outbox_ready.notify()
+
+    def take_results(self) -> list:
+        """Drain finished results, e.g. to piggyback them on a heartbeat."""
+        with self._outbox_ready:
+            results, self._outbox = self._outbox, []
+        return results
+
+    def return_results(self, results: list):
+        """Put back results whose delivery failed so the flusher retries them."""
+        if not results:
+            return
+        with self._outbox_ready:
+            if not self._outbox:
+                self._outbox_since = time.monotonic()
+            self._outbox[:0] = results
+            self._outbox_ready.notify()
+
+    def _flush_loop(self):
+        while True:
+            with self._outbox_ready:
+                while not self._outbox:
+                    self._outbox_ready.wait()
+                deadline = self._outbox_since + self.flush_delay
+                while self._outbox and time.monotonic() < deadline:
+                    self._outbox_ready.wait(deadline - time.monotonic())
+                results, self._outbox = self._outbox, []
+            if not results:
+                continue
+            commands = report_command_results(
+                self.backend_url, results, batched=self.batch_results
             )
-        except Exception:
-            pass
+            for command in commands:
+                self.submit(command)
 
 
 app = FastAPI(title="Local Acquisition Agent", lifespan=lifespan)
@@ -382,8 +850,13 @@ app.add_middleware(
 )
 
 app.state.cal_data = []
+app.state.cal_points = []
+app.state.cal_run_id = None
+app.state.cal_engine = None
+app.state.cal_reuse = None
 app.state.cal_camera = None
 app.state.cal_adapter = None
+app.state.cal_session_uid = None
 app.state.acquisition_camera = None
 
 
@@ -416,6 +889,11 @@ class CalPointRequest(BaseModel):
     )
 
 
+class CalValidateRequest(CalPointRequest):
+    calibration_id: Optional[int] = None
+    transform: Dict[str, Any]
+
+
 def run_acquisition_client(session_uid, api_url, fps):
     """Run acquisition client in a thread"""
     global acquisition_stop_flag, acquisition_camera
@@ -426,14 +904,20 @@ def run_acquisition_client(session_uid, api_url, fps):
         acquisition_stop_flag.clear()
         acquisition_camera = None
 
-        camera_ref_holder = [None]
-        run_acquisition(
-            session_uid,
-            api_url,
-            fps,
-            stop_event=acquisition_stop_flag,
-            camera_ref_holder=camera_ref_holder,
-        )
+        camera = resources.acquire_camera()
+        try:
+            camera_ref_holder = [None]
+            run_acquisition(
+                session_uid,
+                api_url,
+                fps,
+                stop_event=acquisition_stop_flag,
+                camera_ref_holder=camera_ref_holder,
+                camera=camera,
+                adapter=resources.get_adapter(),
+            )
+        finally:
+            resources.release_camera(camera)
 
     except Exception as e:
         import logging
@@ -482,6 +966,8 @@ def start_acquisition(req: StartRequest) -> Dict[str, Any]:
         env = os.environ.copy()
         current_dir = os.getcwd()
         env["PYTHONPATH"] = current_dir + ":" + env.get("PYTHONPATH", "")
+        # The child process opens the webcam itself.
+        resources.close_camera()
         task_proc = subprocess.Popen(cmd, env=env, cwd=current_dir)
         return {
             "status": "acquisition_started",
@@ -523,33 +1009,42 @@ def root() -> Dict[str, Any]:
     """Health check endpoint - confirms agent server is running"""
     return {
         "status": "agent_server_running",
+        "agent_id": agent_id,
         "agent_url": "http://localhost:9000",
         "backend_url": os.getenv("BACKEND_URL", "http://20.74.82.26:8000"),
     }
 
 
+def readiness() -> Dict[str, Any]:
+    """Startup progress: registration and FaceMesh model loading"""
+    state = {
+        "ready": agent_registered.is_set() and resources.model_state == "ready",
+        "registered": agent_registered.is_set(),
+        "model": resources.model_state,
+    }
+    if resources.model_error:
+        state["model_error"] = resources.model_error
+    return state
+
+
 @app.get("/status")
 def status() -> Dict[str, Any]:
-    """Status of acquisition task (not agent server)"""
+    """Status of acquisition task (not agent server) plus startup readiness"""
     if task_thread and task_thread.is_alive():
-        return {"status": "running", "mode": "thread"}
+        return {"status": "running", "mode": "thread", **readiness()}
     if task_proc and task_proc.poll() is None:
-        return {"status": "running", "pid": task_proc.pid, "mode": "subprocess"}
-    return {"status": "stopped"}
+        return {
+            "status": "running",
+            "pid": task_proc.pid,
+            "mode": "subprocess",
+            **readiness(),
+        }
+    return {"status": "stopped", **readiness()}
 
 
 @app.post("/calibrate/start")
 def calibrate_start() -> Dict[str, Any]:
-    from app.acquisition.camera_manager import CameraManager
-    from app.acquisition.mediapipe_adapter import MediaPipeAdapter
-
-    app.state.cal_data = []
-    cam = CameraManager()
-    adapter = MediaPipeAdapter()
-    cam.start_camera()
-    adapter.initialize()
-    app.state.cal_camera = cam
-    app.state.cal_adapter = adapter
+    start_calibration_run()
     return {"status": "calibration_started"}
 
 
@@ -563,65 +1058,41 @@ def calibrate_point(req: CalPointRequest) -> Dict[str, Any]:
             status_code=400,
             detail="Calibration not started. Call /calibrate/start first.",
         )
-    pts = []
-    for _ in range(req.samples):
-        frame = cam.get_frame()
-        res = adapter.analyze_frame(frame)
-        centers = res.get("eye_centers", [])
-        if centers:
-            xs = [c[0] for c in centers]
-            ys = [c[1] for c in centers]
-            pts.append((sum(xs) / len(xs), sum(ys) / len(ys)))
-        time.sleep(req.duration / req.samples)
-    if not pts:
+    sample = sample_calibration_point(cam, adapter, req.duration, req.samples)
+    if not sample["samples"]:
         raise HTTPException(status_code=500, detail="No eye data captured.")
-    mean_x = sum([p[0] for p in pts]) / len(pts)
-    mean_y = sum([p[1] for p in pts]) / len(pts)
-    app.state.cal_data.append((req.x, req.y, mean_x, mean_y))
-    result = {
+    point = {
         "screen_x": req.x,
         "screen_y": req.y,
-        "measured_x": mean_x,
-        "measured_y": mean_y,
+        "measured_x": sample["x"],
+        "measured_y": sample["y"],
+        "dispersion": sample["dispersion"],
+        "samples": sample["samples"],
     }
-    backend_url = os.getenv("BACKEND_URL", "http://20.74.82.26:8000")
-    try:
-        requests.post(
-            f"{backend_url}/session/{req.session_uid}/calibration/point",
-            json=result,
-            headers={"X-API-Key": AGENT_API_KEY},
-            timeout=1,
-        )
-    except requests.RequestException:
-        pass
-    return result
+    quality = record_calibration_point(point, sample["weight"])
+    app.state.cal_session_uid = req.session_uid
+    return {**point, "rejected": sample["rejected"], "quality": quality}
 
 
-@app.post("/calibrate/finish")
-def calibrate_finish() -> Dict[str, Any]:
-    """Finish calibration and compute transformation matrix"""
-    data = app.state.cal_data
-    cam = app.state.cal_camera
-    if cam:
-        cam.release_camera()
-        app.state.cal_camera = None
-        app.state.cal_adapter = None
-    if not data or len(data) < 3:
+@app.post("/calibrate/validate")
+def calibrate_validate(req: CalValidateRequest) -> Dict[str, Any]:
+    """Check a previous calibration at one target"""
+    if app.state.cal_camera is None or app.state.cal_adapter is None:
         raise HTTPException(
             status_code=400,
-            detail="At least 3 calibration points required. Current points: "
-            + str(len(data) if data else 0),
+            detail="Calibration not started. Call /calibrate/start first.",
         )
-    raw = np.array([[d[2], d[3]] for d in data])
-    scr = np.array([[d[0], d[1]] for d in data])
-    ones = np.ones((raw.shape[0], 1))
-    X = np.hstack([raw, ones])
-    params_x, _, _, _ = np.linalg.lstsq(X, scr[:, 0], rcond=None)
-    params_y, _, _, _ = np.linalg.lstsq(X, scr[:, 1], rcond=None)
-    A = [[params_x[0], params_x[1]], [params_y[0], params_y[1]]]
-    b = [params_x[2], params_y[2]]
-    transform = {"A": A, "b": b}
-
-    with open(os.path.join(os.path.dirname(__file__), "calibration.json"), "w") as f:
-        json.dump(transform, f)
-    return transform
+    try:
+        return validate_calibration_point(req.model_dump())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/calibrate/finish")
+def calibrate_finish() -> Dict[str, Any]:
+    """Finish calibration: reuse a validated calibration or fit the grid"""
+    backend_url = os.getenv("BACKEND_URL", "http://20.74.82.26:8000")
+    try:
+        return finish_calibration(backend_url)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,136 @@
+"""
+Eye-centre sampling for one calibration target.
+
+sample_point takes frames on a deadline grid spread over the requested
+duration, so a point always takes the same time however long analysis of a
+frame takes. The eye centres are collected in a NumPy array, blink frames
+are dropped and outliers rejected with a median/MAD filter. The dispersion
+and number of kept samples are returned so the calibration fit can weight
+the point (app.acquisition.calibration.point_weight).
+"""
+
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+# Samples further than this many robust standard deviations from the median
+# eye centre are rejected.
+MAD_CUTOFF = 3.0
+# Eye centres are whole pixels: never treat the spread as below this, or a
+# point with identical samples would reject a sample one pixel away.
+MIN_SPREAD_PX = 0.5
+# A frame whose eye aspect ratio falls below this fraction of the point's
+# median ratio is a (partial) blink even before the adapter has its own
+# threshold.
+BLINK_EAR_RATIO = 0.75
+
+
+def sample_point(
+    camera,
+    adapter,
+    duration: float,
+    samples: int,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, Any]:
+    """
+    Collect eye centres for one calibration target.
+
+    Frames are taken on a grid of duration / samples seconds starting now. A
+    frame that overruns its slot is followed immediately; slots missed
+    entirely are skipped. No frame is started after the deadline and the call
+    returns at the deadline, so it always takes `duration` seconds.
+
+    Returns:
+        Dictionary from robust_center plus frames (frames read), tracked
+        (frames with both eyes) and blinks (tracked frames dropped as blinks)
+    """
+    samples = max(1, int(samples))
+    interval = duration / samples
+    start = clock()
+    deadline = start + duration
+
+    # Columns: x, y, eye aspect ratio (NaN when unknown).
+    data = np.full((samples, 3), np.nan)
+    closed = np.zeros(samples, dtype=bool)
+    tracked = frames = 0
+    next_due = start
+
+    while tracked < samples:
+        now = clock()
+        if now >= deadline:
+            break
+        if now < next_due:
+            sleep(min(next_due, deadline) - now)
+            continue
+        next_due += interval
+        if now - next_due >= interval:
+            next_due += ((now - next_due) // interval) * interval
+
+        frames += 1
+        try:
+            frame = camera.get_frame()
+            if frame is None:
+                continue
+            result = adapter.analyze_frame(frame)
+        except Exception as e:
+            print(f"⚠️  Error during calibration sample {frames}: {e}")
+            continue
+
+        centers = result.get("eye_centers") or []
+        if len(centers) < 2:
+            continue
+        centers = np.asarray(centers[:2], dtype=float)
+        ear = result.get("ear")
+        threshold = result.get("ear_threshold")
+        data[tracked, :2] = centers.mean(axis=0)
+        data[tracked, 2] = np.nan if ear is None else ear
+        closed[tracked] = bool(result.get("blink")) or (
+            ear is not None and threshold is not None and ear < threshold
+        )
+        tracked += 1
+
+    remaining = deadline - clock()
+    if remaining > 0:
+        sleep(remaining)
+
+    data, closed = data[:tracked], closed[:tracked]
+    ears = data[:, 2]
+    if np.isfinite(ears).any():
+        with np.errstate(invalid="ignore"):
+            closed |= ears < BLINK_EAR_RATIO * np.nanmedian(ears)
+    open_eyes = data[~closed, :2]
+
+    sample = robust_center(open_eyes)
+    sample.update(frames=frames, tracked=tracked, blinks=int(closed.sum()))
+    return sample
+
+
+def robust_center(points) -> Dict[str, Any]:
+    """
+    Mean of an (n, 2) array of eye centres after median/MAD outlier rejection.
+
+    Returns:
+        Dictionary with x, y (None without samples), dispersion (RMS distance
+        of the kept samples from their mean, in pixels), samples (kept) and
+        rejected (outliers)
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) == 0:
+        return {"x": None, "y": None, "dispersion": None, "samples": 0, "rejected": 0}
+
+    distance = np.linalg.norm(points - np.median(points, axis=0), axis=1)
+    # 1.4826 * MAD estimates the standard deviation for normal noise.
+    spread = max(1.4826 * np.median(distance), MIN_SPREAD_PX)
+    kept = points[distance <= MAD_CUTOFF * spread]
+
+    center = kept.mean(axis=0)
+    dispersion = np.sqrt(np.mean(np.sum((kept - center) ** 2, axis=1)))
+    return {
+        "x": float(center[0]),
+        "y": float(center[1]),
+        "dispersion": float(dispersion),
+        "samples": int(len(kept)),
+        "rejected": int(len(points) - len(kept)),
+    }
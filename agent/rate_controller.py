@@ -0,0 +1,165 @@
+"""
+Frame pacing for the acquisition loop.
+
+RateController schedules frames against a monotonic deadline clock, so the
+achieved rate matches the target regardless of how long each frame takes.
+It measures how long each stage of a frame takes and, when the machine
+cannot keep up, first lowers the inference resolution and then the frame
+rate.
+"""
+
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+MIN_FPS = 5.0
+MIN_INFERENCE_SCALE = 0.5
+
+# Stages whose cost has to fit inside one frame interval. Sending a batch
+# happens once per batch and is absorbed by the deadline catch-up.
+FRAME_STAGES = ("capture", "analyze")
+
+
+class RateController:
+    """
+    Paces frames at a target rate and adapts it to the measured frame cost.
+
+    Usage per frame: frame_started(), time the work with stage(name), then
+    wait(stop_event) until the next deadline. take_metadata() returns the
+    pacing statistics gathered since the previous call.
+    """
+
+    def __init__(
+        self,
+        target_fps: float,
+        min_fps: float = MIN_FPS,
+        min_scale: float = MIN_INFERENCE_SCALE,
+        headroom: float = 0.8,
+        adapt_every: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.target_fps = float(target_fps)
+        self.min_fps = min(float(min_fps), self.target_fps)
+        self.min_scale = min(float(min_scale), 1.0)
+        self.headroom = headroom
+        self.adapt_every = adapt_every or max(5, int(target_fps))
+        self.clock = clock
+
+        self.fps = self.target_fps
+        self.scale = 1.0
+        self.stage_costs: Dict[str, float] = {}
+
+        self._deadline = None
+        self._frames_since_adapt = 0
+        self._frame_times: List[float] = []
+        self._frames = 0
+        self._dropped = 0
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps
+
+    def frame_started(self):
+        """Record the start of a frame."""
+        now = self.clock()
+        if self._deadline is None:
+            self._deadline = now
+        self._frame_times.append(now)
+        self._frames += 1
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time one stage of the current frame (moving average of its cost)."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            cost = self.clock() - start
+            previous = self.stage_costs.get(name)
+            self.stage_costs[name] = (
+                cost if previous is None else 0.8 * previous + 0.2 * cost
+            )
+
+    def frame_cost(self) -> float:
+        return sum(self.stage_costs.get(name, 0.0) for name in FRAME_STAGES)
+
+    def wait(self, stop_event=None) -> bool:
+        """
+        Sleep until the next frame deadline.
+
+        A frame that overran is followed immediately; whole intervals that
+        were missed are counted as dropped frames and skipped rather than
+        replayed in a burst.
+
+        Returns:
+            True if stop_event was set while waiting
+        """
+        self._frames_since_adapt += 1
+        if self._frames_since_adapt >= self.adapt_every:
+            self._frames_since_adapt = 0
+            self._adapt()
+
+        if self._deadline is None:
+            self._deadline = self.clock()
+        self._deadline += self.interval
+        now = self.clock()
+        late = now - self._deadline
+        if late >= self.interval:
+            missed = int(late // self.interval)
+            self._dropped += missed
+            self._deadline += missed * self.interval
+
+        delay = self._deadline - now
+        if stop_event is not None:
+            if stop_event.is_set():
+                return True
+            return delay > 0 and stop_event.wait(delay)
+        if delay > 0:
+            time.sleep(delay)
+        return False
+
+    def _adapt(self):
+        cost = self.frame_cost()
+        if cost <= 0:
+            return
+        budget = self.headroom * self.interval
+        if cost > budget:
+            # Shrinking the inference input keeps the rate; only slow down
+            # once the resolution floor is reached.
+            if self.scale > self.min_scale:
+                self.scale = max(self.min_scale, round(self.scale * 0.75, 3))
+            else:
+                self.fps = max(self.min_fps, min(self.fps * 0.8, self.headroom / cost))
+        elif cost < 0.5 * budget:
+            if self.fps < self.target_fps:
+                self.fps = min(self.target_fps, self.fps * 1.25)
+            elif self.scale < 1.0:
+                self.scale = min(1.0, round(self.scale / 0.75, 3))
+
+    def take_metadata(self) -> Dict[str, Any]:
+        """Pacing statistics since the previous call, for the batch metadata."""
+        times = self._frame_times
+        intervals = [b - a for a, b in zip(times, times[1:])]
+        span = times[-1] - times[0] if len(times) > 1 else 0.0
+        metadata = {
+            "target_fps": self.target_fps,
+            "effective_fps": round(self.fps, 3),
+            "achieved_fps": round(len(intervals) / span, 3) if span > 0 else None,
+            "jitter_ms": (
+                round(statistics.pstdev(intervals) * 1000, 3)
+                if len(intervals) > 1
+                else None
+            ),
+            "dropped_frames": self._dropped,
+            "frames": self._frames,
+            "inference_scale": self.scale,
+            "stage_ms": {
+                name: round(cost * 1000, 3) for name, cost in self.stage_costs.items()
+            },
+        }
+        # Keep the last frame so the next window's first interval is counted.
+        self._frame_times = times[-1:]
+        self._frames = 0
+        self._dropped = 0
+        return metadata
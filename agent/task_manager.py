@@ -1,7 +1,10 @@
 import time
 import argparse
+import threading
 import requests
 import logging
+from typing import Any, Callable, Dict, List
+from app.acquisition.clock_sync import ClockFilter
 from app.tasks.task_manager import GoNoGoTask
 
 logging.basicConfig(
@@ -21,14 +24,171 @@ def parse_args():
         "--stim-duration", type=float, default=0.5, help="Seconds stimulus on screen"
     )
     p.add_argument("--isi", type=float, default=1.0, help="Inter-stimulus interval (s)")
+    p.add_argument(
+        "--response-window",
+        type=float,
+        default=1.0,
+        help="Seconds a response is accepted after the stimulus is cleared",
+    )
+    p.add_argument("--seed", type=int, default=None, help="Seed for the trial order")
+    p.add_argument(
+        "--batch-size", type=int, default=100, help="Events per upload request"
+    )
+    p.add_argument(
+        "--flush-interval",
+        type=float,
+        default=30.0,
+        help="Upload buffered events at least this often (s)",
+    )
     return p.parse_args()
 
 
+class EventBuffer:
+    """
+    Buffers task events and posts them to /session/events/batch from a
+    background thread, so the trial loop never waits on the network.
+
+    A batch is sent once max_batch events are queued or flush_interval seconds
+    have passed. Network errors, 5xx and 429 answers are retried; a batch that
+    cannot be delivered after `attempts` tries is put back at the head of the
+    queue and sent with the next one. A batch the backend rejects with any
+    other 4xx would be rejected again, so it is logged and dropped. close()
+    uploads whatever is left before returning.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        max_batch: int = 100,
+        flush_interval: float = 30.0,
+        attempts: int = 3,
+        backoff: float = 1.0,
+        post: Callable[..., Any] = requests.post,
+    ):
+        self.url = url
+        self.max_batch = max(1, int(max_batch))
+        self.flush_interval = flush_interval
+        self.attempts = max(1, int(attempts))
+        self.backoff = backoff
+        self.post = post
+        self.requests = 0
+        self.sent = 0
+        self.dropped = 0
+        # Event timestamps are on this machine's clock; every upload refines
+        # the offset estimate sent with the next one.
+        self.clock = ClockFilter()
+
+        self._events: List[Dict[str, Any]] = []
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, event: Dict[str, Any]):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("EventBuffer is closed")
+            self._events.append(event)
+            if len(self._events) >= self.max_batch:
+                self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._events)
+
+    def close(self, timeout: float = 30.0) -> bool:
+        """
+        Upload the remaining events and stop the background thread.
+
+        Returns:
+            True if every event was delivered
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        return not self._thread.is_alive() and self.pending() == 0 and self.dropped == 0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and len(self._events) < self.max_batch:
+                    if not self._cond.wait(self.flush_interval):
+                        break
+                closing = self._closed
+                batch = self._events[: self.max_batch]
+                del self._events[: self.max_batch]
+
+            if not batch:
+                if closing:
+                    return
+                continue
+            if self._send(batch):
+                continue
+
+            with self._cond:
+                self._events[:0] = batch
+            if closing:
+                logging.error(
+                    f"Giving up on {self.pending()} task events that could not be uploaded"
+                )
+                return
+
+    def _send(self, batch: List[Dict[str, Any]]) -> bool:
+        """
+        Post one batch, retrying transient failures.
+
+        Returns:
+            False if the batch should be queued again, True once it was
+            delivered or rejected for good
+        """
+        delay = self.backoff
+        for attempt in range(1, self.attempts + 1):
+            self.requests += 1
+            payload = {"events": batch}
+            clock = self.clock.estimate()
+            if clock:
+                payload["clock"] = clock
+            try:
+                sent = time.time()
+                resp = self.post(self.url, json=payload, timeout=10)
+                answered = time.time()
+                resp.raise_for_status()
+                self.sent += len(batch)
+                try:
+                    self.clock.add_response(sent, answered, resp.json())
+                except ValueError:
+                    pass
+                return True
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status is not None and status < 500 and status != 429:
+                    self.dropped += len(batch)
+                    logging.error(
+                        f"Task event upload rejected ({status}), "
+                        f"dropping {len(batch)} events: {e}"
+                    )
+                    return True
+                logging.warning(
+                    f"Uploading {len(batch)} task events failed "
+                    f"(attempt {attempt}/{self.attempts}): {e}"
+                )
+            except requests.RequestException as e:
+                logging.warning(
+                    f"Uploading {len(batch)} task events failed "
+                    f"(attempt {attempt}/{self.attempts}): {e}"
+                )
+            if attempt < self.attempts:
+                time.sleep(delay)
+                delay *= 2
+        return False
+
+
 def main():
     args = parse_args()
     base = args.api_base.rstrip("/")
     start_url = f"{base}/session/start"
-    event_url = f"{base}/session/event"
+    event_url = f"{base}/session/events/batch"
     stop_url = f"{base}/session/stop"
 
     resp = requests.post(start_url, json={"session_uid": args.session_uid})
@@ -40,30 +200,40 @@ def main():
         go_prob=args.go_prob,
         stim_duration=args.stim_duration,
         isi=args.isi,
+        response_window=args.response_window,
+        seed=args.seed,
+    )
+    events = EventBuffer(
+        event_url, max_batch=args.batch_size, flush_interval=args.flush_interval
     )
 
-    for trial_idx, (stimulus, onset_time) in enumerate(task.run()):
-        requests.post(
-            event_url,
-            json={
+    # The task keeps its own clock; this loop only queues events, uploads
+    # happen on the buffer's thread.
+    for trial in task.run():
+        events.add(
+            {
                 "session_uid": args.session_uid,
-                "timestamp": onset_time,
+                "timestamp": trial["onset"],
                 "event_type": "stimulus_onset",
-                "stimulus": stimulus,
-            },
+                "stimulus": trial["stimulus"],
+            }
         )
-
-        response, rt = task.wait_for_response()
-        requests.post(
-            event_url,
-            json={
+        events.add(
+            {
                 "session_uid": args.session_uid,
-                "timestamp": time.time(),
+                "timestamp": trial["response_time"],
                 "event_type": "response",
-                "stimulus": stimulus,
-                "response": response,
-            },
+                "stimulus": trial["stimulus"],
+                "response": trial["response"],
+            }
+        )
+
+    logging.info(f"Onset jitter: {task.jitter()}")
+    if not events.close():
+        logging.error(
+            f"{events.pending() + events.dropped} task events were not uploaded"
         )
+    logging.info(f"Uploaded {events.sent} task events in {events.requests} requests")
 
     resp = requests.post(stop_url, json={"session_uid": args.session_uid})
     resp.raise_for_status()
@@ -51,3 +51,37 @@ def mock_requests():
         mock_requests.post.return_value = mock_response
         mock_requests.delete.return_value = mock_response
         yield mock_requests
+
+
+@pytest.fixture(autouse=True)
+def reset_agent_resources():
+    """Drop the shared camera/adapter so each test builds its own mocks"""
+    local_agent = sys.modules.get("agent.local_agent")
+    if local_agent is not None:
+        local_agent.resources.reset()
+        local_agent.agent_registered.clear()
+    yield
+    local_agent = sys.modules.get("agent.local_agent")
+    if local_agent is not None:
+        local_agent.resources.reset()
+        local_agent.agent_registered.clear()
+
+
+@pytest.fixture(autouse=True)
+def calibration_file(tmp_path, monkeypatch):
+    """Keep calibration.json writes out of the source tree"""
+    path = tmp_path / "calibration.json"
+    monkeypatch.setattr("agent.gaze_mapping.CALIBRATION_PATH", str(path))
+    return path
+
+
+@pytest.fixture(autouse=True)
+def calibration_uploads(monkeypatch):
+    """Record calibration uploads instead of starting upload threads"""
+    import agent.local_agent
+
+    upload = Mock()
+    monkeypatch.setattr(agent.local_agent, "upload_calibration", upload)
+    agent.local_agent.app.state.cal_points = []
+    agent.local_agent.app.state.cal_run_id = None
+    return upload
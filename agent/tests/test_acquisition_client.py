@@ -71,3 +71,114 @@ def test_parse_args_missing_session_uid():
             parse_args()
     finally:
         sys.argv = original_argv
+
+
+def test_run_acquisition_reuses_supplied_camera(mock_camera, mock_adapter):
+    """Test run_acquisition leaves a supplied camera open for its owner"""
+    from agent.acquisition_client import run_acquisition
+    import threading
+
+    stop_event = threading.Event()
+    mock_camera.get_frame.side_effect = lambda: stop_event.set() or Mock()
+
+    with (
+        patch("app.acquisition.camera_manager.CameraManager") as mock_camera_cls,
+        patch("app.acquisition.mediapipe_adapter.MediaPipeAdapter") as mock_adapter_cls,
+        patch("agent.acquisition_client.requests.post"),
+    ):
+        run_acquisition(
+            "test-session",
+            "http://localhost:8000/acquisition/batch",
+            20.0,
+            stop_event=stop_event,
+            camera=mock_camera,
+            adapter=mock_adapter,
+        )
+
+    mock_camera_cls.assert_not_called()
+    mock_adapter_cls.assert_not_called()
+    mock_camera.start_camera.assert_not_called()
+    mock_camera.release_camera.assert_not_called()
+
+
+def test_run_acquisition_sends_pacing_metadata(mock_camera, mock_adapter):
+    """Test batches carry the rate controller's pacing statistics"""
+    from agent.acquisition_client import run_acquisition
+    import threading
+
+    stop_event = threading.Event()
+    frames = []
+
+    def get_frame():
+        frames.append(1)
+        if len(frames) >= 5:
+            stop_event.set()
+        return Mock()
+
+    mock_camera.get_frame.side_effect = get_frame
+
+    with patch("agent.acquisition_client.requests.post") as mock_post:
+        run_acquisition(
+            "test-session",
+            "http://localhost:8000/acquisition/data",
+            100.0,
+            batch_size=3,
+            stop_event=stop_event,
+            camera=mock_camera,
+            adapter=mock_adapter,
+        )
+
+    assert mock_post.call_count == 2
+    url = mock_post.call_args_list[0].args[0]
+    assert url == "http://localhost:8000/acquisition/batch"
+
+    first = mock_post.call_args_list[0].kwargs["json"]
+    assert len(first["records"]) == 3
+    metadata = first["metadata"]
+    assert metadata["frames"] == 3
+    assert metadata["target_fps"] == 100.0
+    assert metadata["achieved_fps"] is not None
+    assert set(metadata["stage_ms"]) >= {"capture", "analyze"}
+
+    final = mock_post.call_args_list[1].kwargs["json"]
+    assert len(final["records"]) == 1
+    assert final["metadata"]["target_fps"] == 100.0
+
+
+def test_run_acquisition_adds_screen_gaze(mock_camera, mock_adapter):
+    """Test calibrated sessions stream screen-space gaze next to raw centres"""
+    from agent.acquisition_client import run_acquisition
+    from agent.gaze_mapping import GazeMapper
+    import threading
+
+    stop_event = threading.Event()
+    frames = []
+
+    def get_frame():
+        frames.append(1)
+        if len(frames) >= 3:
+            stop_event.set()
+        return Mock()
+
+    mock_camera.get_frame.side_effect = get_frame
+    mapper = GazeMapper.from_transform(
+        {"A": [[0.1, 0.0], [0.0, 0.1]], "b": [0.0, 0.0], "target_scale": 100.0}
+    )
+
+    with patch("agent.acquisition_client.requests.post") as mock_post:
+        run_acquisition(
+            "test-session",
+            "http://localhost:8000/acquisition/batch",
+            100.0,
+            batch_size=10,
+            stop_event=stop_event,
+            camera=mock_camera,
+            adapter=mock_adapter,
+            gaze_mapper=mapper,
+        )
+
+    records = mock_post.call_args.kwargs["json"]["records"]
+    assert len(records) == 2
+    # eye centres (100, 200) and (300, 400) from the mock adapter
+    assert records[0]["left_eye"] == {"x": 100, "y": 200}
+    assert records[0]["gaze"] == {"x": 0.2, "y": 0.3}
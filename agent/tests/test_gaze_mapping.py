@@ -0,0 +1,63 @@
+"""
+Unit tests for agent/gaze_mapping.py
+"""
+
+import json
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from agent.gaze_mapping import GazeMapper, load_calibration, save_calibration
+
+
+def _record(left, right):
+    return {
+        "session_uid": "s",
+        "timestamp": 0.0,
+        "left_eye": {"x": left[0], "y": left[1]},
+        "right_eye": {"x": right[0], "y": right[1]},
+    }
+
+
+def test_map_records_uses_eye_midpoint():
+    """Test the batch is mapped through the affine transform in one step"""
+    mapper = GazeMapper.from_transform(
+        {"A": [[0.5, 0.0], [0.0, 0.25]], "b": [10.0, 20.0], "target_scale": 100.0}
+    )
+    records = [_record((100, 200), (140, 240)), _record((0, 0), (0, 0))]
+
+    mapper.map_records(records)
+
+    assert records[0]["gaze"]["x"] == (0.5 * 120 + 10) / 100
+    assert records[0]["gaze"]["y"] == (0.25 * 220 + 20) / 100
+    assert records[1]["gaze"] == {"x": 0.1, "y": 0.2}
+
+
+def test_map_records_needs_both_eyes():
+    """Test samples with one eye tracked get no gaze point"""
+    mapper = GazeMapper.from_transform({"A": [[1.0, 0.0], [0.0, 1.0]], "b": [0.0, 0.0]})
+    records = [_record((100, 200), (None, None))]
+
+    mapper.map_records(records)
+
+    assert records[0]["gaze"] == {"x": None, "y": None}
+    assert records[0]["left_eye"] == {"x": 100, "y": 200}
+
+
+def test_load_calibration_only_for_its_session(calibration_file):
+    """Test a calibration is applied only to the session it was fitted for"""
+    transform = {"A": [[1.0, 0.0], [0.0, 1.0]], "b": [0.0, 0.0], "target_scale": 100}
+    save_calibration(transform, "session-a")
+
+    assert json.loads(calibration_file.read_text())["session_uid"] == "session-a"
+    mapper = load_calibration("session-a")
+    assert mapper is not None
+    assert mapper.scale == 100.0
+    assert load_calibration("session-b") is None
+
+
+def test_load_calibration_missing_file():
+    """Test acquisition without a calibration streams raw coordinates only"""
+    assert load_calibration("session-a") is None
@@ -120,6 +120,59 @@ def test_calibrate_finish_success(client, mock_camera):
     mock_camera.release_camera.assert_called_once()
 
 
+def test_calibrate_finish_saves_session_calibration(
+    client, mock_camera, mock_adapter, calibration_file
+):
+    """Test the fitted transform is saved for the calibrated session"""
+    import json
+    from agent.gaze_mapping import load_calibration
+    from agent.local_agent import app, execute_command
+
+    app.state.cal_camera = mock_camera
+    app.state.cal_adapter = mock_adapter
+    app.state.cal_data = []
+    centers = iter([(100, 100), (300, 100), (100, 300), (300, 300)])
+
+    def analyze(frame):
+        center = next(centers)
+        return {"eye_centers": [center, center]}
+
+    with (
+        patch("agent.local_agent.requests.post"),
+        patch("agent.local_agent.time.sleep"),
+    ):
+        for x, y in ((10, 10), (90, 10), (10, 90), (90, 90)):
+            mock_adapter.analyze_frame.side_effect = analyze
+            execute_command(
+                {
+                    "command_id": f"point-{x}-{y}",
+                    "type": "calibrate_point",
+                    "params": {
+                        "x": x,
+                        "y": y,
+                        "samples": 1,
+                        "duration": 0.1,
+                        "session_uid": "calibrated-session",
+                    },
+                },
+                "http://localhost:8000",
+            )
+        execute_command(
+            {"command_id": "finish", "type": "calibrate_finish", "params": {}},
+            "http://localhost:8000",
+        )
+
+    saved = json.loads(calibration_file.read_text())
+    assert saved["session_uid"] == "calibrated-session"
+    assert saved["target_scale"] == 100.0
+
+    import numpy as np
+
+    mapper = load_calibration("calibrated-session")
+    gaze = mapper.apply(np.array([[100.0, 100.0], [200.0, 200.0]]))
+    assert np.allclose(gaze, [[0.1, 0.1], [0.5, 0.5]])
+
+
 def test_start_acquisition_already_running(client):
     """Test starting acquisition when already running"""
     from agent.local_agent import app, task_thread
@@ -213,8 +266,14 @@ def test_execute_command_calibrate_point(mock_camera, mock_adapter):
         assert mock_camera.get_frame.called
         assert mock_adapter.analyze_frame.called
 
-        # Verify result was reported
+        # Verify result was reported, with the running fit quality
         assert mock_post.called
+        reported = mock_post.call_args_list[-1].kwargs["json"]["command_result"]
+        assert reported["result"]["samples"] == 5
+        assert reported["result"]["dispersion"] == 0.0
+        assert reported["result"]["quality"]["points"] == 1
+        assert app.state.cal_data == [(100.0, 200.0, 200.0, 300.0, 1.0)]
+        assert reported["result"]["quality"]["converged"] is False
 
 
 def test_execute_command_calibrate_point_no_camera():
@@ -316,6 +375,419 @@ def test_send_heartbeat_stop_signal():
         assert mock_post.called or True  # Just verify the test structure
 
 
+def test_send_heartbeat_long_poll():
+    """Test send_heartbeat re-polls immediately when the backend long-polls"""
+    from agent.local_agent import send_heartbeat, HEARTBEAT_WAIT
+
+    command = {"command_id": "cmd-1", "type": "calibrate_start", "params": {}}
+    responses = [
+        Mock(
+            status_code=200,
+            json=Mock(
+                return_value={"status": "ok", "commands": [command], "long_poll": True}
+            ),
+        ),
+        Mock(
+            status_code=200,
+            json=Mock(return_value={"status": "stopped", "message": "Session stopped"}),
+        ),
+    ]
+
+    with (
+        patch("agent.local_agent.requests.post", side_effect=responses) as mock_post,
+        patch("agent.local_agent.CommandExecutor") as mock_executor,
+        patch("agent.local_agent.time.sleep") as mock_sleep,
+    ):
+        mock_executor.return_value.batch_results = False
+        send_heartbeat()
+
+    assert mock_post.call_count == 2
+    assert mock_post.call_args_list[0][1]["json"]["wait"] == HEARTBEAT_WAIT
+    assert mock_post.call_args_list[0][1]["timeout"] > HEARTBEAT_WAIT
+    mock_executor.return_value.submit.assert_called_once_with(command)
+    mock_sleep.assert_not_called()
+
+
+def test_send_heartbeat_legacy_backend_fallback():
+    """Test send_heartbeat falls back to 1s polling without long-poll support"""
+    from agent.local_agent import send_heartbeat
+
+    responses = [
+        Mock(status_code=200, json=Mock(return_value={"status": "ok", "commands": []})),
+        Mock(
+            status_code=200,
+            json=Mock(return_value={"status": "stopped", "message": "Session stopped"}),
+        ),
+    ]
+
+    with (
+        patch("agent.local_agent.requests.post", side_effect=responses),
+        patch("agent.local_agent.time.sleep") as mock_sleep,
+    ):
+        send_heartbeat()
+
+    mock_sleep.assert_called_once_with(1)
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_command_executor_runs_lane_in_order():
+    """Commands on the ordered lane never overlap and keep arrival order"""
+    from agent.local_agent import CommandExecutor
+
+    running = []
+    order = []
+    overlap = []
+
+    def fake_run(command, backend_url):
+        if running:
+            overlap.append(command["command_id"])
+        running.append(command["command_id"])
+        time.sleep(0.02)
+        order.append(command["command_id"])
+        running.pop()
+        return {"command_id": command["command_id"], "result": {}, "success": True}
+
+    with (
+        patch("agent.local_agent.run_command", side_effect=fake_run),
+        patch("agent.local_agent.report_command_results") as mock_report,
+    ):
+        executor = CommandExecutor("http://localhost:8000")
+        for i in range(4):
+            executor.submit(
+                {"command_id": f"p{i}", "type": "calibrate_point", "params": {}}
+            )
+        executor.submit({"command_id": "fin", "type": "calibrate_finish", "params": {}})
+
+        assert _wait_until(
+            lambda: sum(len(c[0][1]) for c in mock_report.call_args_list) == 5
+        )
+
+    assert order == ["p0", "p1", "p2", "p3", "fin"]
+    assert overlap == []
+
+
+def test_command_executor_stop_lane_is_independent():
+    """stop_acquisition is not queued behind a long-running command"""
+    from agent.local_agent import CommandExecutor
+
+    release = threading.Event()
+    finished = []
+
+    def fake_run(command, backend_url):
+        if command["type"] == "calibrate_point":
+            release.wait(2)
+        finished.append(command["command_id"])
+        return {"command_id": command["command_id"], "result": {}, "success": True}
+
+    with (
+        patch("agent.local_agent.run_command", side_effect=fake_run),
+        patch("agent.local_agent.report_command_results") as mock_report,
+    ):
+        executor = CommandExecutor("http://localhost:8000")
+        executor.submit({"command_id": "slow", "type": "calibrate_point"})
+        executor.submit({"command_id": "stop", "type": "stop_acquisition"})
+
+        assert _wait_until(lambda: "stop" in finished)
+        assert "slow" not in finished
+        release.set()
+        assert _wait_until(lambda: "slow" in finished)
+        assert _wait_until(
+            lambda: sum(len(c[0][1]) for c in mock_report.call_args_list) == 2
+        )
+
+
+def test_command_executor_coalesces_results():
+    """Results finished while a flush is in flight go out in one request"""
+    from agent.local_agent import CommandExecutor
+
+    with patch("agent.local_agent.requests.post") as mock_post:
+        executor = CommandExecutor("http://localhost:8000")
+        executor.batch_results = True
+        executor._outbox = [
+            {"command_id": "a", "result": {}, "success": True},
+            {"command_id": "b", "result": {}, "success": True},
+        ]
+        with patch("agent.local_agent.run_command") as mock_run:
+            mock_run.return_value = {"command_id": "c", "result": {}, "success": True}
+            executor.submit({"command_id": "c", "type": "calibrate_start"})
+            assert _wait_until(
+                lambda: sum(
+                    len(call[1]["json"].get("command_results", [None]))
+                    for call in mock_post.call_args_list
+                )
+                == 3
+            )
+
+    batched = [
+        call[1]["json"]["command_results"]
+        for call in mock_post.call_args_list
+        if "command_results" in call[1]["json"]
+    ]
+    assert batched and [r["command_id"] for r in batched[0]][:2] == ["a", "b"]
+
+
+def test_command_executor_sends_close_results_in_one_request():
+    """Results finishing within the flush delay share one request"""
+    from agent.local_agent import CommandExecutor
+
+    def fake_run(command, backend_url):
+        return {"command_id": command["command_id"], "result": {}, "success": True}
+
+    with (
+        patch("agent.local_agent.run_command", side_effect=fake_run),
+        patch("agent.local_agent.requests.post") as mock_post,
+    ):
+        executor = CommandExecutor("http://localhost:8000", flush_delay=0.2)
+        executor.batch_results = True
+        for i in range(3):
+            executor.submit({"command_id": f"p{i}", "type": "calibrate_point"})
+        assert _wait_until(lambda: mock_post.called)
+        time.sleep(0.3)
+
+    assert mock_post.call_count == 1
+    payload = mock_post.call_args[1]["json"]
+    assert payload["results_only"] is True
+    assert [r["command_id"] for r in payload["command_results"]] == ["p0", "p1", "p2"]
+
+
+def test_command_executor_runs_commands_returned_by_flush():
+    """Commands handed out in answer to a result flush are not dropped"""
+    from agent.local_agent import CommandExecutor
+
+    executed = []
+
+    def fake_run(command, backend_url):
+        executed.append(command["command_id"])
+        return {"command_id": command["command_id"], "result": {}, "success": True}
+
+    # A backend that ignores results_only pops the queued command.
+    answers = [
+        Mock(
+            status_code=200,
+            json=Mock(
+                return_value={
+                    "status": "ok",
+                    "commands": [{"command_id": "queued", "type": "calibrate_point"}],
+                }
+            ),
+        ),
+        Mock(status_code=200, json=Mock(return_value={"status": "ok"})),
+    ]
+
+    with (
+        patch("agent.local_agent.run_command", side_effect=fake_run),
+        patch("agent.local_agent.requests.post", side_effect=answers) as mock_post,
+    ):
+        executor = CommandExecutor("http://localhost:8000", flush_delay=0)
+        executor.submit({"command_id": "first", "type": "calibrate_point"})
+        assert _wait_until(lambda: mock_post.call_count == 2)
+
+    assert executed == ["first", "queued"]
+
+
+def test_send_heartbeat_piggybacks_results():
+    """Finished results ride along with the next heartbeat"""
+    from agent.local_agent import send_heartbeat
+
+    result = {"command_id": "c1", "result": {}, "success": True}
+    responses = [
+        Mock(
+            status_code=200,
+            json=Mock(return_value={"status": "stopped", "message": "Session stopped"}),
+        ),
+    ]
+
+    with (
+        patch("agent.local_agent.requests.post", side_effect=responses) as mock_post,
+        patch("agent.local_agent.CommandExecutor") as mock_executor,
+    ):
+        mock_executor.return_value.batch_results = True
+        mock_executor.return_value.take_results.return_value = [result]
+        send_heartbeat()
+
+    assert mock_post.call_args[1]["json"]["command_results"] == [result]
+
+
+def test_resource_manager_shares_camera_between_calibration_and_acquisition(
+    mock_camera, mock_adapter
+):
+    """Test the camera opened for calibration is reused by acquisition"""
+    from agent.local_agent import ResourceManager
+
+    with (
+        patch(
+            "app.acquisition.camera_manager.CameraManager", return_value=mock_camera
+        ) as mock_camera_cls,
+        patch(
+            "app.acquisition.mediapipe_adapter.MediaPipeAdapter",
+            return_value=mock_adapter,
+        ) as mock_adapter_cls,
+    ):
+        resources = ResourceManager(idle_timeout=60)
+
+        calibration_camera = resources.acquire_camera()
+        calibration_adapter = resources.get_adapter(fresh=True)
+        resources.release_camera(calibration_camera)
+
+        acquisition_camera = resources.acquire_camera()
+        acquisition_adapter = resources.get_adapter()
+
+        assert acquisition_camera is calibration_camera
+        assert acquisition_adapter is calibration_adapter
+        mock_camera_cls.assert_called_once()
+        mock_adapter_cls.assert_called_once()
+        mock_camera.start_camera.assert_called_once()
+        mock_camera.release_camera.assert_not_called()
+
+        resources.release_camera(acquisition_camera, close=True)
+        mock_camera.release_camera.assert_called_once()
+
+
+def test_resource_manager_releases_idle_camera(mock_camera):
+    """Test an unused camera is released after the idle timeout"""
+    from agent.local_agent import ResourceManager
+
+    with patch(
+        "app.acquisition.camera_manager.CameraManager", return_value=mock_camera
+    ):
+        resources = ResourceManager(idle_timeout=0.05)
+        camera = resources.acquire_camera()
+        resources.release_camera(camera)
+        mock_camera.release_camera.assert_not_called()
+
+        deadline = time.monotonic() + 2
+        while not mock_camera.release_camera.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        mock_camera.release_camera.assert_called_once()
+
+
+def test_resource_manager_warm_up(mock_adapter):
+    """Test warm_up loads the adapter in the background"""
+    from agent.local_agent import ResourceManager
+
+    with patch(
+        "app.acquisition.mediapipe_adapter.MediaPipeAdapter",
+        return_value=mock_adapter,
+    ):
+        resources = ResourceManager()
+        resources.warm_up()
+        resources._warmup_thread.join(timeout=2)
+
+        assert resources.adapter_ready
+        assert resources.model_state == "ready"
+        assert resources.get_adapter() is mock_adapter
+        mock_adapter.initialize.assert_called_once()
+
+
+def test_resource_manager_warm_up_failure(mock_adapter):
+    """Test a model that fails to load is reported as an error"""
+    from agent.local_agent import ResourceManager
+
+    mock_adapter.initialize.side_effect = RuntimeError("no FaceMesh")
+    with patch(
+        "app.acquisition.mediapipe_adapter.MediaPipeAdapter",
+        return_value=mock_adapter,
+    ):
+        resources = ResourceManager()
+        resources.warm_up()
+        resources._warmup_thread.join(timeout=2)
+
+    assert resources.model_state == "error"
+    assert resources.model_error == "no FaceMesh"
+    assert not resources.adapter_ready
+
+
+def test_status_reports_readiness(client, mock_adapter):
+    """Test /status reports registration and model loading progress"""
+    from agent import local_agent
+
+    data = client.get("/status").json()
+    assert data["status"] == "stopped"
+    assert data["ready"] is False
+    assert data["registered"] is False
+    assert data["model"] == "idle"
+
+    local_agent.agent_registered.set()
+    with patch(
+        "app.acquisition.mediapipe_adapter.MediaPipeAdapter",
+        return_value=mock_adapter,
+    ):
+        local_agent.resources.get_adapter()
+
+    data = client.get("/status").json()
+    assert data["ready"] is True
+    assert data["registered"] is True
+    assert data["model"] == "ready"
+
+
+def test_register_with_backend_failure():
+    """Test a failed registration is reported but not fatal"""
+    import requests
+    from agent import local_agent
+
+    with patch(
+        "agent.local_agent.requests.post",
+        side_effect=requests.ConnectionError("refused"),
+    ):
+        assert local_agent.register_with_backend("http://backend") is False
+    assert not local_agent.agent_registered.is_set()
+
+
+def test_start_agent_services_order():
+    """Test startup registers, then warms the model, then long-polls"""
+    from agent import local_agent
+
+    calls = []
+    response = Mock(status_code=200)
+    with (
+        patch(
+            "agent.local_agent.requests.post",
+            side_effect=lambda *a, **k: calls.append("register") or response,
+        ),
+        patch.object(
+            local_agent.resources,
+            "warm_up",
+            side_effect=lambda: calls.append("warm_up"),
+        ),
+        patch(
+            "agent.local_agent.send_heartbeat",
+            side_effect=lambda: calls.append("heartbeat"),
+        ),
+    ):
+        local_agent.start_agent_services("http://backend")
+
+    assert calls == ["register", "warm_up", "heartbeat"]
+    assert local_agent.agent_registered.is_set()
+
+
+def test_lifespan_does_not_block_on_backend():
+    """Test startup hands registration to a background thread"""
+    import asyncio
+    from agent.local_agent import lifespan, start_agent_services
+    from fastapi import FastAPI
+
+    async def run_lifespan():
+        async with lifespan(FastAPI()):
+            pass
+
+    with (
+        patch("agent.local_agent.requests.post") as mock_post,
+        patch("agent.local_agent.requests.delete"),
+        patch("agent.local_agent.threading.Thread") as mock_thread,
+    ):
+        asyncio.run(run_lifespan())
+
+    mock_post.assert_not_called()
+    assert mock_thread.call_args.kwargs["target"] is start_agent_services
+    mock_thread.return_value.start.assert_called_once()
+
+
 def test_lifespan_registration():
     """Test lifespan function registers agent with backend"""
     from agent.local_agent import lifespan
@@ -341,3 +813,267 @@ def test_lifespan_registration():
 
         # This would need to be run in an async context, but we can verify the structure
         assert True  # Placeholder - lifespan testing requires async context
+
+
+def _affine_transform():
+    """Transform mapping eye centres (300 + 2x, 200 + 3y) to targets (x, y)"""
+    from app.acquisition.calibration import CalibrationEngine
+
+    engine = CalibrationEngine()
+    for x, y in ((10, 10), (90, 10), (10, 90), (90, 90)):
+        engine.add_point(x, y, 300 + 2 * x, 200 + 3 * y)
+    return engine.transform()
+
+
+def _validate(x, y, transform, session_uid="returning-session"):
+    from agent.local_agent import execute_command
+
+    execute_command(
+        {
+            "command_id": f"validate-{x}-{y}",
+            "type": "calibrate_validate",
+            "params": {
+                "x": x,
+                "y": y,
+                "samples": 3,
+                "duration": 0.03,
+                "session_uid": session_uid,
+                "calibration_id": 7,
+                "transform": transform,
+            },
+        },
+        "http://localhost:8000",
+    )
+
+
+def _reported(mock_post):
+    """Command results reported through requests.post, by command id"""
+    return {
+        call.kwargs["json"]["command_result"]["command_id"]: call.kwargs["json"][
+            "command_result"
+        ]
+        for call in mock_post.call_args_list
+        if "command_result" in call.kwargs.get("json", {})
+    }
+
+
+def test_validated_calibration_is_reused(
+    mock_camera, mock_adapter, calibration_file, calibration_uploads
+):
+    """Two passing checks let calibrate_finish adopt the previous calibration"""
+    import json
+    from agent.local_agent import app, execute_command
+
+    transform = _affine_transform()
+    app.state.cal_camera = mock_camera
+    app.state.cal_adapter = mock_adapter
+    app.state.cal_data = []
+    app.state.cal_reuse = None
+    app.state.cal_run_id = "run-1"
+
+    with patch("agent.local_agent.requests.post") as mock_post:
+        for x, y in ((30, 30), (70, 70)):
+            center = (300 + 2 * x + 1, 200 + 3 * y)
+            mock_adapter.analyze_frame.return_value = {"eye_centers": [center, center]}
+            _validate(x, y, transform)
+        execute_command(
+            {"command_id": "finish", "type": "calibrate_finish", "params": {}},
+            "http://localhost:8000",
+        )
+
+    results = _reported(mock_post)
+    assert results["validate-30-30"]["result"]["valid"] is True
+    assert results["validate-30-30"]["result"]["error"] == pytest.approx(0.5, abs=1e-3)
+    assert results["finish"]["success"] is True
+    assert results["finish"]["result"]["reused_calibration_id"] == 7
+
+    saved = json.loads(calibration_file.read_text())
+    assert saved["session_uid"] == "returning-session"
+    assert saved["params"] == transform["params"]
+    calibration_uploads.assert_called_once_with(
+        "http://localhost:8000",
+        "returning-session",
+        "reuse",
+        {"calibration_id": 7, "error": pytest.approx(0.5, abs=1e-3), "run_id": "run-1"},
+    )
+    mock_camera.release_camera.assert_called_once()
+
+
+def test_failed_validation_requires_grid(mock_camera, mock_adapter, calibration_file):
+    """A check outside the tolerance makes calibrate_finish demand a full grid"""
+    from agent.local_agent import app, execute_command
+
+    transform = _affine_transform()
+    app.state.cal_camera = mock_camera
+    app.state.cal_adapter = mock_adapter
+    app.state.cal_data = []
+    app.state.cal_reuse = None
+
+    with patch("agent.local_agent.requests.post") as mock_post:
+        # The user moved: the eyes now sit 40 px to the right.
+        center = (300 + 2 * 30 + 40, 200 + 3 * 30)
+        mock_adapter.analyze_frame.return_value = {"eye_centers": [center, center]}
+        _validate(30, 30, transform)
+        execute_command(
+            {"command_id": "finish", "type": "calibrate_finish", "params": {}},
+            "http://localhost:8000",
+        )
+
+    results = _reported(mock_post)
+    assert results["validate-30-30"]["result"]["valid"] is False
+    assert results["finish"]["success"] is False
+    assert "At least 3 calibration points" in results["finish"]["error"]
+    assert not calibration_file.exists()
+
+
+def test_calibrate_finish_uploads_grid_batch(mock_camera, calibration_uploads):
+    """Finishing a grid uploads all points and the transform in one request"""
+    from agent.local_agent import app, execute_command
+
+    points = [
+        {
+            "screen_x": x,
+            "screen_y": y,
+            "measured_x": 300 + 2 * x,
+            "measured_y": 200 + 3 * y,
+        }
+        for x, y in ((10, 10), (90, 10), (10, 90))
+    ]
+    app.state.cal_data = [
+        (p["screen_x"], p["screen_y"], p["measured_x"], p["measured_y"]) for p in points
+    ]
+    app.state.cal_points = points
+    app.state.cal_run_id = "run-2"
+    app.state.cal_camera = mock_camera
+    app.state.cal_session_uid = "grid-session"
+
+    with patch("agent.local_agent.requests.post"):
+        execute_command(
+            {"command_id": "finish", "type": "calibrate_finish", "params": {}},
+            "http://localhost:8000",
+        )
+
+    calibration_uploads.assert_called_once()
+    backend_url, session_uid, action, payload = calibration_uploads.call_args.args
+    assert (backend_url, session_uid, action) == (
+        "http://localhost:8000",
+        "grid-session",
+        "batch",
+    )
+    assert payload["run_id"] == "run-2"
+    assert payload["points"] == points
+    assert payload["transform"]["model"] == "affine"
+
+
+def test_calibrate_point_is_not_posted_per_point(
+    mock_camera, mock_adapter, calibration_uploads
+):
+    """Points are kept for the batch upload instead of one request each"""
+    from agent.local_agent import app, execute_command
+
+    app.state.cal_camera = mock_camera
+    app.state.cal_adapter = mock_adapter
+    app.state.cal_data = []
+
+    with patch("agent.local_agent.requests.post") as mock_post:
+        execute_command(
+            {
+                "command_id": "point",
+                "type": "calibrate_point",
+                "params": {"x": 10, "y": 10, "samples": 2, "duration": 0.2},
+            },
+            "http://localhost:8000",
+        )
+
+    urls = [call.args[0] for call in mock_post.call_args_list]
+    assert not any("/calibration/" in url for url in urls)
+    assert app.state.cal_points[0]["screen_x"] == 10
+    assert app.state.cal_points[0]["samples"] == 2
+
+
+def _response(status_code):
+    response = Mock()
+    response.status_code = status_code
+    response.text = ""
+    return response
+
+
+def test_calibration_upload_retries_until_accepted():
+    """Network errors and 5xx are retried with backoff"""
+    import requests
+    from agent.local_agent import _upload_calibration
+
+    with (
+        patch(
+            "agent.local_agent.requests.post",
+            side_effect=[
+                requests.ConnectionError("down"),
+                _response(503),
+                _response(200),
+            ],
+        ) as mock_post,
+        patch("agent.local_agent.time.sleep") as mock_sleep,
+        patch("agent.local_agent.CALIBRATION_UPLOAD_BACKOFF", 0.5),
+    ):
+        assert _upload_calibration("http://backend/x", {"run_id": "r"}) is True
+
+    assert mock_post.call_count == 3
+    assert [call.args[0] for call in mock_sleep.call_args_list] == [0.5, 1.0]
+    assert all(
+        call.kwargs["json"] == {"run_id": "r"} for call in mock_post.call_args_list
+    )
+
+
+def test_calibration_upload_gives_up_on_rejection():
+    """A 4xx answer will not change on retry"""
+    from agent.local_agent import _upload_calibration
+
+    with (
+        patch(
+            "agent.local_agent.requests.post", return_value=_response(404)
+        ) as mock_post,
+        patch("agent.local_agent.time.sleep") as mock_sleep,
+    ):
+        assert _upload_calibration("http://backend/x", {"run_id": "r"}) is False
+
+    assert mock_post.call_count == 1
+    mock_sleep.assert_not_called()
+
+
+def test_send_heartbeat_reports_clock_offset():
+    """Test the clock offset from one heartbeat is sent with the next"""
+    from agent import local_agent
+
+    now = time.time()
+    responses = [
+        Mock(
+            status_code=200,
+            json=Mock(
+                return_value={
+                    "status": "ok",
+                    "commands": [],
+                    "long_poll": True,
+                    "server_received": now + 5.0,
+                    "server_sent": now + 5.0,
+                }
+            ),
+        ),
+        Mock(
+            status_code=200,
+            json=Mock(return_value={"status": "stopped", "message": "Session stopped"}),
+        ),
+    ]
+
+    with (
+        patch("agent.local_agent.requests.post", side_effect=responses) as mock_post,
+        patch("agent.local_agent.CommandExecutor") as mock_executor,
+        patch.object(local_agent, "current_session_uid", "clock-session"),
+        patch.object(local_agent, "clock_filter", local_agent.ClockFilter()),
+    ):
+        mock_executor.return_value.batch_results = False
+        local_agent.send_heartbeat()
+
+    assert "clock" not in mock_post.call_args_list[0][1]["json"]
+    clock = mock_post.call_args_list[1][1]["json"]["clock"]
+    assert clock["offset"] == pytest.approx(5.0, abs=0.5)
+    assert clock["samples"] == 1
@@ -0,0 +1,118 @@
+"""
+Unit tests for agent/point_sampler.py
+"""
+
+import sys
+import os
+from unittest.mock import Mock
+
+import numpy as np
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from agent.point_sampler import robust_center, sample_point
+
+
+class FakeClock:
+    """Monotonic clock advanced by sleep and by frame analysis"""
+
+    def __init__(self):
+        self.now = 50.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_adapter(clock, results, cost=0.0):
+    """Adapter returning the given results in turn, each taking `cost` seconds"""
+    results = iter(results)
+
+    def analyze(frame):
+        clock.now += cost
+        return next(results)
+
+    adapter = Mock()
+    adapter.analyze_frame.side_effect = analyze
+    return adapter
+
+
+def eyes(x, y, ear=0.3, blink=False):
+    return {"eye_centers": [(x - 20, y), (x + 20, y)], "ear": ear, "blink": blink}
+
+
+def test_sample_point_takes_exactly_the_duration():
+    """Fast analysis still ends at the deadline, not after the last sample"""
+    clock = FakeClock()
+    adapter = make_adapter(clock, [eyes(300, 200)] * 10)
+
+    sample = sample_point(Mock(), adapter, 1.0, 10, clock=clock, sleep=clock.sleep)
+
+    assert clock.now == pytest.approx(51.0)
+    assert sample["samples"] == 10
+    assert (sample["x"], sample["y"]) == (300.0, 200.0)
+    assert sample["dispersion"] == 0.0
+
+
+def test_sample_point_slow_analysis_stops_at_deadline():
+    """Frames slower than their slot do not stretch the point"""
+    clock = FakeClock()
+    adapter = make_adapter(clock, [eyes(300, 200)] * 10, cost=0.25)
+
+    sample = sample_point(Mock(), adapter, 1.0, 10, clock=clock, sleep=clock.sleep)
+
+    assert sample["frames"] == 4
+    assert sample["samples"] == 4
+    assert clock.now == pytest.approx(51.0)
+
+
+def test_sample_point_rejects_blinks_and_outliers():
+    """A blink frame and a tracking glitch do not move the estimate"""
+    clock = FakeClock()
+    rng = np.random.default_rng(1)
+    results = [
+        eyes(300 + rng.normal(0, 0.5), 200 + rng.normal(0, 0.5)) for _ in range(16)
+    ]
+    results[3] = eyes(300, 215, ear=0.1)  # eyelid closing, before blink flag
+    results[4] = eyes(300, 220, blink=True)
+    results[9] = eyes(360, 240)  # glitch
+    adapter = make_adapter(clock, results)
+
+    sample = sample_point(Mock(), adapter, 0.8, 16, clock=clock, sleep=clock.sleep)
+
+    assert sample["blinks"] == 2
+    assert sample["rejected"] == 1
+    assert sample["samples"] == 13
+    assert sample["x"] == pytest.approx(300, abs=0.5)
+    assert sample["y"] == pytest.approx(200, abs=0.5)
+    assert sample["dispersion"] < 1.5
+
+
+def test_sample_point_without_eyes():
+    """Frames without eyes or with camera errors give an empty sample"""
+    clock = FakeClock()
+    camera = Mock()
+    camera.get_frame.side_effect = [None, RuntimeError("camera gone")] + [Mock()] * 3
+    adapter = make_adapter(clock, [{"eye_centers": []}] * 3)
+
+    sample = sample_point(camera, adapter, 0.5, 5, clock=clock, sleep=clock.sleep)
+
+    assert sample["samples"] == 0
+    assert sample["x"] is None
+    assert sample["frames"] == 5
+
+
+def test_robust_center_keeps_identical_pixels():
+    """Integer eye centres with zero MAD keep neighbouring pixels"""
+    points = [(100, 50)] * 8 + [(101, 50)]
+
+    center = robust_center(points)
+
+    assert center["samples"] == 9
+    assert center["rejected"] == 0
@@ -0,0 +1,124 @@
+"""
+Unit tests for agent/rate_controller.py
+"""
+
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from agent.rate_controller import RateController
+
+
+class FakeClock:
+    """Monotonic clock advanced by the test and by stop_event.wait"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeStopEvent:
+    def __init__(self, clock):
+        self.clock = clock
+        self.waits = []
+
+    def is_set(self):
+        return False
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        self.clock.advance(timeout)
+        return False
+
+
+def _run_frames(rate, clock, stop_event, count, cost):
+    for _ in range(count):
+        rate.frame_started()
+        with rate.stage("analyze"):
+            clock.advance(cost)
+        rate.wait(stop_event)
+
+
+def test_frames_follow_deadlines_without_drift():
+    """Test processing time is absorbed into the interval instead of added"""
+    clock = FakeClock()
+    stop_event = FakeStopEvent(clock)
+    rate = RateController(20.0, clock=clock, adapt_every=1000)
+
+    _run_frames(rate, clock, stop_event, 40, cost=0.02)
+
+    assert abs(clock.now - (100.0 + 40 * 0.05)) < 1e-9
+    assert all(abs(wait - 0.03) < 1e-9 for wait in stop_event.waits)
+
+    metadata = rate.take_metadata()
+    assert metadata["frames"] == 40
+    assert abs(metadata["achieved_fps"] - 20.0) < 1e-6
+    assert metadata["jitter_ms"] < 1e-6
+    assert metadata["dropped_frames"] == 0
+
+
+def test_overrun_counts_dropped_frames():
+    """Test missed intervals are skipped and counted, not replayed"""
+    clock = FakeClock()
+    stop_event = FakeStopEvent(clock)
+    rate = RateController(20.0, clock=clock, adapt_every=1000)
+
+    rate.frame_started()
+    clock.advance(0.135)  # 2.7 intervals of work
+    rate.wait(stop_event)
+
+    # The 100.05 slot is skipped; the frame due at 100.10 starts at once.
+    assert stop_event.waits == []
+    assert rate.take_metadata()["dropped_frames"] == 1
+
+    # After that the loop is back on the original grid.
+    _run_frames(rate, clock, stop_event, 1, cost=0.005)
+    assert abs(clock.now - 100.15) < 1e-9
+
+
+def test_slow_frames_lower_scale_before_fps():
+    """Test an overloaded loop shrinks inference first, then the frame rate"""
+    clock = FakeClock()
+    stop_event = FakeStopEvent(clock)
+    rate = RateController(20.0, min_scale=0.5, clock=clock, adapt_every=5)
+
+    _run_frames(rate, clock, stop_event, 5, cost=0.06)
+    assert rate.scale == 0.75
+    assert rate.fps == 20.0
+
+    _run_frames(rate, clock, stop_event, 10, cost=0.06)
+    assert rate.scale == 0.5
+    assert rate.fps == 20.0
+
+    _run_frames(rate, clock, stop_event, 5, cost=0.06)
+    assert rate.scale == 0.5
+    assert rate.fps < 20.0
+
+    # Cheap frames restore the rate first, then the resolution.
+    for _ in range(20):
+        _run_frames(rate, clock, stop_event, 5, cost=0.001)
+    assert rate.fps == 20.0
+    assert rate.scale == 1.0
+
+
+def test_fps_never_drops_below_minimum():
+    """Test a hopelessly slow machine stays at the minimum frame rate"""
+    clock = FakeClock()
+    stop_event = FakeStopEvent(clock)
+    rate = RateController(20.0, min_fps=5.0, min_scale=1.0, clock=clock, adapt_every=5)
+
+    for _ in range(10):
+        _run_frames(rate, clock, stop_event, 5, cost=1.0)
+
+    assert rate.fps == 5.0
+    metadata = rate.take_metadata()
+    assert metadata["effective_fps"] == 5.0
+    assert metadata["dropped_frames"] > 0
+    assert metadata["stage_ms"]["analyze"] == 1000.0
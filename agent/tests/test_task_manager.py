@@ -2,8 +2,11 @@
 Unit tests for agent/task_manager.py
 """
 
+import time
 import pytest
-from agent.task_manager import parse_args
+import requests
+from unittest.mock import Mock
+from agent.task_manager import EventBuffer, parse_args
 
 
 def test_parse_args_required_session_uid():
@@ -29,6 +32,10 @@ def test_parse_args_with_session_uid():
         assert args.go_prob == 0.8
         assert args.stim_duration == 0.5
         assert args.isi == 1.0
+        assert args.response_window == 1.0
+        assert args.seed is None
+        assert args.batch_size == 100
+        assert args.flush_interval == 30.0
     finally:
         sys.argv = original_argv
 
@@ -63,3 +70,129 @@ def test_parse_args_with_custom_values():
         assert args.isi == 0.5
     finally:
         sys.argv = original_argv
+
+
+def _event(i):
+    return {"session_uid": "s", "timestamp": float(i), "event_type": "response"}
+
+
+def test_event_buffer_batches_events():
+    """Test that 400 events are uploaded in order in a handful of requests."""
+    post = Mock()
+    buffer = EventBuffer("http://x/session/events/batch", max_batch=100, post=post)
+    for i in range(400):
+        buffer.add(_event(i))
+    assert buffer.close()
+
+    assert buffer.sent == 400
+    assert post.call_count == buffer.requests <= 5
+    uploaded = [
+        e for call in post.call_args_list for e in call.kwargs["json"]["events"]
+    ]
+    assert [e["timestamp"] for e in uploaded] == list(range(400))
+    assert post.call_args.args[0] == "http://x/session/events/batch"
+
+
+def test_event_buffer_flushes_on_interval():
+    """Test that a partial batch is uploaded after the flush interval."""
+    post = Mock()
+    buffer = EventBuffer("http://x", max_batch=100, flush_interval=0.05, post=post)
+    buffer.add(_event(0))
+    for _ in range(100):
+        if buffer.sent:
+            break
+        time.sleep(0.01)
+    assert buffer.sent == 1
+    assert buffer.close()
+    assert post.call_count == 1
+
+
+def test_event_buffer_retries_failed_batches():
+    """Test that a failed upload is retried without losing or reordering events."""
+    ok = Mock()
+    post = Mock(side_effect=[requests.ConnectionError("down"), ok, ok])
+    buffer = EventBuffer(
+        "http://x", max_batch=2, flush_interval=10, backoff=0, post=post
+    )
+    for i in range(3):
+        buffer.add(_event(i))
+    assert buffer.close()
+
+    assert buffer.sent == 3
+    batches = [call.kwargs["json"]["events"] for call in post.call_args_list]
+    assert [e["timestamp"] for e in batches[0]] == [0.0, 1.0]
+    assert batches[0] == batches[1]
+    assert [e["timestamp"] for e in batches[2]] == [2.0]
+
+
+def test_event_buffer_gives_up_on_close():
+    """Test that close reports events that could not be delivered."""
+    post = Mock(side_effect=requests.ConnectionError("down"))
+    buffer = EventBuffer(
+        "http://x", max_batch=10, flush_interval=10, attempts=2, backoff=0, post=post
+    )
+    buffer.add(_event(0))
+    assert not buffer.close()
+    assert buffer.pending() == 1
+    assert post.call_count == 2
+    with pytest.raises(RuntimeError):
+        buffer.add(_event(1))
+
+
+def test_event_buffer_sends_clock_offset():
+    """Test that each upload carries the clock offset from the previous one."""
+    now = time.time()
+    resp = Mock()
+    resp.json.return_value = {"server_received": now + 2.0, "server_sent": now + 2.0}
+    post = Mock(return_value=resp)
+    buffer = EventBuffer("http://x", max_batch=1, flush_interval=10, post=post)
+    buffer.add(_event(0))
+    buffer.add(_event(1))
+    assert buffer.close()
+
+    first, second = [call.kwargs["json"] for call in post.call_args_list]
+    assert "clock" not in first
+    assert second["clock"]["offset"] == pytest.approx(2.0, abs=0.5)
+
+
+def _http_error(status):
+    resp = Mock(status_code=status)
+    resp.raise_for_status.side_effect = requests.HTTPError(
+        f"{status} error", response=resp
+    )
+    return resp
+
+
+def test_event_buffer_drops_rejected_batches():
+    """Test that a 4xx batch is dropped and later events still go out."""
+    ok = Mock()
+    post = Mock(side_effect=[_http_error(422), ok])
+    buffer = EventBuffer(
+        "http://x", max_batch=2, flush_interval=10, backoff=0, post=post
+    )
+    for i in range(4):
+        buffer.add(_event(i))
+    assert not buffer.close()
+
+    assert post.call_count == 2
+    assert buffer.dropped == 2
+    assert buffer.sent == 2
+    assert buffer.pending() == 0
+    second = post.call_args_list[1].kwargs["json"]["events"]
+    assert [e["timestamp"] for e in second] == [2.0, 3.0]
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_event_buffer_retries_throttled_and_server_errors(status):
+    """Test that 429 and 5xx answers are retried rather than dropped."""
+    ok = Mock()
+    post = Mock(side_effect=[_http_error(status), ok])
+    buffer = EventBuffer(
+        "http://x", max_batch=1, flush_interval=10, backoff=0, post=post
+    )
+    buffer.add(_event(0))
+    assert buffer.close()
+
+    assert post.call_count == 2
+    assert buffer.dropped == 0
+    assert buffer.sent == 1
@@ -0,0 +1,418 @@
+"""
+Gaze calibration engine.
+
+Maps raw eye centres (camera pixels) to screen targets with one of three
+models:
+
+- affine:      X = a0 + a1 u + a2 v
+- poly2:       X = a0 + a1 u + a2 v + a3 u^2 + a4 u v + a5 v^2
+- homography:  X = (h0 u + h1 v + h2) / (h6 u + h7 v + 1)
+
+where (u, v) are the eye centres normalised around the first calibration
+point. Every model is updated with recursive least squares as each point
+arrives, so fit quality is available after every point. The model with the
+lowest leave-one-out error is selected, and calibration can stop early
+once that error is small and no longer improving.
+
+Transforms are plain dicts so they can be saved as JSON. They always carry
+the affine "A"/"b" (in raw pixels) for consumers that only understand the
+affine map.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+MODELS = ("affine", "poly2", "homography")
+
+# Normalisation of raw eye centres: pixels per unit around the first point.
+RAW_SCALE = 50.0
+
+# Initial RLS covariance; a weak prior equivalent to a tiny ridge penalty.
+RLS_DELTA = 1e6
+
+# Convergence: error in percent of the screen, minimum points before stopping.
+CALIBRATION_TARGET_ERROR = float(os.getenv("CALIBRATION_TARGET_ERROR", "5.0"))
+CALIBRATION_CONVERGENCE_TOLERANCE = float(
+    os.getenv("CALIBRATION_CONVERGENCE_TOLERANCE", "1.0")
+)
+CALIBRATION_MIN_POINTS = int(os.getenv("CALIBRATION_MIN_POINTS", "5"))
+
+# A saved calibration is reused when every validation point lands within
+# this distance (percent of the screen) of its target.
+CALIBRATION_VALIDATION_MAX_ERROR = float(
+    os.getenv("CALIBRATION_VALIDATION_MAX_ERROR", "7.5")
+)
+
+# Eye-centre dispersion (pixels) at or below this counts as a perfectly
+# steady fixation when weighting a point.
+DISPERSION_FLOOR_PX = 1.0
+
+
+def target_scale(targets) -> float:
+    """Calibration targets are percentages (0-100) or already normalised (0-1)."""
+    return 100.0 if np.max(np.abs(np.asarray(targets, dtype=float))) > 1.0 else 1.0
+
+
+def point_weight(
+    samples: Optional[int], dispersion: Optional[float], requested
+) -> float:
+    """
+    Fit weight of a sampled calibration point: 1.0 for a full, steady fixation.
+
+    Follows the inverse variance of the mean: proportional to the share of
+    requested samples that were kept and inversely proportional to the squared
+    dispersion above DISPERSION_FLOOR_PX. Points without sampling statistics
+    (older agents) get 1.0.
+    """
+    if samples is None:
+        return 1.0
+    if samples <= 0:
+        return 0.0
+    coverage = min(1.0, samples / max(1, requested))
+    dispersion = max(dispersion or 0.0, DISPERSION_FLOOR_PX)
+    return coverage * (DISPERSION_FLOOR_PX / dispersion) ** 2
+
+
+class CalibrationModel(ABC):
+    """Base class: normalisation, RLS state and (de)serialisation."""
+
+    name = ""
+    n_params = 0
+    min_points = 0
+
+    def __init__(self, center, scale: float = RAW_SCALE, params=None):
+        self.center = np.asarray(center, dtype=float)
+        self.scale = float(scale)
+        self.params = (
+            np.zeros(self._param_shape)
+            if params is None
+            else np.asarray(params, dtype=float).reshape(self._param_shape)
+        )
+        self.P = np.eye(self.n_params) * RLS_DELTA
+        self.points = 0
+
+    @property
+    def _param_shape(self):
+        return (self.n_params, 2)
+
+    def normalize(self, raw) -> np.ndarray:
+        return (np.atleast_2d(np.asarray(raw, dtype=float)) - self.center) / self.scale
+
+    @abstractmethod
+    def predict(self, raw) -> np.ndarray:
+        """Map raw eye centres to calibration target units."""
+
+    @abstractmethod
+    def update(self, raw, target, weight: float = 1.0):
+        """RLS update with one point."""
+
+    @abstractmethod
+    def fit(self, raw, targets, weights=None) -> "CalibrationModel":
+        """Batch weighted least squares on the given points (new instance)."""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.name,
+            "params": self.params.tolist(),
+            "raw_center": self.center.tolist(),
+            "raw_scale": self.scale,
+        }
+
+    def affine(self):
+        """Best affine approximation (A, b) in raw pixels around the centre."""
+        eps = 1.0
+        c = self.center
+        base = self.predict(c)[0]
+        A = np.column_stack(
+            [
+                (self.predict(c + [eps, 0.0])[0] - base) / eps,
+                (self.predict(c + [0.0, eps])[0] - base) / eps,
+            ]
+        )
+        return A, base - A @ c
+
+
+def _rls_step(P, theta, x, y, weight):
+    """One weighted RLS update of theta (k, m) with regressor x (k,)."""
+    Px = P @ x
+    gain = weight * Px / (1.0 + weight * x @ Px)
+    theta += np.outer(gain, y - x @ theta)
+    P -= np.outer(gain, Px)
+
+
+class LinearModel(CalibrationModel):
+    """Models linear in their parameters, shared by both screen axes."""
+
+    @abstractmethod
+    def features(self, uv: np.ndarray) -> np.ndarray:
+        """Regressors of normalised eye centres, one row per point."""
+
+    def predict(self, raw) -> np.ndarray:
+        return self.features(self.normalize(raw)) @ self.params
+
+    def update(self, raw, target, weight: float = 1.0):
+        x = self.features(self.normalize(raw))[0]
+        _rls_step(self.P, self.params, x, np.asarray(target, dtype=float), weight)
+        self.points += 1
+
+    def fit(self, raw, targets, weights=None):
+        X = self.features(self.normalize(raw))
+        w = np.sqrt(np.ones(len(X)) if weights is None else np.asarray(weights))
+        params, *_ = np.linalg.lstsq(
+            X * w[:, None], np.asarray(targets) * w[:, None], rcond=None
+        )
+        return type(self)(self.center, self.scale, params)
+
+
+class AffineModel(LinearModel):
+    name = "affine"
+    n_params = 3
+    min_points = 3
+
+    def features(self, uv):
+        return np.column_stack([np.ones(len(uv)), uv[:, 0], uv[:, 1]])
+
+
+class Poly2Model(LinearModel):
+    name = "poly2"
+    n_params = 6
+    min_points = 6
+
+    def features(self, uv):
+        u, v = uv[:, 0], uv[:, 1]
+        return np.column_stack([np.ones(len(uv)), u, v, u * u, u * v, v * v])
+
+
+class HomographyModel(CalibrationModel):
+    """Projective map, estimated from its linearised (DLT) equations."""
+
+    name = "homography"
+    n_params = 8
+    min_points = 4
+
+    @property
+    def _param_shape(self):
+        return (self.n_params,)
+
+    @staticmethod
+    def _rows(uv, targets):
+        u, v = uv[:, 0], uv[:, 1]
+        X, Y = targets[:, 0], targets[:, 1]
+        zeros, ones = np.zeros(len(uv)), np.ones(len(uv))
+        rows_x = np.column_stack([u, v, ones, zeros, zeros, zeros, -X * u, -X * v])
+        rows_y = np.column_stack([zeros, zeros, zeros, u, v, ones, -Y * u, -Y * v])
+        return np.vstack([rows_x, rows_y]), np.concatenate([X, Y])
+
+    def predict(self, raw):
+        uv = self.normalize(raw)
+        h = self.params
+        u, v = uv[:, 0], uv[:, 1]
+        denom = h[6] * u + h[7] * v + 1.0
+        return np.column_stack(
+            [(h[0] * u + h[1] * v + h[2]) / denom, (h[3] * u + h[4] * v + h[5]) / denom]
+        )
+
+    def update(self, raw, target, weight: float = 1.0):
+        rows, values = self._rows(
+            self.normalize(raw), np.atleast_2d(np.asarray(target, dtype=float))
+        )
+        theta = self.params[:, None]
+        for x, y in zip(rows, values):
+            _rls_step(self.P, theta, x, np.array([y]), weight)
+        self.points += 1
+
+    def fit(self, raw, targets, weights=None):
+        rows, values = self._rows(self.normalize(raw), np.asarray(targets, dtype=float))
+        w = np.ones(len(raw)) if weights is None else np.asarray(weights, dtype=float)
+        w = np.sqrt(np.concatenate([w, w]))
+        params, *_ = np.linalg.lstsq(rows * w[:, None], values * w, rcond=None)
+        return type(self)(self.center, self.scale, params)
+
+
+MODEL_CLASSES = {cls.name: cls for cls in (AffineModel, Poly2Model, HomographyModel)}
+
+
+def model_from_transform(transform: Dict[str, Any]) -> CalibrationModel:
+    """Rebuild the fitted model of a saved transform."""
+    name = transform.get("model")
+    if name is None:
+        # Transforms saved before the engine: affine A/b in raw pixels.
+        A = np.asarray(transform["A"], dtype=float)
+        b = np.asarray(transform["b"], dtype=float)
+        return AffineModel([0.0, 0.0], 1.0, np.vstack([b, A.T]))
+    return MODEL_CLASSES[name](
+        transform["raw_center"], transform["raw_scale"], transform["params"]
+    )
+
+
+def apply_transform(transform: Dict[str, Any], raw) -> np.ndarray:
+    """Map an (n, 2) array of raw eye centres to calibration target units."""
+    return model_from_transform(transform).predict(raw)
+
+
+def validation_error(
+    transform: Dict[str, Any], screen_x, screen_y, raw_x, raw_y
+) -> float:
+    """Distance between a mapped eye centre and its target, in percent of the screen."""
+    target = np.array([float(screen_x), float(screen_y)])
+    predicted = apply_transform(transform, [[raw_x, raw_y]])[0]
+    scale = transform.get("target_scale") or target_scale([target])
+    return float(np.linalg.norm(predicted - target) * 100.0 / scale)
+
+
+def transform_disagreement(a: Dict[str, Any], b: Dict[str, Any], raw, targets) -> float:
+    """
+    Largest distance between where two transforms map the same raw eye
+    centres, in percent of the screen (scale taken from `targets`).
+    """
+    raw = np.asarray(raw, dtype=float).reshape(-1, 2)
+    if len(raw) == 0:
+        return 0.0
+    distance = np.linalg.norm(apply_transform(a, raw) - apply_transform(b, raw), axis=1)
+    return float(distance.max() * 100.0 / target_scale(targets))
+
+
+class CalibrationEngine:
+    """
+    Incremental calibration: feed points with add_point, read quality after
+    each one, and take the selected model's transform with transform().
+    """
+
+    def __init__(self, models: Sequence[str] = MODELS):
+        self.model_names = tuple(models)
+        self.models: Dict[str, CalibrationModel] = {}
+        self.raw: List[List[float]] = []
+        self.targets: List[List[float]] = []
+        self.weights: List[float] = []
+        self.history: List[Optional[float]] = []
+
+    @classmethod
+    def from_points(cls, points, models: Sequence[str] = MODELS):
+        """Engine fed with (screen_x, screen_y, raw_x, raw_y[, weight]) tuples."""
+        engine = cls(models)
+        for point in points:
+            engine.add_point(*point)
+        return engine
+
+    def __len__(self):
+        return len(self.raw)
+
+    def add_point(
+        self, screen_x, screen_y, raw_x, raw_y, weight: float = 1.0
+    ) -> Dict[str, Any]:
+        """Add one calibration point and return the updated quality."""
+        raw = [float(raw_x), float(raw_y)]
+        target = [float(screen_x), float(screen_y)]
+        if not self.models:
+            self.models = {name: MODEL_CLASSES[name](raw) for name in self.model_names}
+        for model in self.models.values():
+            model.update(raw, target, weight)
+        self.raw.append(raw)
+        self.targets.append(target)
+        self.weights.append(float(weight))
+        quality = self.quality()
+        self.history.append(quality["error"])
+        quality["converged"] = self._converged()
+        return quality
+
+    def _error_units(self) -> float:
+        """Multiplier from target units to percent of the screen."""
+        return 100.0 / target_scale(self.targets)
+
+    def loo_error(self, name: str) -> Optional[float]:
+        """Leave-one-out mean Euclidean error, in percent of the screen."""
+        model = self.models.get(name)
+        n = len(self.raw)
+        if model is None or n <= model.min_points:
+            return None
+        raw = np.asarray(self.raw)
+        targets = np.asarray(self.targets)
+        weights = np.asarray(self.weights)
+        errors = np.empty(n)
+        keep = np.ones(n, dtype=bool)
+        for i in range(n):
+            keep[i] = False
+            fitted = model.fit(raw[keep], targets[keep], weights[keep])
+            errors[i] = np.linalg.norm(fitted.predict(raw[i])[0] - targets[i])
+            keep[i] = True
+        if not np.all(np.isfinite(errors)):
+            return None
+        return float(np.average(errors, weights=weights) * self._error_units())
+
+    def fit_error(self, name: str) -> Optional[float]:
+        """Weighted mean training error of the running (RLS) model."""
+        model = self.models.get(name)
+        if model is None or len(self.raw) < model.min_points:
+            return None
+        residuals = np.linalg.norm(
+            model.predict(np.asarray(self.raw)) - np.asarray(self.targets), axis=1
+        )
+        return float(np.average(residuals, weights=self.weights) * self._error_units())
+
+    def select_model(self, cv_errors: Optional[Dict[str, Optional[float]]] = None):
+        """Model with the lowest leave-one-out error; affine until CV is possible."""
+        if not self.models:
+            return None
+        if cv_errors is None:
+            cv_errors = {name: self.loo_error(name) for name in self.model_names}
+        scored = [
+            (cv_errors[name], index, name)
+            for index, name in enumerate(self.model_names)
+            if cv_errors[name] is not None
+        ]
+        if scored:
+            return min(scored)[2]
+        for name in self.model_names:
+            if len(self.raw) >= self.models[name].min_points:
+                return name
+        return None
+
+    def quality(self) -> Dict[str, Any]:
+        loo = {name: self.loo_error(name) for name in self.model_names}
+        best = self.select_model(loo)
+        error = loo.get(best) if best else None
+        return {
+            "points": len(self.raw),
+            "model": best,
+            "error": error,
+            "fit_error": self.fit_error(best) if best else None,
+            "cv_error": loo,
+        }
+
+    def _converged(self) -> bool:
+        if len(self.history) < max(2, CALIBRATION_MIN_POINTS):
+            return False
+        current, previous = self.history[-1], self.history[-2]
+        if current is None or previous is None:
+            return False
+        return (
+            current <= CALIBRATION_TARGET_ERROR
+            and abs(current - previous) <= CALIBRATION_CONVERGENCE_TOLERANCE
+        )
+
+    def transform(self) -> Dict[str, Any]:
+        """
+        The selected model as a JSON-ready transform.
+
+        Raises:
+            ValueError: If there are too few points for any model
+        """
+        quality = self.quality()
+        best = quality["model"]
+        if best is None:
+            raise ValueError(
+                f"At least {AffineModel.min_points} calibration points required"
+            )
+        quality["converged"] = self._converged()
+        model = self.models[best]
+        A, b = self.models.get("affine", model).affine()
+        return {
+            **model.to_dict(),
+            "A": A.tolist(),
+            "b": b.tolist(),
+            "target_scale": target_scale(self.targets),
+            "quality": quality,
+        }
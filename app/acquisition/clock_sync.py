@@ -0,0 +1,86 @@
+"""
+Clock offset estimation between a client and the backend.
+
+Acquisition samples carry the agent's time.time(), task events the clock of
+whatever client logged them, and the session start the backend's. Each
+client estimates how far its clock is from the backend's from requests it
+makes anyway (agent heartbeats, task event uploads), NTP style: the client
+notes when it sent the request (t0) and got the answer (t3), the backend
+answers with when it received (t1) and answered (t2) it. Then
+
+    offset = ((t1 - t0) + (t2 - t3)) / 2    backend time - client time
+    delay = (t3 - t0) - (t2 - t1)           network round trip
+
+The time the backend held the request (long-poll) is excluded from the
+delay. Asymmetric routes bias the offset by at most delay / 2, so as in NTP
+the sample with the smallest round trip among the recent ones is used. The
+client sends its estimate along with its next request and the backend stores
+it per session (models.SessionClockSync); feature computation adds the
+offset to the client's timestamps.
+"""
+
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+# Recent exchanges considered by ClockFilter.
+CLOCK_FILTER_SIZE = 8
+
+
+def ntp_sample(t0: float, t1: float, t2: float, t3: float) -> Tuple[float, float]:
+    """
+    Offset and round trip of one request (all times in seconds).
+
+    Returns:
+        (offset, delay): backend minus client time, and the network round trip
+    """
+    offset = ((t1 - t0) + (t2 - t3)) / 2.0
+    delay = max(0.0, (t3 - t0) - (t2 - t1))
+    return offset, delay
+
+
+def server_times(received: float) -> Dict[str, float]:
+    """t1/t2 fields for a response to a request received at `received`."""
+    return {"server_received": received, "server_sent": time.time()}
+
+
+class ClockFilter:
+    """Keeps the recent exchanges and picks the one with the smallest delay."""
+
+    def __init__(self, size: int = CLOCK_FILTER_SIZE):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, t0: float, t1: float, t2: float, t3: float):
+        self.samples.append(ntp_sample(t0, t1, t2, t3))
+        self.count += 1
+
+    def add_response(self, t0: float, t3: float, data: Any) -> bool:
+        """
+        Add an exchange from a response carrying server_received and
+        server_sent (see server_times). Responses from backends that do not
+        report them are ignored.
+
+        Returns:
+            True if a sample was added
+        """
+        try:
+            t1 = float(data["server_received"])
+            t2 = float(data["server_sent"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        self.add(t0, t1, t2, t3)
+        return True
+
+    def estimate(self) -> Optional[Dict[str, Any]]:
+        """
+        Current estimate, in the form sent to the backend.
+
+        Returns:
+            Dictionary with offset, round_trip (seconds) and samples (exchanges
+            seen), or None before the first exchange
+        """
+        if not self.samples:
+            return None
+        offset, delay = min(self.samples, key=lambda sample: sample[1])
+        return {"offset": offset, "round_trip": delay, "samples": self.count}
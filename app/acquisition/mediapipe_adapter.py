@@ -6,6 +6,9 @@ from .eye_tracker_adapter import EyeTrackerAdapter
 
 
 class MediaPipeAdapter(EyeTrackerAdapter):
+    # analyze_frame accepts a scale < 1 to run FaceMesh on a smaller image.
+    supports_inference_scale = True
+
     def __init__(
         self,
         ear_threshold_ratio: float = 0.7,
@@ -45,6 +48,16 @@ class MediaPipeAdapter(EyeTrackerAdapter):
     def initialize(self):
         pass
 
+    def reset(self):
+        """Forget the blink baseline and counters before a new session."""
+        self.ear_history_calib = []
+        self.calibrated = False
+        self.baseline_ear = None
+        self.ear_threshold = None
+        self.frame_counter = 0
+        self.blink_count = 0
+        self.frames_since_blink = self.refractory_frames
+
     def calibrate(self):
         pass
 
@@ -61,8 +74,19 @@ class MediaPipeAdapter(EyeTrackerAdapter):
         center = (int(np.mean(xs)), int(np.mean(ys)))
         return ear, center
 
-    def analyze_frame(self, frame):
-        img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def analyze_frame(self, frame, scale: float = 1.0):
+        """
+        Analyse one BGR frame. With scale < 1 FaceMesh runs on a downscaled
+        copy; landmarks are normalised, so coordinates stay in full-frame
+        pixels either way.
+        """
+        if scale < 1.0:
+            small = cv2.resize(
+                frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+            img_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        else:
+            img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         results = self.face_mesh.process(img_rgb)
         pupil_size = None
 
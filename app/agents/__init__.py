@@ -0,0 +1 @@
+# Agent coordination package
@@ -0,0 +1,53 @@
+"""
+Deadline queue used by the in-memory agent registry to expire state.
+
+Entries live in a min-heap keyed by deadline. Rescheduling a key pushes a new
+entry and leaves the old one in place; stale entries are recognised and
+skipped when they reach the top (lazy deletion), so schedule and pop are both
+O(log n) amortized.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class ExpiryQueue:
+    def __init__(self):
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def schedule(self, key: Hashable, ttl: float, now: Optional[float] = None):
+        """(Re)schedule key to expire ttl seconds from now."""
+        deadline = (time.monotonic() if now is None else now) + ttl
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, next(self._counter), key))
+
+    def cancel(self, key: Hashable):
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def pop_expired(self, now: Optional[float] = None) -> List[Hashable]:
+        """Remove and return every key whose current deadline has passed."""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    expired.append(key)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+            self._deadlines.clear()
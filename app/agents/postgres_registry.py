@@ -0,0 +1,331 @@
+"""
+Postgres-backed agent registry.
+
+State lives in the agent_* tables so every uvicorn worker and replica sees the
+same agents, commands and results. Writers send NOTIFY on commit and each
+process runs one LISTEN connection on a daemon thread that forwards the
+notifications to the registered listeners.
+"""
+
+import json
+import select
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import delete, exists, func, select as sql_select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.agents.registry import AgentRegistry
+from app.db import models
+from app.db.database import DATABASE_URL, SessionLocal
+
+COMMAND_CHANNEL = "agent_command_queued"
+RESULT_CHANNEL = "agent_command_result"
+
+
+class PostgresAgentRegistry(AgentRegistry):
+    blocking = True
+
+    def __init__(
+        self, database_url: str = DATABASE_URL, session_factory=SessionLocal, **ttls
+    ):
+        super().__init__(**ttls)
+        self.database_url = database_url
+        self.session_factory = session_factory
+        self._listener_thread: Optional[threading.Thread] = None
+        self._listener_stop = threading.Event()
+        self.listening = threading.Event()
+
+    @contextmanager
+    def _session(self):
+        db = self.session_factory()
+        try:
+            yield db
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _notify(db, channel: str, payload: str):
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": channel, "payload": payload},
+        )
+
+    def start(self):
+        if self._listener_thread and self._listener_thread.is_alive():
+            return
+        self._listener_stop.clear()
+        self._listener_thread = threading.Thread(
+            target=self._listen_loop, name="agent-registry-listener", daemon=True
+        )
+        self._listener_thread.start()
+
+    def stop(self):
+        self._listener_stop.set()
+        if self._listener_thread:
+            self._listener_thread.join(timeout=5)
+        self._listener_thread = None
+        self.listening.clear()
+
+    def _listen_loop(self):
+        while not self._listener_stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(self.database_url)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {COMMAND_CHANNEL}; LISTEN {RESULT_CHANNEL};")
+                self.listening.set()
+
+                while not self._listener_stop.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notification = conn.notifies.pop(0)
+                        self._dispatch(notification.channel, notification.payload)
+            except psycopg2.Error as e:
+                print(f"⚠️  Agent registry listener error: {e}")
+                self.listening.clear()
+                self._listener_stop.wait(1.0)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _dispatch(self, channel: str, payload: str):
+        try:
+            if channel == COMMAND_CHANNEL:
+                self._notify_command(payload)
+            elif channel == RESULT_CHANNEL:
+                self._notify_result(payload)
+        except Exception as e:
+            print(f"⚠️  Agent registry listener callback failed: {e}")
+
+    def touch(self, agent_key: str) -> datetime:
+        now = datetime.now()
+        stmt = insert(models.AgentPresence).values(
+            agent_key=agent_key, registered_at=now, last_seen=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.AgentPresence.agent_key],
+            set_={"last_seen": now},
+        )
+        with self._session() as db:
+            db.execute(stmt)
+        return now
+
+    def last_seen(self, agent_key: str) -> Optional[datetime]:
+        with self._session() as db:
+            return db.execute(
+                sql_select(models.AgentPresence.last_seen).where(
+                    models.AgentPresence.agent_key == agent_key
+                )
+            ).scalar_one_or_none()
+
+    def active_agents(self, timeout: timedelta) -> List[str]:
+        cutoff = datetime.now() - timeout
+        with self._session() as db:
+            return list(
+                db.execute(
+                    sql_select(models.AgentPresence.agent_key)
+                    .where(models.AgentPresence.last_seen >= cutoff)
+                    .order_by(models.AgentPresence.registered_at)
+                ).scalars()
+            )
+
+    def remove(self, agent_key: str) -> bool:
+        with self._session() as db:
+            removed = db.execute(
+                delete(models.AgentPresence)
+                .where(models.AgentPresence.agent_key == agent_key)
+                .returning(models.AgentPresence.agent_key)
+            ).first()
+            if removed is None:
+                return False
+            db.execute(
+                delete(models.AgentCommand).where(
+                    models.AgentCommand.agent_key == agent_key
+                )
+            )
+        return True
+
+    def expire(self) -> Dict[str, int]:
+        now = datetime.now()
+
+        def cutoff(ttl: float) -> datetime:
+            return now - timedelta(seconds=ttl)
+
+        evicted = {}
+        with self._session() as db:
+            stale_agents = list(
+                db.execute(
+                    delete(models.AgentPresence)
+                    .where(models.AgentPresence.last_seen < cutoff(self.presence_ttl))
+                    .returning(models.AgentPresence.agent_key)
+                ).scalars()
+            )
+            evicted["agents"] = len(stale_agents)
+            evicted["commands"] = db.execute(
+                delete(models.AgentCommand).where(
+                    (models.AgentCommand.created_at < cutoff(self.command_ttl))
+                    | models.AgentCommand.agent_key.in_(stale_agents)
+                )
+            ).rowcount
+            evicted["results"] = db.execute(
+                delete(models.AgentCommandResult).where(
+                    models.AgentCommandResult.created_at < cutoff(self.result_ttl)
+                )
+            ).rowcount
+            evicted["stopped"] = db.execute(
+                delete(models.AgentStop).where(
+                    models.AgentStop.stopped_at < cutoff(self.stopped_ttl)
+                )
+            ).rowcount
+            evicted["pairings"] = db.execute(
+                delete(models.AgentPairing).where(
+                    models.AgentPairing.paired_at < cutoff(self.pairing_ttl)
+                )
+            ).rowcount
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        gauges = {
+            "agents": models.AgentPresence,
+            "queued_commands": models.AgentCommand,
+            "results": models.AgentCommandResult,
+            "stopped_agents": models.AgentStop,
+            "pairings": models.AgentPairing,
+        }
+        with self._session() as db:
+            return {
+                name: db.execute(
+                    sql_select(func.count()).select_from(model)
+                ).scalar_one()
+                for name, model in gauges.items()
+            }
+
+    def pair(self, session_uid: str, agent_id: str):
+        stmt = insert(models.AgentPairing).values(
+            session_uid=session_uid, agent_id=agent_id, paired_at=datetime.now()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.AgentPairing.session_uid],
+            set_={
+                "agent_id": stmt.excluded.agent_id,
+                "paired_at": stmt.excluded.paired_at,
+            },
+        )
+        with self._session() as db:
+            db.execute(stmt)
+
+    def paired_agent(self, session_uid: str) -> Optional[str]:
+        with self._session() as db:
+            return db.execute(
+                sql_select(models.AgentPairing.agent_id).where(
+                    models.AgentPairing.session_uid == session_uid
+                )
+            ).scalar_one_or_none()
+
+    def unpair(self, session_uid: str):
+        with self._session() as db:
+            db.execute(
+                delete(models.AgentPairing).where(
+                    models.AgentPairing.session_uid == session_uid
+                )
+            )
+
+    def push_command(self, agent_key: str, command: dict):
+        with self._session() as db:
+            db.add(
+                models.AgentCommand(
+                    agent_key=agent_key,
+                    command_id=command["command_id"],
+                    payload=json.dumps(command),
+                    created_at=datetime.now(),
+                )
+            )
+            self._notify(db, COMMAND_CHANNEL, agent_key)
+
+    def pop_commands(self, agent_keys: Iterable[str]) -> List[dict]:
+        keys = [key for key in agent_keys if key]
+        with self._session() as db:
+            rows = db.execute(
+                delete(models.AgentCommand)
+                .where(models.AgentCommand.agent_key.in_(keys))
+                .returning(models.AgentCommand.id, models.AgentCommand.payload)
+            ).all()
+        return [json.loads(payload) for _, payload in sorted(rows)]
+
+    def has_commands(self, agent_keys: Iterable[str]) -> bool:
+        keys = [key for key in agent_keys if key]
+        with self._session() as db:
+            return db.execute(
+                sql_select(exists().where(models.AgentCommand.agent_key.in_(keys)))
+            ).scalar()
+
+    def store_result(self, command_id: str, payload: dict):
+        stmt = insert(models.AgentCommandResult).values(
+            command_id=command_id,
+            payload=json.dumps(payload),
+            created_at=datetime.now(),
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.AgentCommandResult.command_id],
+            set_={"payload": stmt.excluded.payload},
+        )
+        with self._session() as db:
+            db.execute(stmt)
+            self._notify(db, RESULT_CHANNEL, command_id)
+
+    def pop_result(self, command_id: str) -> Optional[dict]:
+        with self._session() as db:
+            payload = db.execute(
+                delete(models.AgentCommandResult)
+                .where(models.AgentCommandResult.command_id == command_id)
+                .returning(models.AgentCommandResult.payload)
+            ).scalar_one_or_none()
+        return json.loads(payload) if payload is not None else None
+
+    def mark_stopped(self, agent_key: str):
+        stmt = insert(models.AgentStop).values(
+            agent_key=agent_key, stopped_at=datetime.now()
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=[models.AgentStop.agent_key])
+        with self._session() as db:
+            db.execute(stmt)
+            db.execute(
+                delete(models.AgentPresence).where(
+                    models.AgentPresence.agent_key == agent_key
+                )
+            )
+            self._notify(db, COMMAND_CHANNEL, agent_key)
+
+    def is_stopped(self, agent_keys: Iterable[str]) -> bool:
+        keys = [key for key in agent_keys if key]
+        with self._session() as db:
+            return db.execute(
+                sql_select(exists().where(models.AgentStop.agent_key.in_(keys)))
+            ).scalar()
+
+    def clear(self):
+        with self._session() as db:
+            for model in (
+                models.AgentPresence,
+                models.AgentStop,
+                models.AgentPairing,
+                models.AgentCommand,
+                models.AgentCommandResult,
+            ):
+                db.execute(delete(model))
+
+    def wake(self, agent_key: str):
+        with self._session() as db:
+            self._notify(db, COMMAND_CHANNEL, agent_key)
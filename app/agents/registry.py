@@ -0,0 +1,310 @@
+"""
+Agent registry backends.
+
+The registry holds agent presence, queued commands, command results and the
+set of stopped agents. The in-memory backend only works with a single API
+worker; the Postgres backend (see postgres_registry.py) shares state between
+workers and replicas and uses LISTEN/NOTIFY to wake waiting requests.
+
+Select the backend with AGENT_REGISTRY_BACKEND ("memory" or "postgres").
+Registry entries expire on their own (see expire()); the TTLs below are in
+seconds and can be overridden through the environment.
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app.agents.expiry import ExpiryQueue
+
+AGENT_REGISTRY_BACKEND = os.getenv("AGENT_REGISTRY_BACKEND", "memory")
+
+HEARTBEAT_TIMEOUT = timedelta(seconds=30)
+
+# Undelivered commands, unclaimed results, stop flags and session pairings.
+AGENT_COMMAND_TTL = float(os.getenv("AGENT_COMMAND_TTL", "120"))
+AGENT_RESULT_TTL = float(os.getenv("AGENT_RESULT_TTL", "60"))
+AGENT_STOPPED_TTL = float(os.getenv("AGENT_STOPPED_TTL", "600"))
+AGENT_PAIRING_TTL = float(os.getenv("AGENT_PAIRING_TTL", "43200"))
+
+Listener = Callable[[str], None]
+
+
+class AgentRegistry(ABC):
+    # True when calls do I/O and should be kept off the event loop.
+    blocking = False
+
+    def __init__(
+        self,
+        presence_ttl: float = HEARTBEAT_TIMEOUT.total_seconds(),
+        command_ttl: float = AGENT_COMMAND_TTL,
+        result_ttl: float = AGENT_RESULT_TTL,
+        stopped_ttl: float = AGENT_STOPPED_TTL,
+        pairing_ttl: float = AGENT_PAIRING_TTL,
+    ):
+        self.presence_ttl = presence_ttl
+        self.command_ttl = command_ttl
+        self.result_ttl = result_ttl
+        self.stopped_ttl = stopped_ttl
+        self.pairing_ttl = pairing_ttl
+        self._command_listeners: List[Listener] = []
+        self._result_listeners: List[Listener] = []
+
+    def listen(self, on_command: Listener, on_result: Listener):
+        """
+        Register callbacks fired with an agent key when a command is queued
+        for it (or it is woken), and with a command id when a result arrives.
+        Callbacks may run on a background thread.
+        """
+        self._command_listeners.append(on_command)
+        self._result_listeners.append(on_result)
+
+    def _notify_command(self, agent_key: str):
+        for listener in self._command_listeners:
+            listener(agent_key)
+
+    def _notify_result(self, command_id: str):
+        for listener in self._result_listeners:
+            listener(command_id)
+
+    def start(self):
+        """Start background resources (no-op by default)."""
+
+    def stop(self):
+        """Release background resources (no-op by default)."""
+
+    @abstractmethod
+    def touch(self, agent_key: str) -> datetime:
+        """Record a heartbeat for agent_key and return its timestamp."""
+
+    @abstractmethod
+    def last_seen(self, agent_key: str) -> Optional[datetime]:
+        pass
+
+    @abstractmethod
+    def active_agents(self, timeout: timedelta) -> List[str]:
+        """Agent keys with a heartbeat within timeout, oldest registration first."""
+
+    @abstractmethod
+    def remove(self, agent_key: str) -> bool:
+        """Forget an agent and its queued commands. Returns False if unknown."""
+
+    @abstractmethod
+    def expire(self) -> Dict[str, int]:
+        """
+        Evict agents without a recent heartbeat (and their queued commands),
+        undelivered commands, unclaimed results, old stop flags and pairings.
+        Returns the number of evicted entries per kind.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Current registry sizes, for monitoring."""
+
+    @abstractmethod
+    def pair(self, session_uid: str, agent_id: str):
+        """Bind session_uid to agent_id, replacing any previous pairing."""
+
+    @abstractmethod
+    def paired_agent(self, session_uid: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def unpair(self, session_uid: str):
+        pass
+
+    @abstractmethod
+    def push_command(self, agent_key: str, command: dict):
+        pass
+
+    @abstractmethod
+    def pop_commands(self, agent_keys: Iterable[str]) -> List[dict]:
+        """Atomically take every queued command for the given keys."""
+
+    @abstractmethod
+    def has_commands(self, agent_keys: Iterable[str]) -> bool:
+        pass
+
+    @abstractmethod
+    def store_result(self, command_id: str, payload: dict):
+        pass
+
+    @abstractmethod
+    def pop_result(self, command_id: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def mark_stopped(self, agent_key: str):
+        """Flag an agent as stopped, drop its presence and wake its heartbeat."""
+
+    @abstractmethod
+    def is_stopped(self, agent_keys: Iterable[str]) -> bool:
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def wake(self, agent_key: str):
+        """Release a long-poll heartbeat held open for agent_key."""
+        self._notify_command(agent_key)
+
+
+class InMemoryAgentRegistry(AgentRegistry):
+    """Process-local registry; suitable for a single uvicorn worker."""
+
+    def __init__(self, **ttls):
+        super().__init__(**ttls)
+        self.agents: Dict[str, datetime] = {}
+        self.commands: Dict[str, list] = {}
+        self.results: Dict[str, dict] = {}
+        self.stopped: set = set()
+        self.pairings: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._expiry = ExpiryQueue()
+
+    def touch(self, agent_key: str) -> datetime:
+        now = datetime.now()
+        self.agents[agent_key] = now
+        self._expiry.schedule(("agent", agent_key), self.presence_ttl)
+        return now
+
+    def last_seen(self, agent_key: str) -> Optional[datetime]:
+        return self.agents.get(agent_key)
+
+    def active_agents(self, timeout: timedelta) -> List[str]:
+        now = datetime.now()
+        return [
+            key
+            for key, last_heartbeat in list(self.agents.items())
+            if now - last_heartbeat <= timeout
+        ]
+
+    def remove(self, agent_key: str) -> bool:
+        if agent_key not in self.agents:
+            return False
+        del self.agents[agent_key]
+        self.commands.pop(agent_key, None)
+        self._expiry.cancel(("agent", agent_key))
+        return True
+
+    def expire(self) -> Dict[str, int]:
+        evicted = {
+            "agents": 0,
+            "commands": 0,
+            "results": 0,
+            "stopped": 0,
+            "pairings": 0,
+        }
+        for entry in self._expiry.pop_expired():
+            kind = entry[0]
+            if kind == "agent":
+                if self.agents.pop(entry[1], None) is not None:
+                    evicted["agents"] += 1
+                with self._lock:
+                    evicted["commands"] += len(self.commands.pop(entry[1], []))
+            elif kind == "command":
+                _, agent_key, command_id = entry
+                with self._lock:
+                    queue = self.commands.get(agent_key)
+                    if queue is None:
+                        continue
+                    remaining = [c for c in queue if c.get("command_id") != command_id]
+                    evicted["commands"] += len(queue) - len(remaining)
+                    if remaining:
+                        self.commands[agent_key] = remaining
+                    else:
+                        del self.commands[agent_key]
+            elif kind == "result":
+                if self.results.pop(entry[1], None) is not None:
+                    evicted["results"] += 1
+            elif kind == "stopped":
+                if entry[1] in self.stopped:
+                    self.stopped.discard(entry[1])
+                    evicted["stopped"] += 1
+            elif kind == "pairing":
+                if self.pairings.pop(entry[1], None) is not None:
+                    evicted["pairings"] += 1
+        return evicted
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "agents": len(self.agents),
+            "queued_commands": sum(len(queue) for queue in self.commands.values()),
+            "results": len(self.results),
+            "stopped_agents": len(self.stopped),
+            "pairings": len(self.pairings),
+            "expiry_queue": len(self._expiry),
+        }
+
+    def pair(self, session_uid: str, agent_id: str):
+        self.pairings[session_uid] = agent_id
+        self._expiry.schedule(("pairing", session_uid), self.pairing_ttl)
+
+    def paired_agent(self, session_uid: str) -> Optional[str]:
+        return self.pairings.get(session_uid)
+
+    def unpair(self, session_uid: str):
+        self.pairings.pop(session_uid, None)
+
+    def push_command(self, agent_key: str, command: dict):
+        with self._lock:
+            if agent_key not in self.commands:
+                self.commands[agent_key] = []
+            self.commands[agent_key].append(command)
+        self._expiry.schedule(
+            ("command", agent_key, command.get("command_id")), self.command_ttl
+        )
+        self._notify_command(agent_key)
+
+    def pop_commands(self, agent_keys: Iterable[str]) -> List[dict]:
+        pending_commands = []
+        with self._lock:
+            for key in agent_keys:
+                if key in self.commands:
+                    pending_commands.extend(self.commands[key])
+                    self.commands[key] = []
+        return pending_commands
+
+    def has_commands(self, agent_keys: Iterable[str]) -> bool:
+        return any(self.commands.get(key) for key in agent_keys)
+
+    def store_result(self, command_id: str, payload: dict):
+        self.results[command_id] = payload
+        self._expiry.schedule(("result", command_id), self.result_ttl)
+        self._notify_result(command_id)
+
+    def pop_result(self, command_id: str) -> Optional[dict]:
+        return self.results.pop(command_id, None)
+
+    def mark_stopped(self, agent_key: str):
+        self.stopped.add(agent_key)
+        self.agents.pop(agent_key, None)
+        self._expiry.cancel(("agent", agent_key))
+        self._expiry.schedule(("stopped", agent_key), self.stopped_ttl)
+        self._notify_command(agent_key)
+
+    def is_stopped(self, agent_keys: Iterable[str]) -> bool:
+        return any(key in self.stopped for key in agent_keys if key)
+
+    def clear(self):
+        with self._lock:
+            self.agents.clear()
+            self.commands.clear()
+            self.results.clear()
+            self.stopped.clear()
+            self.pairings.clear()
+            self._expiry.clear()
+
+
+def create_agent_registry(backend: Optional[str] = None) -> AgentRegistry:
+    backend = (backend or AGENT_REGISTRY_BACKEND).lower()
+    if backend == "memory":
+        return InMemoryAgentRegistry()
+    if backend == "postgres":
+        from app.agents.postgres_registry import PostgresAgentRegistry
+
+        return PostgresAgentRegistry()
+    raise ValueError(f"Unknown AGENT_REGISTRY_BACKEND: {backend}")
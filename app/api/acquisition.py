@@ -2,10 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Union
 import json
 
-from app.models.acquisition_models import AcquisitionData
+from app.models.acquisition_models import AcquisitionBatch, AcquisitionData
 from app.db import models, database
 from app.security import verify_agent_api_key
 
@@ -51,11 +51,20 @@ def receive_acquisition(
 @limiter.limit("100/minute")
 def receive_acquisition_batch(
     request: Request,
-    records: List[AcquisitionData],
+    payload: Union[List[AcquisitionData], AcquisitionBatch],
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_agent_api_key),
 ):
-    """Receive batch acquisition data (requires API key)"""
+    """
+    Receive batch acquisition data (requires API key). Accepts a bare list of
+    records or {"records": [...], "metadata": {...}} with the agent's frame
+    pacing statistics for the batch.
+    """
+    if isinstance(payload, AcquisitionBatch):
+        records, metadata = payload.records, payload.metadata
+    else:
+        records, metadata = payload, None
+
     if len(records) > 1000:
         raise HTTPException(
             status_code=400,
@@ -76,6 +85,10 @@ def receive_acquisition_batch(
                 session_id=session_entry.id, data=json.dumps(item.model_dump())
             )
         )
+    if metadata is not None and entries:
+        stats = metadata.model_dump()
+        stats["stage_ms"] = json.dumps(stats["stage_ms"])
+        db.add(models.AcquisitionBatchStats(session_id=entries[0].session_id, **stats))
     db.bulk_save_objects(entries)
     db.commit()
     return {"status": "success", "count": len(entries)}
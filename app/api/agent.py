@@ -7,25 +7,49 @@ from fastapi import APIRouter, HTTPException, Request, Depends
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from pydantic import BaseModel, Field
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Any
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+import asyncio
+import os
 import time
 import uuid
+from starlette.concurrency import run_in_threadpool
+from app.acquisition.clock_sync import server_times
+from app.agents.registry import HEARTBEAT_TIMEOUT, create_agent_registry
+from app.db import models, database
+from app.features.clock import AGENT_CLOCK, record_clock_sync
+from app.features.report_cache import invalidate_session_reports
+from app.models.acquisition_models import ClockEstimate
 from app.security import verify_agent_api_key, verify_frontend_api_key
 
 router = APIRouter()
 
 limiter = Limiter(key_func=get_remote_address)
 
-registered_agents: Dict[str, datetime] = {}
+# Agent presence, command queues and results; shared between workers when
+# AGENT_REGISTRY_BACKEND=postgres.
+registry = create_agent_registry()
 
-agent_commands: Dict[str, list] = {}
+# Process-local waiters; cross-worker wakeups arrive through registry.listen.
+pending_results: Dict[str, asyncio.Future] = {}
 
-command_results: Dict[str, dict] = {}
+heartbeat_waiters: Dict[str, List[asyncio.Future]] = {}
 
-stopped_agents: set = set()
+# Upper bound for long-poll heartbeats; must stay below HEARTBEAT_TIMEOUT so
+# an idle agent still refreshes its registration.
+LONG_POLL_MAX_WAIT = 25.0
 
-HEARTBEAT_TIMEOUT = timedelta(seconds=30)
+# Seconds between registry expiry sweeps.
+AGENT_EXPIRY_INTERVAL = float(os.getenv("AGENT_EXPIRY_INTERVAL", "5"))
+
+COMMAND_TIMEOUTS = {
+    "calibrate_start": 10.0,
+    "calibrate_point": 15.0,
+    "calibrate_finish": 3.0,
+    "calibrate_validate": 15.0,
+    "start_acquisition": 5.0,
+    "stop_acquisition": 5.0,
+}
 
 
 class AgentRegistration(BaseModel):
@@ -44,6 +68,25 @@ class AgentHeartbeat(BaseModel):
     session_uid: Optional[str] = None
     agent_id: Optional[str] = None
     command_result: Optional[AgentCommandResult] = None
+    command_results: List[AgentCommandResult] = Field(
+        default_factory=list, description="Results coalesced by the agent"
+    )
+    wait: float = Field(
+        0, ge=0, description="Seconds to hold the request open waiting for commands"
+    )
+    clock: Optional[ClockEstimate] = Field(
+        None, description="Agent clock offset estimated from previous heartbeats"
+    )
+    results_only: bool = Field(
+        False,
+        description="Only deliver command results; queued commands are left "
+        "for the agent's next poll",
+    )
+
+
+class AgentPairingRequest(BaseModel):
+    session_uid: str = Field(..., min_length=1, description="Frontend session UID")
+    agent_id: str = Field(..., min_length=1, description="ID reported by the agent")
 
 
 class CalibrationPointRequest(BaseModel):
@@ -72,6 +115,174 @@ class StartAcquisitionRequest(BaseModel):
     fps: float = Field(20.0, gt=0, le=120, description="Frames per second (0-120)")
 
 
+async def _call_registry(fn, *args):
+    """Run a registry call, moving blocking backends off the event loop."""
+    if registry.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+
+def _resolve_future(future: asyncio.Future, payload: Any):
+    if not future.done():
+        future.set_result(payload)
+
+
+def _stopped_response() -> Dict[str, Any]:
+    return {
+        "status": "stopped",
+        "message": "Agent unregistered after session stop. Please stop sending heartbeats.",
+    }
+
+
+def _on_command_queued(agent_key: str):
+    """Release long-poll heartbeats held open in this process for agent_key."""
+    for future in heartbeat_waiters.pop(agent_key, []):
+        future.get_loop().call_soon_threadsafe(_resolve_future, future, None)
+
+
+def _on_result_stored(command_id: str):
+    """Resolve the proxy waiting on command_id if it lives in this process."""
+    future = pending_results.pop(command_id, None)
+    if future is None:
+        # Not waited on here: another worker owns it or the proxy timed out.
+        return
+    payload = registry.pop_result(command_id)
+    if payload is not None:
+        # The waiter may live on another event loop or thread.
+        future.get_loop().call_soon_threadsafe(_resolve_future, future, payload)
+
+
+registry.listen(_on_command_queued, _on_result_stored)
+
+
+def _is_active(agent_key: str) -> bool:
+    last_heartbeat = registry.last_seen(agent_key)
+    return (
+        last_heartbeat is not None
+        and datetime.now() - last_heartbeat <= HEARTBEAT_TIMEOUT
+    )
+
+
+def resolve_agent(session_uid: Optional[str]) -> str:
+    """
+    Return the agent key that commands for session_uid must go to.
+
+    Paired sessions resolve in O(1) through the pairing index. Without a
+    pairing we only fall back to the single connected agent; with several
+    agents connected the caller has to pair the session first.
+    """
+    if session_uid:
+        agent_id = registry.paired_agent(session_uid)
+        if agent_id:
+            if _is_active(agent_id):
+                return agent_id
+            raise HTTPException(
+                status_code=503,
+                detail="Agent paired with this session is not connected",
+            )
+        # Legacy agents register under the session UID itself.
+        if _is_active(session_uid):
+            return session_uid
+
+    active_agents = registry.active_agents(HEARTBEAT_TIMEOUT)
+    if not active_agents:
+        raise HTTPException(status_code=503, detail="No active agent found")
+    if len(active_agents) > 1:
+        raise HTTPException(
+            status_code=409,
+            detail="Multiple agents connected; pair this session with an agent first",
+        )
+
+    agent_key = active_agents[0]
+    if session_uid:
+        registry.pair(session_uid, agent_key)
+    return agent_key
+
+
+async def run_expiry_loop(interval: float = AGENT_EXPIRY_INTERVAL):
+    """Background task evicting stale agents, commands, results and flags."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            evicted = await _call_registry(registry.expire)
+        except Exception as e:
+            print(f"⚠️  Agent registry expiry failed: {e}")
+            continue
+        if any(evicted.values()):
+            summary = ", ".join(f"{kind}={count}" for kind, count in evicted.items())
+            print(f"🧹 Expired agent registry entries: {summary}")
+
+
+async def _wait_for_commands(keys: List[str], wait: float):
+    """Hold a long-poll heartbeat open until a command is queued or wait elapses."""
+    future = asyncio.get_running_loop().create_future()
+    for key in keys:
+        heartbeat_waiters.setdefault(key, []).append(future)
+    try:
+        # A command may have been queued before the waiter was registered.
+        if await _call_registry(registry.has_commands, keys):
+            return
+        await asyncio.wait_for(future, wait)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        for key in keys:
+            waiters = heartbeat_waiters.get(key)
+            if waiters and future in waiters:
+                waiters.remove(future)
+            if not waiters:
+                heartbeat_waiters.pop(key, None)
+
+
+def queue_command(agent_key: str, command: dict):
+    """Queue a command for an agent and push it to a waiting long-poll."""
+    registry.push_command(agent_key, command)
+
+
+def deliver_command_result(command_id: str, payload: dict):
+    """
+    Store a command result and hand it to the request waiting for it. Results
+    nobody is waiting for (e.g. the proxy already timed out) stay stored.
+    """
+    registry.store_result(command_id, payload)
+
+
+async def _dispatch_command(
+    session_uid: Optional[str], command_type: str, params: Dict[str, Any]
+) -> Any:
+    """
+    Queue a command for the agent serving session_uid and wait for its result
+    without polling: the heartbeat carrying the result resolves the future.
+    """
+    agent_key = await _call_registry(resolve_agent, session_uid)
+    command_id = str(uuid.uuid4())
+    command = {
+        "command_id": command_id,
+        "type": command_type,
+        "params": params,
+    }
+
+    future = asyncio.get_running_loop().create_future()
+    pending_results[command_id] = future
+
+    try:
+        await _call_registry(queue_command, agent_key, command)
+        print(f"📤 Queued command {command_id} ({command_type}) for agent {agent_key}")
+        result = await asyncio.wait_for(future, COMMAND_TIMEOUTS[command_type])
+    except asyncio.TimeoutError:
+        print(f"❌ Timeout waiting for command {command_id}")
+        raise HTTPException(
+            status_code=504, detail="Command timeout - agent may not be responding"
+        )
+    finally:
+        pending_results.pop(command_id, None)
+
+    print(f"✅ Received result for command {command_id}")
+    if result["success"]:
+        return result["result"]
+    raise HTTPException(status_code=500, detail=result.get("error") or "Command failed")
+
+
 @router.post("/register")
 @limiter.limit("10/minute")
 def register_agent(
@@ -80,103 +291,143 @@ def register_agent(
     api_key: str = Depends(verify_agent_api_key),
 ) -> Dict[str, Any]:
     """Register an agent with the backend (requires API key)"""
-    agent_key = registration.session_uid or registration.agent_id or "default"
-    registered_agents[agent_key] = datetime.now()
+    agent_key = registration.agent_id or registration.session_uid or "default"
+    timestamp = registry.touch(agent_key)
+    if registration.agent_id and registration.session_uid:
+        registry.pair(registration.session_uid, registration.agent_id)
     return {
         "status": "registered",
         "agent_key": agent_key,
-        "timestamp": registered_agents[agent_key].isoformat(),
+        "timestamp": timestamp.isoformat(),
     }
 
 
 @router.post("/heartbeat")
 @limiter.limit("60/minute")
-def agent_heartbeat(
+async def agent_heartbeat(
     request: Request,
     heartbeat: AgentHeartbeat,
     api_key: str = Depends(verify_agent_api_key),
 ) -> Dict[str, Any]:
-    """Update agent heartbeat and return pending commands (requires API key)"""
+    """
+    Update agent heartbeat and return pending commands (requires API key).
+    The response carries server_received/server_sent for the agent's clock
+    offset estimate, which it reports with the next heartbeat.
+    """
+    received = time.time()
     session_uid = heartbeat.session_uid
     agent_id = heartbeat.agent_id
-    agent_key = session_uid or agent_id or "default"
-
-    if (
-        agent_key in stopped_agents
-        or (session_uid and session_uid in stopped_agents)
-        or (agent_id and agent_id in stopped_agents)
-    ):
-        print(f"🛑 Agent {agent_key} is in stopped_agents, telling it to stop")
-        return {
-            "status": "stopped",
-            "message": "Agent unregistered after session stop. Please stop sending heartbeats.",
-        }
-
-    registered_agents[agent_key] = datetime.now()
-    if session_uid and session_uid != agent_key:
-        registered_agents[session_uid] = datetime.now()
-    if agent_id and agent_id != agent_key:
-        registered_agents[agent_id] = datetime.now()
-
-    if heartbeat.command_result:
-        result = heartbeat.command_result
-        command_id = result.command_id
-        if command_id:
-            command_results[command_id] = {
-                "result": result.result,
-                "success": result.success,
-                "error": result.error,
-            }
+    agent_key = agent_id or session_uid or "default"
 
-    pending_commands = []
     keys_to_check = [agent_key]
     if session_uid and session_uid != agent_key:
         keys_to_check.append(session_uid)
     if agent_id and agent_id != agent_key:
         keys_to_check.append(agent_id)
 
-    for key in keys_to_check:
-        if key in agent_commands:
-            pending_commands.extend(agent_commands[key])
-            agent_commands[key] = []
+    state = await _call_registry(_record_heartbeat, heartbeat, keys_to_check)
+    if state is None:
+        print(f"🛑 Agent {agent_key} has been stopped, telling it to stop")
+        return _stopped_response()
+    timestamp, pending_commands = state
+
+    if heartbeat.clock is not None and session_uid:
+        await run_in_threadpool(_save_agent_clock, session_uid, heartbeat.clock)
+
+    wait = 0 if heartbeat.results_only else min(heartbeat.wait, LONG_POLL_MAX_WAIT)
+    if not pending_commands and wait > 0:
+        await _wait_for_commands(keys_to_check, wait)
+        state = await _call_registry(_record_heartbeat, None, keys_to_check)
+        if state is None:
+            print(f"🛑 Agent {agent_key} has been stopped, telling it to stop")
+            return _stopped_response()
+        timestamp, pending_commands = state
 
     return {
         "status": "ok",
-        "timestamp": registered_agents[agent_key].isoformat(),
+        "timestamp": timestamp.isoformat(),
         "commands": pending_commands,
+        "long_poll": True,
+        **server_times(received),
     }
 
 
+def _save_agent_clock(session_uid: str, clock: ClockEstimate):
+    """
+    Store the agent's clock offset for its session, if the session exists and
+    the estimate improved, and drop the session's reports computed with the
+    previous one.
+    """
+    db = database.SessionLocal()
+    try:
+        sess = db.query(models.Session).filter_by(session_uid=session_uid).first()
+        if sess is None:
+            return
+        if not record_clock_sync(db, sess.id, AGENT_CLOCK, clock):
+            return
+        db.commit()
+        invalidate_session_reports(session_uid)
+    except Exception as e:
+        db.rollback()
+        print(f"⚠️  Could not store clock offset for session {session_uid}: {e}")
+    finally:
+        db.close()
+
+
+def _record_heartbeat(heartbeat: Optional[AgentHeartbeat], keys: List[str]):
+    """
+    Refresh the agent's presence and session pairing, store an attached
+    command result and take pending commands, unless the heartbeat only
+    delivers results. keys[0] is the agent's own key; commands queued under
+    its session UID are delivered too. Returns None if the agent has been
+    stopped.
+    """
+    if registry.is_stopped(keys):
+        return None
+
+    timestamp = registry.touch(keys[0])
+    if heartbeat is not None and heartbeat.agent_id and heartbeat.session_uid:
+        if registry.paired_agent(heartbeat.session_uid) != heartbeat.agent_id:
+            registry.pair(heartbeat.session_uid, heartbeat.agent_id)
+
+    if heartbeat is not None:
+        results = list(heartbeat.command_results)
+        if heartbeat.command_result:
+            results.append(heartbeat.command_result)
+        for result in results:
+            if result.command_id:
+                deliver_command_result(
+                    result.command_id,
+                    {
+                        "result": result.result,
+                        "success": result.success,
+                        "error": result.error,
+                    },
+                )
+        if heartbeat.results_only:
+            return timestamp, []
+
+    return timestamp, registry.pop_commands(keys)
+
+
 @router.get("/status")
 @limiter.limit("30/minute")
 def get_agent_status(
     request: Request, session_uid: Optional[str] = None
 ) -> Dict[str, Any]:
     """Check if an agent is registered and active (public endpoint, no API key required)"""
-    now = datetime.now()
-    stale_keys = [
-        key
-        for key, last_heartbeat in registered_agents.items()
-        if now - last_heartbeat > HEARTBEAT_TIMEOUT
-    ]
-    for key in stale_keys:
-        del registered_agents[key]
-
     if session_uid:
-        if session_uid in registered_agents:
-            last_heartbeat = registered_agents[session_uid]
-            if now - last_heartbeat <= HEARTBEAT_TIMEOUT:
-                return {
-                    "status": "connected",
-                    "session_uid": session_uid,
-                    "last_heartbeat": last_heartbeat.isoformat(),
-                }
+        agent_key = registry.paired_agent(session_uid) or session_uid
+        last_heartbeat = registry.last_seen(agent_key)
+        if last_heartbeat and datetime.now() - last_heartbeat <= HEARTBEAT_TIMEOUT:
+            return {
+                "status": "connected",
+                "session_uid": session_uid,
+                "agent_id": agent_key,
+                "last_heartbeat": last_heartbeat.isoformat(),
+            }
     else:
-        active_agents = [
-            key
-            for key, last_heartbeat in registered_agents.items()
-            if now - last_heartbeat <= HEARTBEAT_TIMEOUT
-        ]
+        active_agents = registry.active_agents(HEARTBEAT_TIMEOUT)
         if active_agents:
             return {
                 "status": "connected",
@@ -187,6 +438,16 @@ def get_agent_status(
     return {"status": "disconnected"}
 
 
+@router.get("/metrics")
+@limiter.limit("30/minute")
+async def get_agent_metrics(request: Request) -> Dict[str, Any]:
+    """Registry size gauges (public endpoint, no API key required)"""
+    gauges = await _call_registry(registry.stats)
+    gauges["pending_results"] = len(pending_results)
+    gauges["heartbeat_waiters"] = len(heartbeat_waiters)
+    return gauges
+
+
 @router.delete("/unregister")
 @limiter.limit("10/minute")
 def unregister_agent(
@@ -196,258 +457,84 @@ def unregister_agent(
     api_key: str = Depends(verify_agent_api_key),
 ) -> Dict[str, Any]:
     """Unregister an agent (requires API key)"""
-    agent_key = session_uid or agent_id or "default"
-    if agent_key in registered_agents:
-        del registered_agents[agent_key]
-        if agent_key in agent_commands:
-            del agent_commands[agent_key]
+    agent_key = agent_id or session_uid or "default"
+    if registry.remove(agent_key):
         return {"status": "unregistered", "agent_key": agent_key}
     raise HTTPException(status_code=404, detail="Agent not found")
 
 
-@router.post("/calibrate/start")
-@limiter.limit("10/minute")
-def proxy_calibrate_start(
-    request: Request, api_key: str = Depends(verify_frontend_api_key)
+@router.post("/pair")
+@limiter.limit("30/minute")
+def pair_agent(
+    request: Request,
+    data: AgentPairingRequest,
+    api_key: str = Depends(verify_frontend_api_key),
 ) -> Dict[str, Any]:
-    """Queue calibration start command for agent (requires API key)"""
-    now = datetime.now()
-    active_agents = [
-        key
-        for key, last_heartbeat in registered_agents.items()
-        if now - last_heartbeat <= HEARTBEAT_TIMEOUT
-    ]
-
-    if not active_agents:
-        raise HTTPException(
-            status_code=503,
-            detail=f"No active agent found. Registered agents: {list(registered_agents.keys())}",
-        )
-
-    agent_key = active_agents[0]
-    command_id = str(uuid.uuid4())
-    command = {
-        "command_id": command_id,
-        "type": "calibrate_start",
-        "params": {},
+    """Bind a session to a specific connected agent (requires API key)"""
+    if not _is_active(data.agent_id):
+        raise HTTPException(status_code=404, detail="Agent not connected")
+    registry.pair(data.session_uid, data.agent_id)
+    return {
+        "status": "paired",
+        "session_uid": data.session_uid,
+        "agent_id": data.agent_id,
     }
 
-    if agent_key not in agent_commands:
-        agent_commands[agent_key] = []
-    agent_commands[agent_key].append(command)
-
-    print(f"📤 Queued command {command_id} for agent {agent_key}")
-
-    print(f"⏳ Waiting for command {command_id} result...")
-    for i in range(100):
-        time.sleep(0.1)
-        if command_id in command_results:
-            result = command_results.pop(command_id)
-            print(f"✅ Received result for command {command_id}")
-            if result["success"]:
-                return result["result"]
-            else:
-                raise HTTPException(
-                    status_code=500, detail=result.get("error", "Command failed")
-                )
-        if i % 10 == 0:
-            print(f"⏳ Still waiting... ({i / 10:.1f}s)")
 
-    print(f"❌ Timeout waiting for command {command_id}")
-    raise HTTPException(
-        status_code=504, detail="Command timeout - agent may not be responding"
-    )
+@router.post("/calibrate/start")
+@limiter.limit("10/minute")
+async def proxy_calibrate_start(
+    request: Request,
+    session_uid: Optional[str] = None,
+    api_key: str = Depends(verify_frontend_api_key),
+) -> Dict[str, Any]:
+    """Queue calibration start command for the session's agent (requires API key)"""
+    return await _dispatch_command(session_uid, "calibrate_start", {})
 
 
 @router.post("/calibrate/point")
 @limiter.limit("60/minute")
-def proxy_calibrate_point(
+async def proxy_calibrate_point(
     request: Request,
     data: CalibrationPointRequest,
     api_key: str = Depends(verify_frontend_api_key),
 ) -> Dict[str, Any]:
-    """Queue calibration point command for agent (requires API key)"""
-    now = datetime.now()
-    active_agents = [
-        key
-        for key, last_heartbeat in registered_agents.items()
-        if now - last_heartbeat <= HEARTBEAT_TIMEOUT
-    ]
-
-    if not active_agents:
-        raise HTTPException(status_code=503, detail="No active agent found")
-
-    agent_key = active_agents[0]
-    command_id = str(uuid.uuid4())
-    command = {
-        "command_id": command_id,
-        "type": "calibrate_point",
-        "params": data.model_dump(),
-    }
-
-    if agent_key not in agent_commands:
-        agent_commands[agent_key] = []
-    agent_commands[agent_key].append(command)
-
-    print(f"⏳ Waiting for command {command_id} result...")
-    for i in range(150):
-        time.sleep(0.1)
-        if command_id in command_results:
-            result = command_results.pop(command_id)
-            print(f"✅ Received result for command {command_id}")
-            if result["success"]:
-                return result["result"]
-            else:
-                raise HTTPException(
-                    status_code=500, detail=result.get("error", "Command failed")
-                )
-        if i % 10 == 0:
-            print(f"⏳ Still waiting... ({i / 10:.1f}s)")
-
-    print(f"❌ Timeout waiting for command {command_id}")
-    raise HTTPException(
-        status_code=504, detail="Command timeout - agent may not be responding"
+    """Queue calibration point command for the session's agent (requires API key)"""
+    return await _dispatch_command(
+        data.session_uid, "calibrate_point", data.model_dump()
     )
 
 
 @router.post("/calibrate/finish")
 @limiter.limit("10/minute")
-def proxy_calibrate_finish(
-    request: Request, api_key: str = Depends(verify_frontend_api_key)
+async def proxy_calibrate_finish(
+    request: Request,
+    session_uid: Optional[str] = None,
+    api_key: str = Depends(verify_frontend_api_key),
 ) -> Dict[str, Any]:
-    """Queue calibration finish command for agent (requires API key)"""
-    now = datetime.now()
-    active_agents = [
-        key
-        for key, last_heartbeat in registered_agents.items()
-        if now - last_heartbeat <= HEARTBEAT_TIMEOUT
-    ]
-
-    if not active_agents:
-        raise HTTPException(status_code=503, detail="No active agent found")
-
-    agent_key = active_agents[0]
-    command_id = str(uuid.uuid4())
-    command = {
-        "command_id": command_id,
-        "type": "calibrate_finish",
-        "params": {},
-    }
-
-    if agent_key not in agent_commands:
-        agent_commands[agent_key] = []
-    agent_commands[agent_key].append(command)
-
-    for _ in range(30):
-        time.sleep(0.1)
-        if command_id in command_results:
-            result = command_results.pop(command_id)
-            if result["success"]:
-                return result["result"]
-            else:
-                raise HTTPException(
-                    status_code=500, detail=result.get("error", "Command failed")
-                )
-
-    raise HTTPException(status_code=504, detail="Command timeout")
+    """Queue calibration finish command for the session's agent (requires API key)"""
+    return await _dispatch_command(session_uid, "calibrate_finish", {})
 
 
 @router.post("/start")
 @limiter.limit("10/minute")
-def proxy_start_acquisition(
+async def proxy_start_acquisition(
     request: Request,
     data: StartAcquisitionRequest,
     api_key: str = Depends(verify_frontend_api_key),
 ) -> Dict[str, Any]:
-    """Queue start acquisition command for agent (requires API key)"""
-    now = datetime.now()
-    active_agents = [
-        key
-        for key, last_heartbeat in registered_agents.items()
-        if now - last_heartbeat <= HEARTBEAT_TIMEOUT
-    ]
-
-    if not active_agents:
-        raise HTTPException(status_code=503, detail="No active agent found")
-
-    agent_key = active_agents[0]
-    command_id = str(uuid.uuid4())
-    command = {
-        "command_id": command_id,
-        "type": "start_acquisition",
-        "params": data.model_dump(),
-    }
-
-    if agent_key not in agent_commands:
-        agent_commands[agent_key] = []
-    agent_commands[agent_key].append(command)
-
-    print(f"⏳ Waiting for command {command_id} result...")
-    for i in range(50):
-        time.sleep(0.1)
-        if command_id in command_results:
-            result = command_results.pop(command_id)
-            print(f"✅ Received result for command {command_id}")
-            if result["success"]:
-                return result["result"]
-            else:
-                raise HTTPException(
-                    status_code=500, detail=result.get("error", "Command failed")
-                )
-        if i % 10 == 0:
-            print(f"⏳ Still waiting... ({i / 10:.1f}s)")
-
-    print(f"❌ Timeout waiting for command {command_id}")
-    raise HTTPException(
-        status_code=504, detail="Command timeout - agent may not be responding"
+    """Queue start acquisition command for the session's agent (requires API key)"""
+    return await _dispatch_command(
+        data.session_uid, "start_acquisition", data.model_dump()
     )
 
 
 @router.post("/stop")
 @limiter.limit("10/minute")
-def proxy_stop_acquisition(
-    request: Request, api_key: str = Depends(verify_frontend_api_key)
+async def proxy_stop_acquisition(
+    request: Request,
+    session_uid: Optional[str] = None,
+    api_key: str = Depends(verify_frontend_api_key),
 ) -> Dict[str, Any]:
-    """Queue stop acquisition command for agent (requires API key)"""
-    now = datetime.now()
-    active_agents = [
-        key
-        for key, last_heartbeat in registered_agents.items()
-        if now - last_heartbeat <= HEARTBEAT_TIMEOUT
-    ]
-
-    if not active_agents:
-        raise HTTPException(status_code=503, detail="No active agent found")
-
-    command_id = str(uuid.uuid4())
-    command = {
-        "command_id": command_id,
-        "type": "stop_acquisition",
-        "params": {},
-    }
-
-    for agent_key in active_agents:
-        if agent_key not in agent_commands:
-            agent_commands[agent_key] = []
-        agent_commands[agent_key].append(command)
-        print(f"📤 Queued stop command {command_id} for agent key: {agent_key}")
-
-    print(f"⏳ Waiting for command {command_id} result...")
-    for i in range(50):
-        time.sleep(0.1)
-        if command_id in command_results:
-            result = command_results.pop(command_id)
-            print(f"✅ Received result for command {command_id}")
-            if result["success"]:
-                return result["result"]
-            else:
-                raise HTTPException(
-                    status_code=500, detail=result.get("error", "Command failed")
-                )
-        if i % 10 == 0:
-            print(f"⏳ Still waiting... ({i / 10:.1f}s)")
-
-    print(f"❌ Timeout waiting for command {command_id}")
-    raise HTTPException(
-        status_code=504, detail="Command timeout - agent may not be responding"
-    )
+    """Queue stop acquisition command for the session's agent only (requires API key)"""
+    return await _dispatch_command(session_uid, "stop_acquisition", {})
@@ -1,15 +1,43 @@
+import json
+import os
+from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from app.acquisition.calibration import (
+    CALIBRATION_TARGET_ERROR,
+    CalibrationEngine,
+    model_from_transform,
+    point_weight,
+    transform_disagreement,
+)
 from app.db import models, database
-from app.security import verify_agent_or_frontend_api_key
+from app.security import (
+    verify_agent_api_key,
+    verify_agent_or_frontend_api_key,
+    verify_frontend_api_key,
+)
 
 router = APIRouter()
 
 limiter = Limiter(key_func=get_remote_address)
 
+# Calibrations older than this are not offered for reuse: posture, glasses
+# and camera placement drift.
+CALIBRATION_MAX_AGE_DAYS = int(os.getenv("CALIBRATION_MAX_AGE_DAYS", "30"))
+
+# An agent's transform that maps its own points further than this (percent
+# of the screen) from the backend's fit is reported as disagreeing.
+CALIBRATION_AGREEMENT_TOLERANCE = float(
+    os.getenv("CALIBRATION_AGREEMENT_TOLERANCE", "1.0")
+)
+
 
 def get_db():
     db = database.SessionLocal()
@@ -24,6 +52,153 @@ class CalibrationPointIn(BaseModel):
     screen_y: float
     measured_x: float
     measured_y: float
+    dispersion: Optional[float] = None
+    samples: Optional[int] = None
+
+
+class CalibrationValidateIn(BaseModel):
+    x: float = Field(
+        ..., ge=0, description="X coordinate (percentage 0-100 or normalized 0-1)"
+    )
+    y: float = Field(
+        ..., ge=0, description="Y coordinate (percentage 0-100 or normalized 0-1)"
+    )
+    duration: float = Field(1.0, gt=0, le=10, description="Duration in seconds (0-10)")
+    samples: int = Field(
+        30, gt=0, le=1000, description="Number of samples to collect (1-1000)"
+    )
+
+
+class CalibrationReuseIn(BaseModel):
+    calibration_id: int
+    error: Optional[float] = None
+    run_id: Optional[str] = Field(None, min_length=1, max_length=64)
+
+
+class CalibrationBatchIn(BaseModel):
+    run_id: str = Field(
+        ...,
+        min_length=1,
+        max_length=64,
+        description="Identifies the calibration run; retries with the same id are ignored",
+    )
+    points: List[CalibrationPointIn] = Field(..., min_length=1, max_length=100)
+    transform: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Transform fitted by the agent; only compared with the "
+        "backend's own fit of the points",
+    )
+
+
+def _get_session(db: Session, session_uid: str) -> models.Session:
+    sess = db.query(models.Session).filter_by(session_uid=session_uid).first()
+    if not sess:
+        raise HTTPException(404, "Session not found")
+    return sess
+
+
+def calibration_summary(row: models.SessionCalibration) -> Dict[str, Any]:
+    """Public description of a stored calibration (without the transform)."""
+    return {
+        "id": row.id,
+        "model": row.model,
+        "points": row.points,
+        "error": row.error,
+        "valid": row.valid,
+        "source": row.source,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def add_session_calibration(
+    db: Session,
+    sess: models.Session,
+    transform: Dict[str, Any],
+    points: int,
+    run_id: Optional[str] = None,
+) -> models.SessionCalibration:
+    """Add a fitted transform for the session. The caller commits."""
+    error = (transform.get("quality") or {}).get("error")
+    row = models.SessionCalibration(
+        session_id=sess.id,
+        user_id=sess.user_id,
+        model=transform.get("model") or "affine",
+        transform=json.dumps(transform),
+        points=points,
+        error=error,
+        # Without a cross-validated error there is nothing to vouch for it.
+        valid=error is not None and error <= CALIBRATION_TARGET_ERROR,
+        source="grid",
+        run_id=run_id,
+    )
+    db.add(row)
+    return row
+
+
+def fit_session_calibration(
+    db: Session, sess: models.Session, run_id: Optional[str] = None
+) -> models.SessionCalibration:
+    """
+    Fit the session's stored calibration points and add the result.
+
+    Points are weighted by their sampling statistics like on the agent, so
+    the backend arrives at the same model. With run_id only the points of
+    that calibration run are used. The caller commits.
+
+    Raises:
+        ValueError: If there are too few calibration points
+    """
+    query = db.query(models.CalibrationPoint).filter_by(session_id=sess.id)
+    if run_id is not None:
+        query = query.filter_by(run_id=run_id)
+    rows = query.order_by(models.CalibrationPoint.id).all()
+    requested = max((r.samples or 0 for r in rows), default=0)
+    engine = CalibrationEngine.from_points(
+        (
+            r.screen_x,
+            r.screen_y,
+            r.measured_x,
+            r.measured_y,
+            point_weight(r.samples, r.dispersion, requested),
+        )
+        for r in rows
+    )
+    return add_session_calibration(db, sess, engine.transform(), len(rows), run_id)
+
+
+def _calibration_run(
+    db: Session, sess: models.Session, run_id: Optional[str]
+) -> Optional[models.SessionCalibration]:
+    if run_id is None:
+        return None
+    return (
+        db.query(models.SessionCalibration)
+        .filter_by(session_id=sess.id, run_id=run_id)
+        .first()
+    )
+
+
+def previous_calibration(
+    db: Session, sess: models.Session
+) -> Optional[models.SessionCalibration]:
+    """The user's most recent valid calibration from another session, if any."""
+    if sess.user_id is None:
+        return None
+    return (
+        db.query(models.SessionCalibration)
+        .filter(
+            models.SessionCalibration.user_id == sess.user_id,
+            models.SessionCalibration.session_id != sess.id,
+            models.SessionCalibration.valid.is_(True),
+            models.SessionCalibration.created_at
+            >= func.now() - timedelta(days=CALIBRATION_MAX_AGE_DAYS),
+        )
+        .order_by(
+            models.SessionCalibration.created_at.desc(),
+            models.SessionCalibration.id.desc(),
+        )
+        .first()
+    )
 
 
 @router.post("/session/{session_uid}/calibration/point", tags=["calibration"])
@@ -36,9 +211,7 @@ def add_calibration_point(
     api_key: str = Depends(verify_agent_or_frontend_api_key),
 ):
     # verify session
-    sess = db.query(models.Session).filter_by(session_uid=session_uid).first()
-    if not sess:
-        raise HTTPException(404, "Session not found")
+    sess = _get_session(db, session_uid)
     # persist the point
     cp = models.CalibrationPoint(
         session_id=sess.id,
@@ -46,6 +219,8 @@ def add_calibration_point(
         screen_y=data.screen_y,
         measured_x=data.measured_x,
         measured_y=data.measured_y,
+        dispersion=data.dispersion,
+        samples=data.samples,
     )
     db.add(cp)
     db.commit()
@@ -60,9 +235,7 @@ def get_calibration_points(
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_agent_or_frontend_api_key),
 ):
-    sess = db.query(models.Session).filter_by(session_uid=session_uid).first()
-    if not sess:
-        raise HTTPException(404, "Session not found")
+    sess = _get_session(db, session_uid)
     rows = db.query(models.CalibrationPoint).filter_by(session_id=sess.id).all()
     return [
         {
@@ -70,7 +243,208 @@ def get_calibration_points(
             "screen_y": r.screen_y,
             "measured_x": r.measured_x,
             "measured_y": r.measured_y,
+            "dispersion": r.dispersion,
+            "samples": r.samples,
             "timestamp": r.timestamp.isoformat(),
         }
         for r in rows
     ]
+
+
+@router.post("/session/{session_uid}/calibration/fit", tags=["calibration"])
+@limiter.limit("30/minute")
+def fit_calibration(
+    request: Request,
+    session_uid: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_agent_or_frontend_api_key),
+):
+    """Fit and store the session's calibration transform from its points."""
+    sess = _get_session(db, session_uid)
+    try:
+        row = fit_session_calibration(db, sess)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    db.commit()
+    db.refresh(row)
+    return {"status": "calibration_fitted", "calibration": calibration_summary(row)}
+
+
+@router.get("/session/{session_uid}/calibration/previous", tags=["calibration"])
+@limiter.limit("60/minute")
+def get_previous_calibration(
+    request: Request,
+    session_uid: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_agent_or_frontend_api_key),
+):
+    """The user's most recent valid calibration that this session could reuse."""
+    row = previous_calibration(db, _get_session(db, session_uid))
+    if row is None:
+        raise HTTPException(404, "No previous calibration")
+    return calibration_summary(row)
+
+
+@router.post("/session/{session_uid}/calibration/validate", tags=["calibration"])
+@limiter.limit("30/minute")
+async def validate_previous_calibration(
+    request: Request,
+    session_uid: str,
+    data: CalibrationValidateIn,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_frontend_api_key),
+):
+    """
+    Check the user's previous calibration at one target.
+
+    The session's agent measures the eye centres while the user looks at
+    (x, y) and maps them with the previous transform. After all validation
+    points passed, calibrate_finish on the agent adopts that transform
+    instead of requiring a full grid.
+    """
+    from app.api import agent as agent_module
+
+    def lookup():
+        return previous_calibration(db, _get_session(db, session_uid))
+
+    row = await run_in_threadpool(lookup)
+    if row is None:
+        raise HTTPException(404, "No previous calibration")
+    result = await agent_module._dispatch_command(
+        session_uid,
+        "calibrate_validate",
+        {
+            **data.model_dump(),
+            "session_uid": session_uid,
+            "calibration_id": row.id,
+            "transform": json.loads(row.transform),
+        },
+    )
+    return {**result, "calibration_id": row.id}
+
+
+@router.post("/session/{session_uid}/calibration/reuse", tags=["calibration"])
+@limiter.limit("30/minute")
+def reuse_calibration(
+    request: Request,
+    session_uid: str,
+    data: CalibrationReuseIn,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_agent_api_key),
+):
+    """
+    Record that the session uses a validated calibration of the same user.
+    The new row is valid (offered to later sessions) only if the reported
+    validation error is within CALIBRATION_TARGET_ERROR.
+    """
+    sess = _get_session(db, session_uid)
+    existing = _calibration_run(db, sess, data.run_id)
+    if existing is not None:
+        return {
+            "status": "calibration_reused",
+            "duplicate": True,
+            "calibration": calibration_summary(existing),
+        }
+    source = (
+        db.query(models.SessionCalibration).filter_by(id=data.calibration_id).first()
+    )
+    if source is None or sess.user_id is None or source.user_id != sess.user_id:
+        raise HTTPException(404, "Calibration not found")
+    row = models.SessionCalibration(
+        session_id=sess.id,
+        user_id=sess.user_id,
+        model=source.model,
+        transform=source.transform,
+        points=source.points,
+        error=data.error,
+        # Offered for reuse again only if the validation vouches for it.
+        valid=data.error is not None and data.error <= CALIBRATION_TARGET_ERROR,
+        source="reused",
+        reused_from_id=source.id,
+        run_id=data.run_id,
+    )
+    db.add(row)
+    db.commit()
+    db.refresh(row)
+    return {"status": "calibration_reused", "calibration": calibration_summary(row)}
+
+
+@router.post("/session/{session_uid}/calibration/batch", tags=["calibration"])
+@limiter.limit("30/minute")
+def add_calibration_batch(
+    request: Request,
+    session_uid: str,
+    data: CalibrationBatchIn,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_agent_or_frontend_api_key),
+):
+    """
+    Store all points of a calibration run and fit its transform in one
+    transaction.
+
+    The transform is always fitted here from the run's points; a transform
+    sent by the agent is only compared with it (agent_agrees in the
+    response) and never stored or trusted for validity. Idempotent on
+    run_id: a retried upload returns the stored calibration without adding
+    anything.
+    """
+    sess = _get_session(db, session_uid)
+    existing = _calibration_run(db, sess, data.run_id)
+    if existing is not None:
+        return {
+            "status": "calibration_batch_saved",
+            "duplicate": True,
+            "calibration": calibration_summary(existing),
+        }
+
+    if data.transform is not None:
+        try:
+            model_from_transform(data.transform)
+        except (KeyError, TypeError, ValueError) as e:
+            raise HTTPException(422, f"Invalid transform: {e}")
+
+    db.add_all(
+        models.CalibrationPoint(
+            session_id=sess.id, run_id=data.run_id, **point.model_dump()
+        )
+        for point in data.points
+    )
+    try:
+        db.flush()
+        row = fit_session_calibration(db, sess, run_id=data.run_id)
+        agent_agrees = None
+        if data.transform is not None:
+            disagreement = transform_disagreement(
+                json.loads(row.transform),
+                data.transform,
+                [(p.measured_x, p.measured_y) for p in data.points],
+                [(p.screen_x, p.screen_y) for p in data.points],
+            )
+            agent_agrees = disagreement <= CALIBRATION_AGREEMENT_TOLERANCE
+            if not agent_agrees:
+                print(
+                    f"⚠️  Agent calibration for session {session_uid} is "
+                    f"{disagreement:.1f}% of the screen off the backend's fit"
+                )
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(400, str(e))
+    except IntegrityError:
+        # A concurrent retry of the same run won the race.
+        db.rollback()
+        existing = _calibration_run(db, sess, data.run_id)
+        if existing is None:
+            raise
+        return {
+            "status": "calibration_batch_saved",
+            "duplicate": True,
+            "calibration": calibration_summary(existing),
+        }
+    db.refresh(row)
+    return {
+        "status": "calibration_batch_saved",
+        "duplicate": False,
+        "agent_agrees": agent_agrees,
+        "calibration": calibration_summary(row),
+    }
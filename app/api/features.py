@@ -1,12 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from sqlalchemy.orm import Session
+from typing import Optional
+import datetime
 import json
 import statistics
 import numpy as np
 
 from app.db import models, database
+from app.features.clock import (
+    AGENT_CLOCK,
+    TASK_CLOCK,
+    session_clock_offsets,
+    to_backend_clock,
+)
+from app.features.config import (
+    CURRENT_FEATURE_VERSION,
+    FeatureConfig,
+    get_feature_config,
+)
+from app.features.loader import load_session_samples
+from app.features.pupillometry import (
+    PUPIL_FEATURE_KEYS,
+    compute_pupil_features,
+    empty_pupil_features,
+)
+from app.features.report_cache import invalidate_session_reports, report_cache
+from app.features.sampling import session_sampling
+from app.features.tracing import FeatureTrace
 from app.security import verify_frontend_api_key
 
 router = APIRouter()
@@ -22,42 +44,31 @@ def get_db():
         db.close()
 
 
-def calculate_gaze_features(samples):
+def calculate_gaze_features(
+    timestamps,
+    gaze_x,
+    gaze_y,
+    config: Optional[FeatureConfig] = None,
+    screen: bool = False,
+):
     """
     Calculate eye-tracking features from gaze samples.
 
     Args:
-        samples: List of dictionaries with gaze data
+        timestamps: Sample timestamps (seconds)
+        gaze_x: Gaze x coordinate per sample, NaN where untracked
+        gaze_y: Gaze y coordinate per sample, NaN where untracked
+        config: Feature thresholds to use (defaults to the current version)
+        screen: True when gaze is screen-normalised (0-1) rather than camera
+            pixels; selects the matching thresholds
 
     Returns:
         Dictionary with computed features
     """
-    if not samples or len(samples) < 2:
-        return {
-            "mean_fixation_duration": None,
-            "fixation_count": None,
-            "gaze_dispersion": None,
-            "saccade_count": None,
-            "saccade_rate": None,
-        }
-
-    gaze_points = []
-    timestamps = []
-
-    for sample in samples:
-        left_x = sample.get("left_eye", {}).get("x")
-        left_y = sample.get("left_eye", {}).get("y")
-        right_x = sample.get("right_eye", {}).get("x")
-        right_y = sample.get("right_eye", {}).get("y")
-
-        if left_x is not None and left_y is not None:
-            gaze_points.append((left_x, left_y))
-            timestamps.append(sample["timestamp"])
-        elif right_x is not None and right_y is not None:
-            gaze_points.append((right_x, right_y))
-            timestamps.append(sample["timestamp"])
+    config = config or get_feature_config()
 
-    if len(gaze_points) < 2:
+    tracked = np.isfinite(gaze_x) & np.isfinite(gaze_y)
+    if tracked.sum() < 2:
         return {
             "mean_fixation_duration": None,
             "fixation_count": None,
@@ -66,19 +77,16 @@ def calculate_gaze_features(samples):
             "saccade_rate": None,
         }
 
-    gaze_points = np.array(gaze_points)
-    timestamps = np.array(timestamps)
+    gaze_points = np.column_stack((gaze_x[tracked], gaze_y[tracked]))
+    timestamps = timestamps[tracked]
 
     gaze_dispersion = np.std(gaze_points, axis=0)
     gaze_dispersion_magnitude = np.sqrt(np.sum(gaze_dispersion**2))
 
-    FIXATION_THRESHOLD = 50
-    MIN_FIXATION_DURATION = 0.1
-
-    distances = []
-    for i in range(1, len(gaze_points)):
-        dist = np.linalg.norm(gaze_points[i] - gaze_points[i - 1])
-        distances.append(dist)
+    FIXATION_THRESHOLD = (
+        config.screen_fixation_threshold if screen else config.fixation_threshold
+    )
+    MIN_FIXATION_DURATION = config.min_fixation_duration
 
     fixations = []
     current_fixation_start = 0
@@ -120,7 +128,11 @@ def calculate_gaze_features(samples):
     fixation_durations = [f["duration"] for f in fixations]
     mean_fixation_duration = np.mean(fixation_durations) if fixation_durations else None
 
-    SACCADE_VELOCITY_THRESHOLD = 100
+    SACCADE_VELOCITY_THRESHOLD = (
+        config.screen_saccade_velocity_threshold
+        if screen
+        else config.saccade_velocity_threshold
+    )
 
     saccades = []
     for i in range(1, len(fixations)):
@@ -169,112 +181,154 @@ def calculate_gaze_features(samples):
 def compute_session_features(
     request: Request,
     session_uid: str,
+    version: Optional[str] = None,
+    force: bool = False,
+    trace: bool = False,
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_frontend_api_key),
 ):
+    """
+    Compute features for a session with the given feature version (current by
+    default). Skipped when a row for that version already exists, unless force.
+    Pass trace=true to return phase timings and per-trial diagnostics.
+    """
     session = db.query(models.Session).filter_by(session_uid=session_uid).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found.")
 
-    raw_recs = db.query(models.Results).filter_by(session_id=session.id).all()
-    samples = [json.loads(r.data) for r in raw_recs] if raw_recs else []
-    timestamps = [s["timestamp"] for s in samples] if samples else []
-    blinks = [s["timestamp"] for s in samples if s.get("blink")] if samples else []
-
-    duration = (
-        (max(timestamps) - min(timestamps)) / 60.0
-        if timestamps and len(timestamps) > 1
-        else 0
-    )
+    try:
+        config = get_feature_config(version)
+    except KeyError:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown feature version '{version}'."
+        )
 
-    events = (
-        db.query(models.TaskEvent)
-        .filter_by(session_id=session.id)
-        .order_by(models.TaskEvent.timestamp)
-        .all()
+    sf = (
+        db.query(models.SessionFeatures)
+        .filter_by(session_id=session.id, feature_version=config.version)
+        .first()
     )
-    stimuli = [e for e in events if e.event_type == "stimulus_onset"]
-    responses = [e for e in events if e.event_type == "response"]
+    if sf and not force:
+        return {
+            "status": "session_features_cached",
+            "session_uid": session_uid,
+            "feature_version": config.version,
+        }
 
-    print(f"DEBUG: Found {len(events)} total events")
-    print(f"DEBUG: Found {len(stimuli)} stimulus events")
-    print(f"DEBUG: Found {len(responses)} response events")
+    tracer = FeatureTrace(session_uid, enabled=trace)
 
-    print("DEBUG: All events:")
-    for i, event in enumerate(events):
-        print(
-            f"  {i}: {event.event_type}, stimulus={event.stimulus}, response={event.response}, timestamp={event.timestamp}"
+    with tracer.span("load"):
+        samples = load_session_samples(db, session.id, trace=tracer)
+        clock_offsets = (
+            session_clock_offsets(db, session.id) if config.clock_correction else {}
         )
+    # Samples carry the agent's clock and task events the client's; both are
+    # moved onto the backend's clock so stimuli line up with the samples.
+    timestamps = to_backend_clock(samples.timestamps, clock_offsets.get(AGENT_CLOCK))
 
-    print("DEBUG: All responses:")
-    for i, resp in enumerate(responses):
-        print(
-            f"  {i}: response={resp.response}, stimulus={resp.stimulus}, timestamp={resp.timestamp}"
-        )
+    duration = (
+        float(timestamps.max() - timestamps.min()) / 60.0 if len(timestamps) > 1 else 0
+    )
 
-    rt_list = []
-    omission = 0
-    commission = 0
-
-    go_stimuli = [s for s in stimuli if s.stimulus != "X"]
-    nogo_stimuli = [s for s in stimuli if s.stimulus == "X"]
-
-    print(f"DEBUG: Found {len(go_stimuli)} Go stimuli (not X)")
-    print(f"DEBUG: Found {len(nogo_stimuli)} No-Go stimuli (X)")
-
-    for stim in go_stimuli:
-        matching_responses = [r for r in responses if r.timestamp >= stim.timestamp]
-        if matching_responses:
-            resp = matching_responses[0]
-            if resp.response:
-                rt = resp.timestamp - stim.timestamp
-                rt_list.append(rt)
-                print(
-                    f"DEBUG: Go trial '{stim.stimulus}' - Correct response, RT={rt:.3f}s"
-                )
+    with tracer.span("task"):
+        events = (
+            db.query(models.TaskEvent)
+            .filter_by(session_id=session.id)
+            .order_by(models.TaskEvent.timestamp)
+            .all()
+        )
+        stimuli = [e for e in events if e.event_type == "stimulus_onset"]
+        responses = [e for e in events if e.event_type == "response"]
+
+        rt_list = []
+        omission = 0
+        commission = 0
+
+        go_stimuli = [s for s in stimuli if s.stimulus != "X"]
+        nogo_stimuli = [s for s in stimuli if s.stimulus == "X"]
+
+        for stim in go_stimuli:
+            matching_responses = [r for r in responses if r.timestamp >= stim.timestamp]
+            if matching_responses:
+                resp = matching_responses[0]
+                if resp.response:
+                    rt = resp.timestamp - stim.timestamp
+                    rt_list.append(rt)
+                    tracer.trial("go", stim.stimulus, "correct", rt)
+                else:
+                    omission += 1
+                    tracer.trial("go", stim.stimulus, "omission")
             else:
                 omission += 1
-                print(f"DEBUG: Go trial '{stim.stimulus}' - Omission error")
-        else:
-            omission += 1
-            print(f"DEBUG: Go trial '{stim.stimulus}' - No response found (omission)")
-
-    for stim in nogo_stimuli:
-        matching_responses = [r for r in responses if r.timestamp >= stim.timestamp]
-        if matching_responses:
-            resp = matching_responses[0]
-            print(
-                f"DEBUG: No-Go trial '{stim.stimulus}' at {stim.timestamp} - Response: {resp.response} at {resp.timestamp}"
-            )
-            if resp.response:
-                print(
-                    f"DEBUG: No-Go trial '{stim.stimulus}' - Correct inhibition (no commission error)"
-                )
+                tracer.trial("go", stim.stimulus, "omission_no_response")
+
+        for stim in nogo_stimuli:
+            matching_responses = [r for r in responses if r.timestamp >= stim.timestamp]
+            if matching_responses:
+                resp = matching_responses[0]
+                if resp.response:
+                    tracer.trial("nogo", stim.stimulus, "correct_inhibition")
+                else:
+                    commission += 1
+                    tracer.trial("nogo", stim.stimulus, "commission")
             else:
-                commission += 1
-                print(
-                    f"DEBUG: No-Go trial '{stim.stimulus}' - Commission error (user pressed)"
-                )
-        else:
-            print(
-                f"DEBUG: No-Go trial '{stim.stimulus}' - No response found (correct inhibition)"
-            )
-
-    print(f"DEBUG: Reaction times: {rt_list}")
-    print(f"DEBUG: Omission errors: {omission}")
-    print(f"DEBUG: Commission errors: {commission}")
+                tracer.trial("nogo", stim.stimulus, "correct_inhibition_no_response")
 
     mean_rt = statistics.mean(rt_list) if rt_list else None
     sd_rt = statistics.pstdev(rt_list) if len(rt_list) > 1 else None
-    total_blinks = len(blinks)
+    total_blinks = int(samples.blink.sum())
     blink_rate = total_blinks / duration if duration > 0 else None
 
-    gaze_features = calculate_gaze_features(samples)
+    with tracer.span("sampling"):
+        sampling = session_sampling(db, session.id, timestamps)
+
+    with tracer.span("gaze"):
+        screen = config.gaze_space == "screen" and samples.has_screen_gaze
+        if screen:
+            gaze_x, gaze_y = samples.screen_x, samples.screen_y
+        else:
+            gaze_x, gaze_y = samples.gaze()
+        gaze_features = calculate_gaze_features(
+            timestamps, gaze_x, gaze_y, config, screen=screen
+        )
+
+    pupil_features = empty_pupil_features()
+    if config.pupillometry and len(samples):
+        with tracer.span("pupil"):
+            pupil_features = compute_pupil_features(
+                timestamps,
+                samples.pupil,
+                samples.blink,
+                to_backend_clock(
+                    [stim.timestamp for stim in stimuli], clock_offsets.get(TASK_CLOCK)
+                ),
+                np.array([stim.stimulus != "X" for stim in stimuli], dtype=bool),
+                config,
+            )
+
+    tracer.summary(
+        version=config.version,
+        samples=len(samples),
+        gaze_space="screen" if screen else "camera",
+        sampling_rate=sampling["sampling_rate"],
+        clock_offsets=clock_offsets,
+        events=len(events),
+        go=len(go_stimuli),
+        nogo=len(nogo_stimuli),
+        omission=omission,
+        commission=commission,
+        mean_rt=f"{mean_rt:.3f}" if mean_rt is not None else None,
+    )
 
-    sf = db.query(models.SessionFeatures).filter_by(session_id=session.id).first()
     if not sf:
-        sf = models.SessionFeatures(session_id=session.id, user_id=session.user_id)
+        sf = models.SessionFeatures(
+            session_id=session.id,
+            user_id=session.user_id,
+            feature_version=config.version,
+        )
 
+    sf.feature_config = config.model_dump_json()
+    sf.computed_at = datetime.datetime.utcnow()
     sf.started_at = session.started_at
     sf.stopped_at = session.stopped_at
     sf.mean_fixation_duration = gaze_features["mean_fixation_duration"]
@@ -282,28 +336,93 @@ def compute_session_features(
     sf.gaze_dispersion = gaze_features["gaze_dispersion"]
     sf.saccade_count = gaze_features["saccade_count"]
     sf.saccade_rate = gaze_features["saccade_rate"]
+    sf.gaze_space = "screen" if screen else "camera"
     sf.total_blinks = total_blinks
     sf.blink_rate = blink_rate
     sf.go_reaction_time_mean = mean_rt
     sf.go_reaction_time_sd = sd_rt
     sf.omission_errors = omission
     sf.commission_errors = commission
+    for key, value in pupil_features.items():
+        setattr(sf, key, value)
+    for key, value in sampling.items():
+        setattr(sf, key, value)
 
     db.add(sf)
     db.commit()
-    return {"status": "session_features_computed", "session_uid": session_uid}
+    invalidate_session_reports(session_uid)
+    result = {
+        "status": "session_features_computed",
+        "session_uid": session_uid,
+        "feature_version": config.version,
+    }
+    if tracer.enabled:
+        result["trace"] = tracer.as_dict()
+    return result
+
+
+def _feature_values(sf: models.SessionFeatures) -> dict:
+    return {
+        "mean_fixation_duration": sf.mean_fixation_duration,
+        "fixation_count": sf.fixation_count,
+        "gaze_dispersion": sf.gaze_dispersion,
+        "saccade_count": sf.saccade_count,
+        "saccade_rate": sf.saccade_rate,
+        "gaze_space": sf.gaze_space,
+        "total_blinks": sf.total_blinks,
+        "blink_rate": sf.blink_rate,
+        "go_reaction_time_mean": sf.go_reaction_time_mean,
+        "go_reaction_time_sd": sf.go_reaction_time_sd,
+        "omission_errors": sf.omission_errors,
+        "commission_errors": sf.commission_errors,
+        **{key: getattr(sf, key) for key in PUPIL_FEATURE_KEYS},
+        "sampling_rate": sf.sampling_rate,
+        "sampling_jitter_ms": sf.sampling_jitter_ms,
+        "dropped_frames": sf.dropped_frames,
+    }
 
 
 @router.get("/sessions/{session_uid}")
 @limiter.limit("60/minute")
 def get_session_features(
     request: Request,
+    response: Response,
     session_uid: str,
+    version: Optional[str] = None,
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_frontend_api_key),
 ):
+    """
+    Session report with features, user details and intake. Served from the
+    report cache when possible; honours If-None-Match with 304 Not Modified.
+    """
+    version = version or CURRENT_FEATURE_VERSION
+
+    cached = report_cache.get(session_uid, version)
+    if cached is not None:
+        etag, report = cached
+    else:
+        report = _build_session_report(db, session_uid, version)
+        etag = report_cache.put(session_uid, version, report)
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return report
+
+
+def _build_session_report(db: Session, session_uid: str, version: str) -> dict:
     session = db.query(models.Session).filter_by(session_uid=session_uid).first()
-    if not session or not session.features:
+    sf = None
+    if session:
+        sf = (
+            db.query(models.SessionFeatures)
+            .filter_by(session_id=session.id, feature_version=version)
+            .first()
+        )
+    if not sf:
         raise HTTPException(
             status_code=404, detail="Features not found for this session."
         )
@@ -316,9 +435,10 @@ def get_session_features(
         db.query(models.Intake).filter(models.Intake.session_uid == session_uid).first()
     )
 
-    sf = session.features
-
     session_start_time = session.started_at.timestamp() if session.started_at else 0
+    if get_feature_config(version).clock_correction:
+        # Event timestamps are on the client's clock, started_at on the backend's.
+        session_start_time -= session_clock_offsets(db, session.id).get(TASK_CLOCK, 0.0)
 
     events = (
         db.query(models.TaskEvent)
@@ -343,20 +463,46 @@ def get_session_features(
         "user_id": session.user_id,
         "name": user.name,
         "birthdate": user.birthdate.isoformat(),
-        "mean_fixation_duration": sf.mean_fixation_duration,
-        "fixation_count": sf.fixation_count,
-        "gaze_dispersion": sf.gaze_dispersion,
-        "saccade_count": sf.saccade_count,
-        "saccade_rate": sf.saccade_rate,
-        "total_blinks": sf.total_blinks,
-        "blink_rate": sf.blink_rate,
-        "go_reaction_time_mean": sf.go_reaction_time_mean,
-        "go_reaction_time_sd": sf.go_reaction_time_sd,
-        "omission_errors": sf.omission_errors,
-        "commission_errors": sf.commission_errors,
+        "feature_version": sf.feature_version,
+        **_feature_values(sf),
         "go_trial_count": go_trial_count,
         "nogo_trial_count": nogo_trial_count,
         "started_at": sf.started_at.isoformat() if sf.started_at else None,
         "stopped_at": sf.stopped_at.isoformat() if sf.stopped_at else None,
         "intake": intake_data,
     }
+
+
+@router.get("/sessions/{session_uid}/versions")
+@limiter.limit("60/minute")
+def get_session_feature_versions(
+    request: Request,
+    session_uid: str,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_frontend_api_key),
+):
+    """List every stored feature version for a session, for side-by-side comparison."""
+    session = db.query(models.Session).filter_by(session_uid=session_uid).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    rows = (
+        db.query(models.SessionFeatures)
+        .filter_by(session_id=session.id)
+        .order_by(models.SessionFeatures.feature_version)
+        .all()
+    )
+
+    return {
+        "session_uid": session_uid,
+        "current_version": CURRENT_FEATURE_VERSION,
+        "versions": [
+            {
+                "feature_version": sf.feature_version,
+                "config": json.loads(sf.feature_config) if sf.feature_config else None,
+                "computed_at": sf.computed_at.isoformat() if sf.computed_at else None,
+                "features": _feature_values(sf),
+            }
+            for sf in rows
+        ],
+    }
@@ -14,6 +14,7 @@ from typing import Optional
 import datetime
 
 from app.db import models, database
+from app.features.report_cache import invalidate_session_reports
 from app.security import verify_frontend_api_key
 
 router = APIRouter()
@@ -88,6 +89,7 @@ def delete_user_data(
 
     sessions = db.query(models.Session).filter(models.Session.user_id == user_id).all()
     session_ids = [s.id for s in sessions]
+    session_uids = [s.session_uid for s in sessions]
 
     intakes_count = (
         db.query(models.Intake).filter(models.Intake.user_id == user_id).count()
@@ -134,6 +136,11 @@ def delete_user_data(
                 models.Results.session_id.in_(session_ids)
             ).delete(synchronize_session=False)
 
+        if session_ids:
+            db.query(models.AcquisitionBatchStats).filter(
+                models.AcquisitionBatchStats.session_id.in_(session_ids)
+            ).delete(synchronize_session=False)
+
         if session_ids:
             db.query(models.TaskEvent).filter(
                 models.TaskEvent.session_id.in_(session_ids)
@@ -144,6 +151,16 @@ def delete_user_data(
                 models.CalibrationPoint.session_id.in_(session_ids)
             ).delete(synchronize_session=False)
 
+        if session_ids:
+            db.query(models.SessionCalibration).filter(
+                models.SessionCalibration.session_id.in_(session_ids)
+            ).delete(synchronize_session=False)
+
+        if session_ids:
+            db.query(models.SessionClockSync).filter(
+                models.SessionClockSync.session_id.in_(session_ids)
+            ).delete(synchronize_session=False)
+
         db.query(models.Intake).filter(models.Intake.user_id == user_id).delete(
             synchronize_session=False
         )
@@ -158,6 +175,7 @@ def delete_user_data(
         )
 
         db.commit()
+        invalidate_session_reports(*session_uids)
 
         return DeleteUserResponse(
             status="success",
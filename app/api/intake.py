@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Optional
@@ -10,6 +11,12 @@ import datetime
 
 from app.db import models, database
 from app.security import verify_frontend_api_key
+from app.utils.encryption import (
+    credential_hash,
+    encrypt_many,
+    generate_pseudonym_id,
+    name_search_fields,
+)
 
 router = APIRouter()
 
@@ -44,6 +51,24 @@ class IntakeData(BaseModel):
         return self
 
 
+class IntakeImportRecord(BaseModel):
+    name: str = Field(..., min_length=1)
+    birthdate: datetime.date
+    answers: List[int] = Field(..., min_length=6, max_length=6)
+    # When the partner clinic took the intake; now if omitted.
+    created_at: Optional[datetime.datetime] = None
+
+
+class IntakeBulkRequest(BaseModel):
+    records: List[IntakeImportRecord] = Field(..., min_length=1, max_length=5000)
+
+
+def score_intake(answers: List[int]):
+    """ASRS-5 total score and symptom group."""
+    total_score = sum(answers)
+    return total_score, "High" if total_score >= 14 else "Low"
+
+
 class IntakeResponse(BaseModel):
     id: int
     user_id: int
@@ -62,9 +87,7 @@ def intake(
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_frontend_api_key),
 ):
-    total_score = sum(data.answers)
-
-    symptom_group = "High" if total_score >= 14 else "Low"
+    total_score, symptom_group = score_intake(data.answers)
 
     user = None
 
@@ -77,31 +100,16 @@ def intake(
                 detail="User not found or birthdate does not match. Please check your user ID and birthdate.",
             )
 
-    elif data.name is not None:
-        try:
+    # User, session and intake are one unit of work: the flush assigns the
+    # user id, the single commit stores all three or nothing.
+    try:
+        if user is None:
             user = models.User(name=data.name, birthdate=data.birthdate)
             db.add(user)
-            db.commit()
-            db.refresh(user)
-        except Exception as e:
-            db.rollback()
-            raise HTTPException(
-                status_code=500, detail=f"Failed to create user: {str(e)}"
-            )
+            db.flush()
 
-    try:
         session_uid = str(uuid.uuid4())
-        session_entry = models.Session(user_id=user.id, session_uid=session_uid)
-        db.add(session_entry)
-        db.commit()
-        db.refresh(session_entry)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(
-            status_code=500, detail=f"Failed to create session: {str(e)}"
-        )
-
-    try:
+        db.add(models.Session(user_id=user.id, session_uid=session_uid))
         intake_record = models.Intake(
             user_id=user.id,
             session_uid=session_uid,
@@ -111,7 +119,6 @@ def intake(
         )
         db.add(intake_record)
         db.commit()
-        db.refresh(intake_record)
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -129,6 +136,88 @@ def intake(
     )
 
 
+@router.post("/bulk", summary="Import intakes of new users in one transaction")
+@limiter.limit("5/minute")
+def bulk_intake(
+    request: Request,
+    data: IntakeBulkRequest,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_frontend_api_key),
+):
+    """
+    Import intake records, e.g. when migrating from a partner clinic. Each
+    record creates a user, a session (status "imported") and its intake.
+    Names and birthdates are encrypted in one pass and all rows are inserted
+    with multi-row INSERTs in a single transaction: either every record is
+    stored or none is.
+    """
+    records = data.records
+    names = encrypt_many([record.name for record in records])
+    birthdates = encrypt_many([record.birthdate.isoformat() for record in records])
+    session_uids = [str(uuid.uuid4()) for _ in records]
+    now = datetime.datetime.utcnow()
+
+    try:
+        user_ids = db.scalars(
+            insert(models.User).returning(models.User.id, sort_by_parameter_order=True),
+            [
+                {
+                    "_name_encrypted": name,
+                    "_birthdate_encrypted": birthdate,
+                    "pseudonym_id": generate_pseudonym_id(),
+                    **name_search_fields(record.name),
+                    "credential_hash": credential_hash(record.name, record.birthdate),
+                }
+                for name, birthdate, record in zip(names, birthdates, records)
+            ],
+        ).all()
+
+        db.execute(
+            insert(models.Session),
+            [
+                {
+                    "user_id": user_id,
+                    "session_uid": session_uid,
+                    "status": "imported",
+                    "started_at": record.created_at or now,
+                    "stopped_at": record.created_at or now,
+                }
+                for user_id, session_uid, record in zip(user_ids, session_uids, records)
+            ],
+        )
+
+        intakes = []
+        for user_id, session_uid, record in zip(user_ids, session_uids, records):
+            total_score, symptom_group = score_intake(record.answers)
+            intakes.append(
+                {
+                    "user_id": user_id,
+                    "session_uid": session_uid,
+                    "answers_json": json.dumps(record.answers),
+                    "total_score": total_score,
+                    "symptom_group": symptom_group,
+                    "created_at": record.created_at or now,
+                }
+            )
+        db.execute(insert(models.Intake), intakes)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Failed to import intakes: {str(e)}"
+        )
+
+    print(f"📥 Imported {len(records)} intake records")
+    return {
+        "status": "imported",
+        "count": len(records),
+        "records": [
+            {"user_id": user_id, "session_uid": session_uid}
+            for user_id, session_uid in zip(user_ids, session_uids)
+        ],
+    }
+
+
 @router.get("/user/{user_id}", summary="Get intake data for a specific user")
 @limiter.limit("60/minute")
 def get_user_intake(
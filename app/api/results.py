@@ -55,5 +55,8 @@ def delete_results(
     if not session_entry:
         raise HTTPException(status_code=404, detail="Session not found.")
     deleted = db.query(models.Results).filter_by(session_id=session_entry.id).delete()
+    db.query(models.AcquisitionBatchStats).filter_by(
+        session_id=session_entry.id
+    ).delete()
     db.commit()
     return {"deleted": deleted}
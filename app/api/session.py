@@ -6,6 +6,7 @@ from slowapi.util import get_remote_address
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional
+from app.api.calibration import calibration_summary, previous_calibration
 from app.db import models, database
 from app.security import verify_frontend_api_key
 import time
@@ -43,47 +44,34 @@ def session_start(
         sess = db.query(models.Session).filter_by(session_uid=req.session_uid).first()
         if not sess:
             raise HTTPException(status_code=404, detail="Session UID not found.")
-        return {"session_uid": sess.session_uid}
+        # Returning users can validate their last calibration instead of
+        # running the full grid.
+        previous = previous_calibration(db, sess)
+        return {
+            "session_uid": sess.session_uid,
+            "previous_calibration": (
+                calibration_summary(previous) if previous is not None else None
+            ),
+        }
 
     new_uid = str(uuid.uuid4())
     sess = models.Session(session_uid=new_uid, user_id=None)
     db.add(sess)
     db.commit()
     db.refresh(sess)
-    return {"session_uid": sess.session_uid}
+    return {"session_uid": sess.session_uid, "previous_calibration": None}
 
 
-def _stop_agent_acquisition(agent_id_to_stop: str):
-    """Helper function to stop agent acquisition and unregister agent (non-blocking, fails silently)"""
+def _stop_agent_acquisition(session_uid: str):
+    """Helper function to stop the session's paired agent (non-blocking, fails silently)"""
     try:
         from app.api import agent as agent_module
-        from datetime import datetime, timedelta
-
-        now = datetime.now()
-        timeout = timedelta(seconds=30)
-
-        agent_key = None
-        if agent_id_to_stop in agent_module.registered_agents:
-            last_heartbeat = agent_module.registered_agents[agent_id_to_stop]
-            if now - last_heartbeat <= timeout:
-                agent_key = agent_id_to_stop
-
-        if not agent_key:
-            active_agents = [
-                key
-                for key, last_heartbeat in agent_module.registered_agents.items()
-                if now - last_heartbeat <= timeout
-            ]
-            if active_agents:
-                agent_key = active_agents[0]
-                print(
-                    f"⚠️  Agent {agent_id_to_stop} not found, using active agent {agent_key}"
-                )
-
-        if not agent_key:
-            print(
-                f"⚠️  No active agent found to stop acquisition (looked for: {agent_id_to_stop})"
-            )
+
+        registry = agent_module.registry
+        try:
+            agent_key = agent_module.resolve_agent(session_uid)
+        except HTTPException as e:
+            print(f"⚠️  No agent to stop for session {session_uid}: {e.detail}")
             return
 
         command_id = str(uuid.uuid4())
@@ -93,25 +81,15 @@ def _stop_agent_acquisition(agent_id_to_stop: str):
             "params": {},
         }
 
-        if agent_key not in agent_module.agent_commands:
-            agent_module.agent_commands[agent_key] = []
-        agent_module.agent_commands[agent_key].append(command)
+        agent_module.queue_command(agent_key, command)
+        registry.unpair(session_uid)
         print(f"📤 Queued stop acquisition command {command_id} for agent {agent_key}")
 
-        for other_key in active_agents:
-            if other_key != agent_key:
-                if other_key not in agent_module.agent_commands:
-                    agent_module.agent_commands[other_key] = []
-                agent_module.agent_commands[other_key].append(command)
-                print(f"📤 Also queued stop command {command_id} for agent {other_key}")
-
         import threading
 
         def stop_agent_after_delay():
             time.sleep(2)
-            agent_module.stopped_agents.add(agent_key)
-            if agent_key in agent_module.registered_agents:
-                del agent_module.registered_agents[agent_key]
+            registry.mark_stopped(agent_key)
             print(
                 f"🔌 Marked agent {agent_key} as stopped - it will stop sending heartbeats"
             )
@@ -2,9 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from sqlalchemy.orm import Session
-from typing import Optional
-from pydantic import BaseModel
+import time
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from app.acquisition.clock_sync import server_times
 from app.db import models, database
+from app.features.clock import TASK_CLOCK, record_clock_sync
+from app.features.report_cache import invalidate_session_reports
+from app.models.acquisition_models import ClockEstimate
 from app.security import verify_frontend_api_key
 
 router = APIRouter()
@@ -26,6 +31,9 @@ class TaskEventRequest(BaseModel):
     event_type: str  # e.g. "stimulus_onset", "response", "error"
     stimulus: Optional[str] = None
     response: Optional[bool] = None
+    # Offset of the client's clock, estimated from earlier event responses
+    # (server_received/server_sent).
+    clock: Optional[ClockEstimate] = None
 
 
 @router.post("/event")
@@ -36,6 +44,7 @@ def log_event(
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_frontend_api_key),
 ):
+    received = time.time()
     sess = db.query(models.Session).filter_by(session_uid=req.session_uid).first()
     if not sess:
         raise HTTPException(status_code=404, detail="Session not found.")
@@ -48,6 +57,63 @@ def log_event(
         response=req.response,
     )
     db.add(evt)
+    if req.clock is not None:
+        record_clock_sync(db, sess.id, TASK_CLOCK, req.clock)
     db.commit()
+    invalidate_session_reports(req.session_uid)
 
-    return {"status": "event_logged"}
+    return {"status": "event_logged", **server_times(received)}
+
+
+class TaskEventBatchRequest(BaseModel):
+    events: List[TaskEventRequest] = Field(..., min_length=1, max_length=1000)
+    clock: Optional[ClockEstimate] = None
+
+
+@router.post("/events/batch")
+@limiter.limit("120/minute")
+def log_events(
+    request: Request,
+    req: TaskEventBatchRequest,
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_frontend_api_key),
+):
+    """
+    Log many task events in one transaction. Sessions are resolved with a
+    single query; if any is unknown nothing is stored.
+    """
+    received = time.time()
+    uids = {evt.session_uid for evt in req.events}
+    session_ids = dict(
+        db.query(models.Session.session_uid, models.Session.id)
+        .filter(models.Session.session_uid.in_(uids))
+        .all()
+    )
+    missing = sorted(uids - session_ids.keys())
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Session not found for uid {missing[0]}"
+        )
+
+    db.add_all(
+        models.TaskEvent(
+            session_id=session_ids[evt.session_uid],
+            timestamp=evt.timestamp,
+            event_type=evt.event_type,
+            stimulus=evt.stimulus,
+            response=evt.response,
+        )
+        for evt in req.events
+    )
+    clock = req.clock or req.events[-1].clock
+    if clock is not None:
+        for session_id in session_ids.values():
+            record_clock_sync(db, session_id, TASK_CLOCK, clock)
+    db.commit()
+    invalidate_session_reports(*uids)
+
+    return {
+        "status": "events_logged",
+        "count": len(req.events),
+        **server_times(received),
+    }
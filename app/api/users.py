@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from slowapi import Limiter
 from slowapi.util import get_remote_address
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional
@@ -8,8 +9,15 @@ import datetime
 import json
 
 from app.db import models, database
+from app.features.config import CURRENT_FEATURE_VERSION
 from app.security import verify_frontend_api_key
-from app.utils.encryption import encrypt
+from app.utils.encryption import (
+    blind_index,
+    credential_hash,
+    encrypt,
+    name_query_tokens,
+    normalize_name,
+)
 
 router = APIRouter()
 
@@ -56,16 +64,33 @@ def search_users(
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_frontend_api_key),
 ):
-    """Search for users by name (case-insensitive partial match)."""
-
-    if not name or len(name.strip()) == 0:
+    """
+    Search for users by name (case-insensitive partial match).
+
+    With n-gram search on (NAME_NGRAM_SEARCH) and a term of at least
+    NAME_NGRAM_SIZE characters, candidates come from the blind index: the
+    exact name or every n-gram token of the term (GIN index), plus users
+    without tokens yet. Otherwise every user is a candidate. Candidates are
+    decrypted and checked.
+    """
+
+    search_term = normalize_name(name)
+    if not search_term:
         raise HTTPException(
             status_code=400, detail="Name parameter is required and cannot be empty"
         )
 
-    all_users = db.query(models.User).all()
-    search_term = name.strip().lower()
-    users = [u for u in all_users if search_term in u.name.lower()]
+    query = db.query(models.User)
+    tokens = name_query_tokens(search_term)
+    if tokens:
+        query = query.filter(
+            or_(
+                models.User.name_index == blind_index(search_term),
+                models.User.name_tokens.contains(tokens),
+                models.User.name_tokens.is_(None),
+            )
+        )
+    users = [u for u in query.all() if search_term in normalize_name(u.name)]
     users.sort(key=lambda u: u.name)
 
     if not users:
@@ -89,29 +114,37 @@ def get_user_results_by_credentials(
     db: Session = Depends(get_db),
     api_key: str = Depends(verify_frontend_api_key),
 ):
-    """Get all results for a user by name and birthdate. Used for retrieving previous results."""
-
-    all_users = db.query(models.User).all()
-    user = None
+    """
+    Get all results for a user by name and birthdate. Used for retrieving
+    previous results.
 
-    search_name = name.lower().strip()
+    The user is found by the keyed hash of (name, birthdate) with one indexed
+    query; the match is confirmed by decrypting that user. Users whose hash
+    has not been backfilled yet are checked by decryption.
+    """
 
-    for u in all_users:
-        user_name = u.name.lower().strip() if u.name else ""
-        user_birthdate = u.birthdate
+    search_name = normalize_name(name)
 
-        name_match = user_name == search_name
+    def matches(u):
+        return normalize_name(u.name) == search_name and u.birthdate == birthdate
 
-        birthdate_match = False
-        if user_birthdate is not None and birthdate is not None:
-            if isinstance(user_birthdate, datetime.date) and isinstance(
-                birthdate, datetime.date
-            ):
-                birthdate_match = user_birthdate == birthdate
-
-        if name_match and birthdate_match:
-            user = u
-            break
+    key = credential_hash(name, birthdate)
+    candidates = (
+        db.query(models.User)
+        .filter(models.User.credential_hash == key)
+        .order_by(models.User.id)
+        .all()
+        if key
+        else []
+    )
+    user = next((u for u in candidates if matches(u)), None)
+    if user is None:
+        legacy = (
+            db.query(models.User)
+            .filter(models.User.credential_hash.is_(None))
+            .order_by(models.User.id)
+        )
+        user = next((u for u in legacy if matches(u)), None)
 
     if not user:
         raise HTTPException(
@@ -166,6 +199,12 @@ def _get_user_results_internal(user_id: int, user: models.User, db: Session):
         features = (
             db.query(models.SessionFeatures)
             .filter(models.SessionFeatures.session_id == session.id)
+            .order_by(
+                (
+                    models.SessionFeatures.feature_version == CURRENT_FEATURE_VERSION
+                ).desc(),
+                models.SessionFeatures.computed_at.desc(),
+            )
             .first()
         )
 
@@ -178,6 +217,7 @@ def _get_user_results_internal(user_id: int, user: models.User, db: Session):
         features_data = None
         if features:
             features_data = {
+                "feature_version": features.feature_version,
                 "mean_fixation_duration": features.mean_fixation_duration,
                 "fixation_count": features.fixation_count,
                 "gaze_dispersion": features.gaze_dispersion,
@@ -7,18 +7,30 @@ from sqlalchemy import (
     ForeignKey,
     Float,
     Boolean,
+    Index,
+    UniqueConstraint,
     func,
     event,
 )
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import date
 from .database import Base
-from app.utils.encryption import encrypt, decrypt, generate_pseudonym_id
+from app.utils.encryption import (
+    credential_hash,
+    encrypt,
+    decrypt,
+    generate_pseudonym_id,
+    name_search_fields,
+)
 
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_name_tokens", "name_tokens", postgresql_using="gin"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -26,6 +38,16 @@ class User(Base):
     _birthdate_encrypted = Column("birthdate_encrypted", String, nullable=True)
     pseudonym_id = Column(String, unique=True, index=True, nullable=True)
 
+    # Blind index of the normalised name and, with NAME_NGRAM_SEARCH, of its
+    # n-grams (app.utils.encryption.name_search_fields), kept in step with the
+    # name. NULL for users not yet backfilled by
+    # scripts/migrate_name_blind_index.py; name_tokens also without n-grams.
+    name_index = Column(String, nullable=True, index=True)
+    name_tokens = Column(ARRAY(String), nullable=True)
+    # Blind index of (name, birthdate) for /users/results/by-credentials;
+    # NULL until both are set, or until scripts/migrate_credential_hash.py ran.
+    credential_hash = Column(String, nullable=True, index=True)
+
     _name_legacy = Column("name", String, nullable=True)
     _birthdate_legacy = Column("birthdate", Date, nullable=True)
 
@@ -52,6 +74,9 @@ class User(Base):
         if value:
             self._name_encrypted = encrypt(str(value))
             self._name_legacy = None
+            for column, indexed in name_search_fields(str(value)).items():
+                setattr(self, column, indexed)
+            self.credential_hash = credential_hash(str(value), self.birthdate)
 
     @hybrid_property
     def birthdate(self):
@@ -79,6 +104,7 @@ class User(Base):
                 date_str = str(value)
             self._birthdate_encrypted = encrypt(date_str)
             self._birthdate_legacy = None
+            self.credential_hash = credential_hash(self.name, date_str)
 
     def __init__(self, **kwargs):
         """Initialize user with automatic encryption and pseudonym generation."""
@@ -87,12 +113,15 @@ class User(Base):
 
         if name_val and "_name_encrypted" not in kwargs:
             kwargs["_name_encrypted"] = encrypt(str(name_val))
+            kwargs.update(name_search_fields(str(name_val)))
         if birthdate_val and "_birthdate_encrypted" not in kwargs:
             if isinstance(birthdate_val, date):
                 date_str = birthdate_val.isoformat()
             else:
                 date_str = str(birthdate_val)
             kwargs["_birthdate_encrypted"] = encrypt(date_str)
+        if name_val and birthdate_val and "credential_hash" not in kwargs:
+            kwargs["credential_hash"] = credential_hash(str(name_val), birthdate_val)
 
         if "pseudonym_id" not in kwargs:
             kwargs["pseudonym_id"] = generate_pseudonym_id()
@@ -128,7 +157,10 @@ class Session(Base):
     results = relationship("Results", back_populates="session")
     events = relationship("TaskEvent", back_populates="session")
     calibrations = relationship("CalibrationPoint", back_populates="session")
-    features = relationship("SessionFeatures", back_populates="session", uselist=False)
+    feature_sets = relationship("SessionFeatures", back_populates="session")
+    batch_stats = relationship("AcquisitionBatchStats", back_populates="session")
+    fitted_calibrations = relationship("SessionCalibration", back_populates="session")
+    clock_syncs = relationship("SessionClockSync", back_populates="session")
 
 
 class CalibrationPoint(Base):
@@ -139,10 +171,78 @@ class CalibrationPoint(Base):
     screen_y = Column(Float, nullable=False)
     measured_x = Column(Float, nullable=False)
     measured_y = Column(Float, nullable=False)
+    # RMS spread of the kept eye-centre samples (pixels) and how many were
+    # kept; NULL for points sent by older agents.
+    dispersion = Column(Float, nullable=True)
+    samples = Column(Integer, nullable=True)
+    # Calibration run the point was uploaded with (batch upload only).
+    run_id = Column(String, nullable=True, index=True)
     timestamp = Column(DateTime, nullable=False, server_default=func.now())
     session = relationship("Session", back_populates="calibrations")
 
 
+class SessionCalibration(Base):
+    """
+    Calibration transform in use for a session.
+
+    Fitted from the session's CalibrationPoint rows (source "grid"), or a
+    previous calibration of the same user that passed validation at the
+    start of this session (source "reused"). user_id is copied from the
+    session so the latest calibration of a user is one indexed lookup.
+    """
+
+    __tablename__ = "session_calibrations"
+    __table_args__ = (
+        UniqueConstraint("session_id", "run_id", name="uq_session_calibrations_run"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    model = Column(String, nullable=False)
+    transform = Column(String, nullable=False)  # JSON, as saved by the agent
+    points = Column(Integer, nullable=False)
+    # Leave-one-out error of a grid fit, or the worst validation error of a
+    # reused calibration, in percent of the screen.
+    error = Column(Float, nullable=True)
+    valid = Column(Boolean, nullable=False, default=False)
+    source = Column(String, nullable=False, default="grid")
+    reused_from_id = Column(
+        Integer, ForeignKey("session_calibrations.id"), nullable=True
+    )
+    # Idempotency key of the agent's upload; NULL for backend-side fits.
+    run_id = Column(String, nullable=True)
+
+    session = relationship("Session", back_populates="fitted_calibrations")
+
+
+class SessionClockSync(Base):
+    """
+    Offset of a client's clock from the backend's for one session
+    (app.acquisition.clock_sync). source is "agent" for acquisition sample
+    timestamps and "task" for task event timestamps; adding offset to such a
+    timestamp gives backend time.
+    """
+
+    __tablename__ = "session_clock_sync"
+    __table_args__ = (
+        UniqueConstraint("session_id", "source", name="uq_session_clock_sync"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False, index=True)
+    source = Column(String, nullable=False)
+    offset = Column(Float, nullable=False)  # seconds
+    round_trip = Column(Float, nullable=True)  # seconds
+    samples = Column(Integer, nullable=True)
+    updated_at = Column(
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    session = relationship("Session", back_populates="clock_syncs")
+
+
 class TaskEvent(Base):
     __tablename__ = "task_events"
 
@@ -166,19 +266,49 @@ class Results(Base):
     session = relationship("Session", back_populates="results")
 
 
+class AcquisitionBatchStats(Base):
+    """Frame pacing reported by the agent with each acquisition batch."""
+
+    __tablename__ = "acquisition_batch_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False, index=True)
+    received_at = Column(DateTime, nullable=False, server_default=func.now())
+    frames = Column(Integer, nullable=False)
+    target_fps = Column(Float, nullable=True)
+    effective_fps = Column(Float, nullable=True)
+    achieved_fps = Column(Float, nullable=True)
+    jitter_ms = Column(Float, nullable=True)
+    dropped_frames = Column(Integer, nullable=False, default=0)
+    inference_scale = Column(Float, nullable=True)
+    stage_ms = Column(String, nullable=True)
+
+    session = relationship("Session", back_populates="batch_stats")
+
+
 class SessionFeatures(Base):
     __tablename__ = "session_features"
+    __table_args__ = (
+        UniqueConstraint(
+            "session_id", "feature_version", name="uq_session_features_version"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("sessions.id"), unique=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), index=True)
     user_id = Column(Integer, nullable=True)
 
+    feature_version = Column(String, nullable=False, default="1", server_default="1")
+    feature_config = Column(String, nullable=True)
+    computed_at = Column(DateTime, nullable=True, server_default=func.now())
+
     mean_fixation_duration = Column(Float, nullable=True)
     fixation_count = Column(Integer, nullable=True)
     gaze_dispersion = Column(Float, nullable=True)
 
     saccade_count = Column(Integer, nullable=True)
     saccade_rate = Column(Float, nullable=True)
+    gaze_space = Column(String, nullable=True)
 
     total_blinks = Column(Integer, nullable=True)
     blink_rate = Column(Float, nullable=True)
@@ -188,7 +318,66 @@ class SessionFeatures(Base):
     omission_errors = Column(Integer, nullable=True)
     commission_errors = Column(Integer, nullable=True)
 
+    pupil_mean_size = Column(Float, nullable=True)
+    pupil_go_peak_dilation = Column(Float, nullable=True)
+    pupil_go_peak_latency = Column(Float, nullable=True)
+    pupil_go_auc = Column(Float, nullable=True)
+    pupil_go_epochs = Column(Integer, nullable=True)
+    pupil_nogo_peak_dilation = Column(Float, nullable=True)
+    pupil_nogo_peak_latency = Column(Float, nullable=True)
+    pupil_nogo_auc = Column(Float, nullable=True)
+    pupil_nogo_epochs = Column(Integer, nullable=True)
+
+    sampling_rate = Column(Float, nullable=True)
+    sampling_jitter_ms = Column(Float, nullable=True)
+    dropped_frames = Column(Integer, nullable=True)
+
     started_at = Column(DateTime, nullable=True)
     stopped_at = Column(DateTime, nullable=True)
 
-    session = relationship("Session", back_populates="features")
+    session = relationship("Session", back_populates="feature_sets")
+
+
+class AgentPresence(Base):
+    """Last heartbeat per agent key, shared by every API worker."""
+
+    __tablename__ = "agent_presence"
+
+    agent_key = Column(String, primary_key=True)
+    registered_at = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False, index=True)
+
+
+class AgentStop(Base):
+    __tablename__ = "agent_stops"
+
+    agent_key = Column(String, primary_key=True)
+    stopped_at = Column(DateTime, nullable=False, index=True)
+
+
+class AgentPairing(Base):
+    """Binds a frontend session to the agent that runs it."""
+
+    __tablename__ = "agent_pairings"
+
+    session_uid = Column(String, primary_key=True)
+    agent_id = Column(String, nullable=False, index=True)
+    paired_at = Column(DateTime, nullable=False, index=True)
+
+
+class AgentCommand(Base):
+    __tablename__ = "agent_commands"
+
+    id = Column(Integer, primary_key=True, index=True)
+    agent_key = Column(String, nullable=False, index=True)
+    command_id = Column(String, nullable=False, index=True)
+    payload = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+
+class AgentCommandResult(Base):
+    __tablename__ = "agent_command_results"
+
+    command_id = Column(String, primary_key=True)
+    payload = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
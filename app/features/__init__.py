@@ -0,0 +1 @@
+# Features package
@@ -0,0 +1,74 @@
+"""
+Per-session clock offsets.
+
+Clients report how far their clock is from the backend's
+(app.acquisition.clock_sync) with requests they make anyway; the latest
+estimate per session and source is kept in SessionClockSync. Feature
+computation adds the offsets to put samples, task events and the session
+start on the backend's clock.
+"""
+
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+AGENT_CLOCK = "agent"
+TASK_CLOCK = "task"
+
+# Offset changes below this (seconds) do not replace a stored estimate.
+CLOCK_OFFSET_TOLERANCE = 0.001
+
+
+def record_clock_sync(db: Session, session_id: int, source: str, estimate) -> bool:
+    """
+    Store a client's estimate for a session, replacing the previous one if
+    it has a smaller round trip or an offset more than CLOCK_OFFSET_TOLERANCE
+    away. The caller commits.
+
+    Args:
+        estimate: ClockEstimate (or anything with offset, round_trip, samples)
+
+    Returns:
+        True if the stored estimate was replaced
+    """
+    row = (
+        db.query(models.SessionClockSync)
+        .filter_by(session_id=session_id, source=source)
+        .first()
+    )
+    if row is None:
+        row = models.SessionClockSync(session_id=session_id, source=source)
+        db.add(row)
+    elif not _improves(estimate, row):
+        return False
+    row.offset = estimate.offset
+    row.round_trip = estimate.round_trip
+    row.samples = estimate.samples
+    return True
+
+
+def _improves(estimate, row: models.SessionClockSync) -> bool:
+    if abs(estimate.offset - row.offset) > CLOCK_OFFSET_TOLERANCE:
+        return True
+    if estimate.round_trip is None:
+        return False
+    return row.round_trip is None or estimate.round_trip < row.round_trip
+
+
+def session_clock_offsets(db: Session, session_id: int) -> Dict[str, float]:
+    """Offset in seconds per source; sources without an estimate are missing."""
+    rows = (
+        db.query(models.SessionClockSync.source, models.SessionClockSync.offset)
+        .filter(models.SessionClockSync.session_id == session_id)
+        .all()
+    )
+    return {source: offset for source, offset in rows}
+
+
+def to_backend_clock(timestamps, offset: Optional[float]) -> np.ndarray:
+    """Client timestamps as a float array on the backend's clock."""
+    timestamps = np.asarray(timestamps, dtype=float)
+    return timestamps + offset if offset else timestamps
@@ -0,0 +1,76 @@
+"""
+Versioned feature computation parameters.
+
+Every set of thresholds used to derive session features is registered here
+under a version string. Stored SessionFeatures rows are keyed by
+(session, feature_version), so changing a threshold means registering a new
+version rather than editing an existing one.
+"""
+
+from pydantic import BaseModel, ConfigDict
+from typing import Dict, Optional
+
+
+class FeatureConfig(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    version: str
+    fixation_threshold: float = 50.0
+    min_fixation_duration: float = 0.1
+    saccade_velocity_threshold: float = 100.0
+
+    # "screen" uses the agent's calibrated gaze (normalised 0-1) when a
+    # session has it, with the screen thresholds below; "camera" always uses
+    # raw eye centres in camera pixels.
+    gaze_space: str = "camera"
+    screen_fixation_threshold: float = 0.03
+    screen_saccade_velocity_threshold: float = 1.0
+
+    pupillometry: bool = True
+    pupil_baseline_window: float = 0.2
+    pupil_response_window: float = 1.5
+    pupil_sample_rate: float = 20.0
+    pupil_blink_padding: float = 0.15
+    pupil_max_interpolated_fraction: float = 0.5
+
+    # Move sample and task event timestamps onto the backend's clock using
+    # the offsets the clients reported for the session (app.features.clock).
+    clock_correction: bool = False
+
+
+FEATURE_CONFIGS: Dict[str, FeatureConfig] = {}
+
+
+def register_feature_config(config: FeatureConfig) -> FeatureConfig:
+    """Register a feature config. Versions are immutable once registered."""
+    existing = FEATURE_CONFIGS.get(config.version)
+    if existing is not None and existing != config:
+        raise ValueError(f"Feature version '{config.version}' is already registered.")
+    FEATURE_CONFIGS[config.version] = config
+    return config
+
+
+register_feature_config(FeatureConfig(version="1", pupillometry=False))
+register_feature_config(FeatureConfig(version="2"))
+register_feature_config(FeatureConfig(version="3", gaze_space="screen"))
+register_feature_config(
+    FeatureConfig(version="4", gaze_space="screen", clock_correction=True)
+)
+
+CURRENT_FEATURE_VERSION = "4"
+
+
+def get_feature_config(version: Optional[str] = None) -> FeatureConfig:
+    """
+    Look up a registered feature config.
+
+    Args:
+        version: Feature version, or None for the current version
+
+    Returns:
+        The matching FeatureConfig
+
+    Raises:
+        KeyError: If the version is not registered
+    """
+    return FEATURE_CONFIGS[version or CURRENT_FEATURE_VERSION]
@@ -0,0 +1,150 @@
+"""
+Streaming loader for raw acquisition samples.
+
+Results rows are read in yield_per chunks and parsed straight into
+preallocated NumPy column arrays, so feature computation never holds the full
+list of ORM objects or parsed sample dicts in memory at once.
+"""
+
+import json
+import os
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db import models
+from app.features.tracing import FeatureTrace
+
+LOADER_CHUNK_SIZE = int(os.getenv("FEATURE_LOADER_CHUNK_SIZE", "2000"))
+
+# Row layout of the float column block
+TIMESTAMP, LEFT_X, LEFT_Y, RIGHT_X, RIGHT_Y, PUPIL, SCREEN_X, SCREEN_Y = range(8)
+
+
+class SessionSamples(NamedTuple):
+    timestamps: np.ndarray
+    left_x: np.ndarray
+    left_y: np.ndarray
+    right_x: np.ndarray
+    right_y: np.ndarray
+    pupil: np.ndarray
+    blink: np.ndarray
+    screen_x: np.ndarray
+    screen_y: np.ndarray
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def has_screen_gaze(self) -> bool:
+        """True when the agent sent calibrated, screen-normalised gaze."""
+        return bool(np.isfinite(self.screen_x).any())
+
+    def gaze(self):
+        """
+        Per-sample gaze point, using the left eye when available and the
+        right eye otherwise.
+
+        Returns:
+            (x, y) arrays with NaN where neither eye was tracked
+        """
+        left_ok = np.isfinite(self.left_x) & np.isfinite(self.left_y)
+        return (
+            np.where(left_ok, self.left_x, self.right_x),
+            np.where(left_ok, self.left_y, self.right_y),
+        )
+
+
+def _value(value):
+    return np.nan if value is None else value
+
+
+def _pupil_size(sample, left, right):
+    for value in (
+        sample.get("pupil_size"),
+        left.get("pupil_size"),
+        right.get("pupil_size"),
+    ):
+        if value is not None:
+            return value
+    return np.nan
+
+
+def load_session_samples(
+    db: Session,
+    session_id: int,
+    chunk_size: int = LOADER_CHUNK_SIZE,
+    trace: Optional[FeatureTrace] = None,
+) -> SessionSamples:
+    """
+    Load all acquisition samples of a session into column arrays.
+
+    Args:
+        db: Database session
+        session_id: Primary key of the session
+        chunk_size: Number of rows fetched per round trip
+        trace: Optional trace that receives the time spent parsing rows
+
+    Returns:
+        SessionSamples with float64 columns (NaN for missing values) and a
+        boolean blink column, in insertion order
+    """
+    expected = (
+        db.query(func.count(models.Results.id))
+        .filter(models.Results.session_id == session_id)
+        .scalar()
+    ) or 0
+
+    columns = np.full((8, expected), np.nan)
+    blink = np.zeros(expected, dtype=bool)
+
+    rows = (
+        db.query(models.Results.data)
+        .filter(models.Results.session_id == session_id)
+        .order_by(models.Results.id)
+        .yield_per(chunk_size)
+    )
+
+    filled = 0
+    parse_seconds = 0.0
+    for (data,) in rows:
+        if filled >= expected:
+            # Rows inserted after the count belong to a later computation.
+            break
+        parse_start = time.perf_counter()
+        sample = json.loads(data)
+        left = sample.get("left_eye") or {}
+        right = sample.get("right_eye") or {}
+        gaze = sample.get("gaze") or {}
+        columns[:, filled] = (
+            sample["timestamp"],
+            _value(left.get("x")),
+            _value(left.get("y")),
+            _value(right.get("x")),
+            _value(right.get("y")),
+            _pupil_size(sample, left, right),
+            _value(gaze.get("x")),
+            _value(gaze.get("y")),
+        )
+        blink[filled] = bool(sample.get("blink"))
+        filled += 1
+        parse_seconds += time.perf_counter() - parse_start
+
+    if trace is not None:
+        trace.add_time("parse", parse_seconds)
+
+    columns = columns[:, :filled]
+    return SessionSamples(
+        timestamps=columns[TIMESTAMP],
+        left_x=columns[LEFT_X],
+        left_y=columns[LEFT_Y],
+        right_x=columns[RIGHT_X],
+        right_y=columns[RIGHT_Y],
+        pupil=columns[PUPIL],
+        blink=blink[:filled],
+        screen_x=columns[SCREEN_X],
+        screen_y=columns[SCREEN_Y],
+    )
@@ -0,0 +1,88 @@
+"""
+In-process cache for session feature reports.
+
+Reports served by GET /features/sessions/{session_uid} are cached per
+(session_uid, feature_version) with a bounded LRU size and a TTL. Each entry
+carries an ETag so unchanged reports can be answered with 304 Not Modified.
+
+Entries are invalidated when features are recomputed, when task events are
+logged for the session, when the agent's clock offset for it changes and
+when the owning user is deleted. The cache is per
+worker process; the TTL bounds how long another worker can serve a report
+that was invalidated elsewhere.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+REPORT_CACHE_SIZE = int(os.getenv("FEATURE_REPORT_CACHE_SIZE", "256"))
+REPORT_CACHE_TTL = float(os.getenv("FEATURE_REPORT_CACHE_TTL", "300"))
+
+
+def compute_etag(report: Dict[str, Any]) -> str:
+    """Strong ETag derived from the serialized report."""
+    payload = json.dumps(report, sort_keys=True, default=str).encode()
+    return '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+
+class ReportCache:
+    def __init__(self, maxsize: int = REPORT_CACHE_SIZE, ttl: float = REPORT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str, dict]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, session_uid: str, version: str) -> Optional[Tuple[str, dict]]:
+        """Return (etag, report) for a live entry, or None."""
+        key = (session_uid, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, etag, report = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return etag, report
+
+    def put(self, session_uid: str, version: str, report: dict) -> str:
+        """Store a report and return its ETag."""
+        etag = compute_etag(report)
+        key = (session_uid, version)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, etag, report)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return etag
+
+    def invalidate(self, session_uids: Iterable[str]):
+        """Drop every cached version of the given sessions."""
+        targets = set(session_uids)
+        if not targets:
+            return
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in targets]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+report_cache = ReportCache()
+
+
+def invalidate_session_reports(*session_uids: str):
+    report_cache.invalidate(session_uids)
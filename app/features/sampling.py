@@ -0,0 +1,94 @@
+"""
+Effective sampling rate of a session.
+
+The agent reports its frame pacing with every acquisition batch
+(AcquisitionBatchStats). Sessions recorded by older agents have no such rows,
+in which case the rate and jitter are estimated from the sample timestamps.
+"""
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+
+def empty_sampling_features():
+    return {"sampling_rate": None, "sampling_jitter_ms": None, "dropped_frames": None}
+
+
+def estimate_sampling(timestamps):
+    """
+    Sampling rate and jitter from sample timestamps alone.
+
+    The median interval is used for the rate so that pauses between batches
+    or a stalled camera do not drag the estimate down.
+    """
+    features = empty_sampling_features()
+    intervals = np.diff(np.sort(np.asarray(timestamps, dtype=float)))
+    intervals = intervals[intervals > 0]
+    if len(intervals) == 0:
+        return features
+    features["sampling_rate"] = float(1.0 / np.median(intervals))
+    if len(intervals) > 1:
+        features["sampling_jitter_ms"] = float(np.std(intervals) * 1000)
+    return features
+
+
+def session_sampling(db: Session, session_id: int, timestamps) -> dict:
+    """
+    Summarise how a session was sampled.
+
+    Args:
+        db: Database session
+        session_id: Primary key of the session
+        timestamps: Sample timestamps, used when no batch stats were reported
+
+    Returns:
+        Dictionary with sampling_rate (frames per second over the time spent
+        acquiring), sampling_jitter_ms (frame-weighted mean inter-frame
+        jitter) and dropped_frames (None when unknown)
+    """
+    rows = (
+        db.query(
+            models.AcquisitionBatchStats.frames,
+            models.AcquisitionBatchStats.achieved_fps,
+            models.AcquisitionBatchStats.jitter_ms,
+            models.AcquisitionBatchStats.dropped_frames,
+        )
+        .filter(models.AcquisitionBatchStats.session_id == session_id)
+        .all()
+    )
+    if not rows:
+        return estimate_sampling(timestamps)
+
+    stats = np.array(
+        [
+            (
+                frames,
+                np.nan if achieved is None else achieved,
+                np.nan if jitter is None else jitter,
+                dropped or 0,
+            )
+            for frames, achieved, jitter, dropped in rows
+        ],
+        dtype=float,
+    )
+    frames, achieved, jitter, dropped = stats.T
+
+    features = empty_sampling_features()
+    features["dropped_frames"] = int(dropped.sum())
+
+    timed = (frames > 0) & (achieved > 0)
+    if timed.any():
+        # Frames divided by the time they took, across all batches.
+        seconds = (frames[timed] / achieved[timed]).sum()
+        features["sampling_rate"] = float(frames[timed].sum() / seconds)
+    else:
+        features["sampling_rate"] = estimate_sampling(timestamps)["sampling_rate"]
+
+    weighted = (frames > 0) & np.isfinite(jitter)
+    if weighted.any():
+        features["sampling_jitter_ms"] = float(
+            np.average(jitter[weighted], weights=frames[weighted])
+        )
+    return features
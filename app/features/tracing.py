@@ -0,0 +1,89 @@
+"""
+Level-gated tracing for feature computation.
+
+Per-trial diagnostics are emitted at DEBUG level only, and are formatted
+lazily so they cost nothing when DEBUG is off. One summary line with counts
+and phase timings is logged at INFO level for a sampled fraction of
+computations (FEATURE_TRACE_SAMPLE_RATE, default every computation).
+
+A single request can opt in to full tracing (trace=true on the compute
+endpoint); its summary is always logged and the collected trial diagnostics
+and phase timings are returned in the response.
+
+Records go to the app.features logger hierarchy; app.main sets its level
+from FEATURE_LOG_LEVEL at startup.
+"""
+
+from contextlib import contextmanager
+import logging
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.getenv("FEATURE_TRACE_SAMPLE_RATE", "1.0"))
+
+
+class FeatureTrace:
+    def __init__(self, session_uid: str, enabled: bool = False):
+        self.session_uid = session_uid
+        self.enabled = enabled
+        self.debug = enabled or logger.isEnabledFor(logging.DEBUG)
+        self.spans_ms: Dict[str, float] = {}
+        self.trials: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a phase of the computation."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float):
+        self.spans_ms[name] = self.spans_ms.get(name, 0.0) + seconds * 1000.0
+
+    def trial(self, condition: str, stimulus, outcome: str, rt=None):
+        """Record the outcome of one trial (no-op unless debugging)."""
+        if not self.debug:
+            return
+        logger.debug(
+            "session=%s %s trial stimulus=%s outcome=%s rt=%s",
+            self.session_uid,
+            condition,
+            stimulus,
+            outcome,
+            rt,
+        )
+        if self.enabled:
+            self.trials.append(
+                {
+                    "condition": condition,
+                    "stimulus": stimulus,
+                    "outcome": outcome,
+                    "rt": rt,
+                }
+            )
+
+    def summary(self, **fields):
+        """Log one summary line at INFO level, subject to sampling."""
+        if not (self.enabled or random.random() < TRACE_SAMPLE_RATE):
+            return
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        details = " ".join(f"{key}={value}" for key, value in fields.items())
+        timings = " ".join(
+            f"{name}={duration:.1f}ms" for name, duration in self.spans_ms.items()
+        )
+        logger.info(
+            "features session=%s %s timings: %s", self.session_uid, details, timings
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "spans_ms": {k: round(v, 3) for k, v in self.spans_ms.items()},
+            "trials": self.trials,
+        }
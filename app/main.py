@@ -4,6 +4,8 @@ from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from contextlib import asynccontextmanager
+import asyncio
+import logging
 import os
 from app.api import (
     intake,
@@ -21,21 +23,40 @@ from app.db import models
 from app.db.database import engine
 
 
+def configure_logging():
+    """
+    Level of the feature computation logs (FEATURE_LOG_LEVEL, default INFO).
+    A stream handler is added to the root logger only if nothing else has
+    configured logging, so a deployment's own configuration still applies.
+    """
+    logging.getLogger("app.features").setLevel(
+        os.getenv("FEATURE_LOG_LEVEL", "INFO").upper()
+    )
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Lifespan context manager for startup and shutdown events.
     Replaces deprecated @app.on_event("startup") pattern.
     """
+    configure_logging()
+
     try:
         models.Base.metadata.create_all(bind=engine)
     except Exception as e:
         print(f"Warning: Could not create database tables: {e}")
         print("  Tables may already exist or database connection issue.")
 
+    agent.registry.start()
+    expiry_task = asyncio.create_task(agent.run_expiry_loop())
+
     yield
 
-    pass
+    expiry_task.cancel()
+    agent.registry.stop()
 
 
 app = FastAPI(title="ZapGaze Backend", lifespan=lifespan)
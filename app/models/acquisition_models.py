@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 
 
 class EyeData(BaseModel):
@@ -8,10 +8,43 @@ class EyeData(BaseModel):
     pupil_size: Optional[float] = None
 
 
+class GazePoint(BaseModel):
+    """Calibrated gaze, normalised to the screen (0-1 on both axes)."""
+
+    x: Optional[float] = None
+    y: Optional[float] = None
+
+
 class AcquisitionData(BaseModel):
     session_uid: str
     timestamp: float
     left_eye: EyeData
     right_eye: EyeData
+    gaze: Optional[GazePoint] = None
     ear: Optional[float] = None
     blink: Optional[bool] = None
+    pupil_size: Optional[float] = None
+
+
+class AcquisitionBatchMetadata(BaseModel):
+    frames: int = Field(..., ge=0)
+    target_fps: Optional[float] = None
+    effective_fps: Optional[float] = None
+    achieved_fps: Optional[float] = None
+    jitter_ms: Optional[float] = None
+    dropped_frames: int = Field(0, ge=0)
+    inference_scale: Optional[float] = None
+    stage_ms: Dict[str, float] = Field(default_factory=dict)
+
+
+class AcquisitionBatch(BaseModel):
+    records: List[AcquisitionData]
+    metadata: Optional[AcquisitionBatchMetadata] = None
+
+
+class ClockEstimate(BaseModel):
+    """A client's clock offset estimate (app.acquisition.clock_sync.ClockFilter)."""
+
+    offset: float
+    round_trip: Optional[float] = Field(None, ge=0)
+    samples: Optional[int] = Field(None, ge=0)
@@ -1,40 +1,216 @@
+"""
+Go/No-Go trial timing.
+
+The whole run is scheduled up front: a seeded order with the exact go/no-go
+ratio, and onsets as absolute perf_counter deadlines from the start of the
+run, so a late trial does not push the next one back. Waits sleep until the
+last SPIN_WAIT seconds and then spin. Onsets are read once the stimulus has
+been drawn and reaction times are measured from them on the same clock.
+Timestamps handed to the caller are wall-clock times anchored once at the
+start, so they line up with the acquisition samples.
+"""
+
 import random
+import statistics
 import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+GO_STIMULUS = "O"
+NOGO_STIMULUS = "X"
+
+# Sleep granularity is a few milliseconds on most systems; the last part of
+# each wait is spent polling the clock instead.
+SPIN_WAIT = 0.002
+
+
+def build_schedule(
+    trials: int,
+    go_prob: float,
+    stim_duration: float,
+    isi: float,
+    response_window: float = 1.0,
+    seed: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Stimuli and onsets for a whole run.
+
+    Exactly round(trials * (1 - go_prob)) trials are No-Go, in an order
+    shuffled by `seed`. A trial shows its stimulus for stim_duration, accepts
+    a response until response_window after the stimulus is cleared and is
+    followed by isi.
+
+    Returns:
+        One dictionary per trial with index, stimulus and onset (seconds from
+        the start of the run)
+    """
+    trials = max(0, int(trials))
+    nogo = min(trials, max(0, round(trials * (1.0 - go_prob))))
+    stimuli = [NOGO_STIMULUS] * nogo + [GO_STIMULUS] * (trials - nogo)
+    random.Random(seed).shuffle(stimuli)
+
+    period = stim_duration + response_window + isi
+    return [
+        {"index": i, "stimulus": stimulus, "onset": i * period}
+        for i, stimulus in enumerate(stimuli)
+    ]
+
+
+def wait_until(
+    deadline: float,
+    clock: Callable[[], float] = time.perf_counter,
+    sleep: Callable[[float], None] = time.sleep,
+    spin: float = SPIN_WAIT,
+) -> float:
+    """
+    Block until clock() reaches `deadline`: sleep for most of the wait, then
+    spin for the final `spin` seconds.
+
+    Returns:
+        The clock reading at return
+    """
+    now = clock()
+    while deadline - now > spin:
+        sleep(deadline - now - spin)
+        now = clock()
+    while now < deadline:
+        now = clock()
+    return now
+
+
+def jitter_stats(errors: List[float]) -> Dict[str, Any]:
+    """
+    Summary of onset errors (actual minus scheduled onset, in seconds).
+
+    Returns:
+        Dictionary with trials and mean_ms, sd_ms, p95_ms (absolute error)
+        and max_ms; the millisecond values are None without trials
+    """
+    stats = {
+        "trials": len(errors),
+        "mean_ms": None,
+        "sd_ms": None,
+        "p95_ms": None,
+        "max_ms": None,
+    }
+    if not errors:
+        return stats
+    ms = [e * 1000 for e in errors]
+    absolute = sorted(abs(e) for e in ms)
+    stats["mean_ms"] = round(statistics.mean(ms), 3)
+    stats["sd_ms"] = round(statistics.pstdev(ms), 3)
+    stats["p95_ms"] = round(
+        absolute[min(len(absolute) - 1, int(0.95 * len(absolute)))], 3
+    )
+    stats["max_ms"] = round(absolute[-1], 3)
+    return stats
+
+
+def stdin_response(timeout: float) -> bool:
+    """Wait up to `timeout` seconds for Enter on stdin."""
+    import sys
+    import select
+
+    rlist, _, _ = select.select([sys.stdin], [], [], max(0.0, timeout))
+    if rlist:
+        sys.stdin.readline()
+        return True
+    return False
+
+
+def terminal_display(stimulus: Optional[str]):
+    print(f"\r{stimulus or ' '}", end="", flush=True)
 
 
 class GoNoGoTask:
-    def __init__(self, trials, go_prob, stim_duration, isi):
+    def __init__(
+        self,
+        trials,
+        go_prob,
+        stim_duration,
+        isi,
+        response_window=1.0,
+        seed=None,
+        display: Callable[[Optional[str]], None] = terminal_display,
+        poll_response: Callable[[float], bool] = stdin_response,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep,
+        wall_clock: Callable[[], float] = time.time,
+    ):
         self.trials = trials
         self.go_prob = go_prob
         self.stim_duration = stim_duration
         self.isi = isi
+        self.response_window = response_window
+        self.seed = seed
+        self.schedule = build_schedule(
+            trials, go_prob, stim_duration, isi, response_window, seed
+        )
+        self.display = display
+        self.poll_response = poll_response
+        self.clock = clock
+        self.sleep = sleep
+        self.wall_clock = wall_clock
+        self.onset_errors: List[float] = []
 
-    def run(self):
+    def run(self) -> Iterator[Dict[str, Any]]:
         """
-        Generator yielding (stimulus, onset_timestamp)
+        Run the schedule, yielding one result per trial once it has ended.
+
+        Each result has index, stimulus, onset (wall-clock time the stimulus
+        was shown), response (a key was pressed), rt (seconds from onset, None
+        without a response), response_time (wall-clock time of the response
+        or of the end of the response window) and onset_error_ms. The caller
+        runs during the following inter-stimulus interval and must not block
+        longer than isi; anything slow (uploads) belongs on another thread.
         """
-        for _ in range(self.trials):
-            stimulus = "X" if random.random() > self.go_prob else "O"
-            onset = time.time()
-            print(f"\r{stimulus}", end="", flush=True)
-            time.sleep(self.stim_duration)
-            print("\r ", end="", flush=True)
-            yield stimulus, onset
-            time.sleep(self.isi)
-
-    def wait_for_response(self, timeout=1.0):
+        self.onset_errors = []
+        start = self.clock()
+        wall_start = self.wall_clock()
+
+        def wall(t):
+            return wall_start + (t - start)
+
+        for trial in self.schedule:
+            scheduled = start + trial["onset"]
+            offset = scheduled + self.stim_duration
+
+            wait_until(scheduled, self.clock, self.sleep)
+            self.display(trial["stimulus"])
+            # Read after drawing, so display latency counts towards the onset
+            # error and not towards the reaction time.
+            onset = self.clock()
+            self.onset_errors.append(onset - scheduled)
+
+            response, responded_at = self._poll(offset)
+            wait_until(offset, self.clock, self.sleep)
+            self.display(None)
+            if not response:
+                response, responded_at = self._poll(offset + self.response_window)
+
+            yield {
+                "index": trial["index"],
+                "stimulus": trial["stimulus"],
+                "onset": wall(onset),
+                "response": response,
+                "rt": responded_at - onset if response else None,
+                "response_time": wall(responded_at),
+                "onset_error_ms": (onset - scheduled) * 1000,
+            }
+
+    def _poll(self, until: float):
         """
-        Waits up to `timeout` seconds for the user to press Enter.
-        Returns (response: bool, rt: float)
+        Wait for a key press until clock() reaches `until`.
+
+        Returns:
+            (responded, clock reading of the response, or `until`)
         """
-        start = time.time()
-        print("Press Enter for Go...", end="", flush=True)
-        import sys
-        import select
-
-        rlist, _, _ = select.select([sys.stdin], [], [], timeout)
-        if rlist:
-            _ = sys.stdin.readline()
-            rt = time.time() - start
-            return True, rt
-        return False, None
+        while True:
+            now = self.clock()
+            if now >= until:
+                return False, until
+            if self.poll_response(until - now):
+                return True, self.clock()
+
+    def jitter(self) -> Dict[str, Any]:
+        """Onset jitter statistics of the last run."""
+        return jitter_stats(self.onset_errors)
@@ -100,12 +100,25 @@ def verify_api_key_always_pass(api_key=None):
 def client(db_session):
     """Create a test client for API testing with database dependency override."""
     # Override get_db dependency in all routers
-    from app.api import intake, session, users, acquisition, features, calibration
-    from app.security import verify_frontend_api_key, verify_agent_api_key
+    from app.api import (
+        intake,
+        session,
+        session_events,
+        users,
+        acquisition,
+        features,
+        calibration,
+    )
+    from app.security import (
+        verify_frontend_api_key,
+        verify_agent_api_key,
+        verify_agent_or_frontend_api_key,
+    )
 
     # Patch get_db for all routers
     app.dependency_overrides[intake.get_db] = override_get_db
     app.dependency_overrides[session.get_db] = override_get_db
+    app.dependency_overrides[session_events.get_db] = override_get_db
     app.dependency_overrides[users.get_db] = override_get_db
     app.dependency_overrides[acquisition.get_db] = override_get_db
     app.dependency_overrides[features.get_db] = override_get_db
@@ -115,6 +128,9 @@ def client(db_session):
     # Override API key verification to always pass in tests
     app.dependency_overrides[verify_frontend_api_key] = verify_api_key_always_pass
     app.dependency_overrides[verify_agent_api_key] = verify_api_key_always_pass
+    app.dependency_overrides[verify_agent_or_frontend_api_key] = (
+        verify_api_key_always_pass
+    )
 
     # Create test client
     test_client = TestClient(app)
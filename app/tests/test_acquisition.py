@@ -39,6 +39,51 @@ def test_receive_acquisition_data(client: TestClient, db_session: Session):
     assert stored_data["timestamp"] == 1234567890.0
 
 
+def test_receive_acquisition_data_pupil_size(client: TestClient, db_session: Session):
+    """Test that pupil size is persisted with the sample."""
+    session = models.Session(session_uid="test-session-uid", user_id=None)
+    db_session.add(session)
+    db_session.commit()
+
+    data = {
+        "session_uid": "test-session-uid",
+        "timestamp": 1234567890.0,
+        "left_eye": {"x": 100.0, "y": 200.0},
+        "right_eye": {"x": 105.0, "y": 205.0},
+        "pupil_size": 4.2,
+    }
+
+    response = client.post("/acquisition/data", json=data)
+    assert response.status_code == 200
+
+    result = db_session.query(models.Results).filter_by(session_id=session.id).first()
+    assert json.loads(result.data)["pupil_size"] == 4.2
+
+
+def test_receive_acquisition_data_screen_gaze(client: TestClient, db_session: Session):
+    """Test calibrated screen-space gaze is stored next to the raw centres."""
+    session = models.Session(session_uid="test-session-uid", user_id=None)
+    db_session.add(session)
+    db_session.commit()
+
+    data = {
+        "session_uid": "test-session-uid",
+        "timestamp": 1234567890.0,
+        "left_eye": {"x": 100.0, "y": 200.0},
+        "right_eye": {"x": 105.0, "y": 205.0},
+        "gaze": {"x": 0.42, "y": 0.58},
+    }
+
+    response = client.post("/acquisition/data", json=data)
+    assert response.status_code == 200
+
+    stored = json.loads(
+        db_session.query(models.Results).filter_by(session_id=session.id).first().data
+    )
+    assert stored["gaze"] == {"x": 0.42, "y": 0.58}
+    assert stored["left_eye"]["x"] == 100.0
+
+
 def test_receive_acquisition_data_session_not_found(client: TestClient):
     """Test receiving acquisition data for non-existent session."""
     data = {
@@ -82,6 +127,55 @@ def test_receive_acquisition_batch(client: TestClient, db_session: Session):
     assert len(results) == 5
 
 
+def test_receive_acquisition_batch_with_metadata(
+    client: TestClient, db_session: Session
+):
+    """Test the agent's pacing metadata is stored with the batch."""
+    session = models.Session(session_uid="test-session-uid", user_id=None)
+    db_session.add(session)
+    db_session.commit()
+
+    payload = {
+        "records": [
+            {
+                "session_uid": "test-session-uid",
+                "timestamp": 1234567890.0 + i * 0.05,
+                "left_eye": {"x": 100.0, "y": 200.0},
+                "right_eye": {"x": 105.0, "y": 205.0},
+            }
+            for i in range(3)
+        ],
+        "metadata": {
+            "frames": 3,
+            "target_fps": 20.0,
+            "effective_fps": 20.0,
+            "achieved_fps": 19.6,
+            "jitter_ms": 2.5,
+            "dropped_frames": 1,
+            "inference_scale": 0.75,
+            "stage_ms": {"capture": 4.0, "analyze": 21.0},
+        },
+    }
+
+    response = client.post("/acquisition/batch", json=payload)
+    assert response.status_code == 200
+    assert response.json()["count"] == 3
+
+    assert (
+        db_session.query(models.Results).filter_by(session_id=session.id).count() == 3
+    )
+    stats = (
+        db_session.query(models.AcquisitionBatchStats)
+        .filter_by(session_id=session.id)
+        .one()
+    )
+    assert stats.frames == 3
+    assert stats.achieved_fps == 19.6
+    assert stats.dropped_frames == 1
+    assert stats.inference_scale == 0.75
+    assert json.loads(stats.stage_ms) == {"capture": 4.0, "analyze": 21.0}
+
+
 def test_receive_acquisition_batch_mixed_sessions(
     client: TestClient, db_session: Session
 ):
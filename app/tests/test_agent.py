@@ -3,15 +3,17 @@ Unit tests for agent API endpoints.
 """
 
 import pytest
+import threading
+import time
 from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 
 from app.api.agent import (
-    registered_agents,
-    agent_commands,
-    command_results,
-    stopped_agents,
+    registry,
+    pending_results,
+    heartbeat_waiters,
+    queue_command,
     HEARTBEAT_TIMEOUT,
 )
 
@@ -19,16 +21,12 @@ from app.api.agent import (
 @pytest.fixture(autouse=True)
 def clear_agent_state():
     """Clear agent state before each test."""
-    registered_agents.clear()
-    agent_commands.clear()
-    command_results.clear()
-    stopped_agents.clear()
+    registry.clear()
+    pending_results.clear()
+    heartbeat_waiters.clear()
     yield
     # Cleanup after test
-    registered_agents.clear()
-    agent_commands.clear()
-    command_results.clear()
-    stopped_agents.clear()
+    registry.clear()
 
 
 def test_register_agent(client: TestClient):
@@ -44,7 +42,7 @@ def test_register_agent(client: TestClient):
     assert "timestamp" in data
 
     # Verify agent is registered
-    assert "test-session-uid" in registered_agents
+    assert "test-session-uid" in registry.agents
 
 
 def test_register_agent_with_agent_id(client: TestClient):
@@ -56,7 +54,7 @@ def test_register_agent_with_agent_id(client: TestClient):
 
     data = response.json()
     assert data["agent_key"] == "test-agent-id"
-    assert "test-agent-id" in registered_agents
+    assert "test-agent-id" in registry.agents
 
 
 def test_agent_heartbeat(client: TestClient):
@@ -77,7 +75,7 @@ def test_agent_heartbeat(client: TestClient):
     assert isinstance(data["commands"], list)
 
     # Verify timestamp was updated
-    assert "test-session-uid" in registered_agents
+    assert "test-session-uid" in registry.agents
 
 
 def test_agent_heartbeat_stopped_agent(client: TestClient):
@@ -86,7 +84,7 @@ def test_agent_heartbeat_stopped_agent(client: TestClient):
     # Register and then stop agent
     registration = {"session_uid": "test-session-uid"}
     client.post("/agent/register", json=registration)
-    stopped_agents.add("test-session-uid")
+    registry.stopped.add("test-session-uid")
 
     # Send heartbeat
     heartbeat = {"session_uid": "test-session-uid"}
@@ -111,7 +109,7 @@ def test_agent_heartbeat_with_commands(client: TestClient):
         "type": "calibrate_start",
         "params": {},
     }
-    agent_commands["test-session-uid"] = [command]
+    registry.commands["test-session-uid"] = [command]
 
     # Send heartbeat
     heartbeat = {"session_uid": "test-session-uid"}
@@ -125,7 +123,7 @@ def test_agent_heartbeat_with_commands(client: TestClient):
     assert data["commands"][0]["type"] == "calibrate_start"
 
     # Command should be removed after being returned
-    assert len(agent_commands["test-session-uid"]) == 0
+    assert len(registry.commands["test-session-uid"]) == 0
 
 
 def test_agent_heartbeat_with_command_result(client: TestClient):
@@ -148,8 +146,8 @@ def test_agent_heartbeat_with_command_result(client: TestClient):
     assert response.status_code == 200
 
     # Verify result was stored
-    assert "test-command-id" in command_results
-    assert command_results["test-command-id"]["success"] is True
+    assert "test-command-id" in registry.results
+    assert registry.results["test-command-id"]["success"] is True
 
 
 def test_agent_status(client: TestClient):
@@ -200,7 +198,7 @@ def test_agent_unregister(client: TestClient):
     # Register agent
     registration = {"session_uid": "test-session-uid"}
     client.post("/agent/register", json=registration)
-    assert "test-session-uid" in registered_agents
+    assert "test-session-uid" in registry.agents
 
     # Unregister agent (DELETE method, not POST)
     response = client.delete("/agent/unregister?session_uid=test-session-uid")
@@ -210,7 +208,7 @@ def test_agent_unregister(client: TestClient):
     assert data["status"] == "unregistered"
 
     # Verify agent is removed
-    assert "test-session-uid" not in registered_agents
+    assert "test-session-uid" not in registry.agents
 
 
 def test_agent_heartbeat_timeout(client: TestClient):
@@ -218,10 +216,334 @@ def test_agent_heartbeat_timeout(client: TestClient):
 
     # Register agent with old timestamp
     old_time = datetime.now() - HEARTBEAT_TIMEOUT - timedelta(seconds=1)
-    registered_agents["test-session-uid"] = old_time
+    registry.agents["test-session-uid"] = old_time
 
     # Check status - should be disconnected due to timeout
     response = client.get("/agent/status?session_uid=test-session-uid")
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "disconnected"
+
+
+def _call_in_thread(client: TestClient, path: str, **kwargs):
+    """Run a proxy request in the background and return (thread, holder)."""
+    holder = {}
+
+    def run():
+        holder["response"] = client.post(path, **kwargs)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, holder
+
+
+def _wait_for_command(agent_key: str, timeout: float = 2.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if registry.commands.get(agent_key):
+            return registry.commands[agent_key][0]
+        time.sleep(0.01)
+    raise AssertionError("command was never queued")
+
+
+def test_proxy_resolves_when_result_delivered(client: TestClient):
+    """A proxy returns as soon as the heartbeat carrying its result arrives."""
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+    thread, holder = _call_in_thread(client, "/agent/calibrate/start")
+
+    command = _wait_for_command("agent-1")
+    assert command["type"] == "calibrate_start"
+    assert command["command_id"] in pending_results
+
+    start = time.monotonic()
+    client.post(
+        "/agent/heartbeat",
+        json={
+            "agent_id": "agent-1",
+            "command_result": {
+                "command_id": command["command_id"],
+                "result": {"status": "calibration_started"},
+                "success": True,
+            },
+        },
+    )
+    thread.join(timeout=5)
+
+    assert holder["response"].status_code == 200
+    assert holder["response"].json() == {"status": "calibration_started"}
+    assert time.monotonic() - start < 1.0
+    assert not pending_results
+    assert command["command_id"] not in registry.results
+
+
+def test_proxy_failed_result(client: TestClient):
+    """A failed command surfaces the agent error as a 500."""
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+    thread, holder = _call_in_thread(
+        client,
+        "/agent/start",
+        json={"session_uid": "test-session-uid", "api_url": "http://localhost:8000"},
+    )
+
+    command = _wait_for_command("agent-1")
+    client.post(
+        "/agent/heartbeat",
+        json={
+            "agent_id": "agent-1",
+            "command_result": {
+                "command_id": command["command_id"],
+                "result": None,
+                "success": False,
+                "error": "camera unavailable",
+            },
+        },
+    )
+    thread.join(timeout=5)
+
+    assert holder["response"].status_code == 500
+    assert holder["response"].json()["detail"] == "camera unavailable"
+
+
+def test_proxy_timeout(client: TestClient):
+    """Proxies give up with 504 once the per-command timeout elapses."""
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+    with patch.dict("app.api.agent.COMMAND_TIMEOUTS", {"calibrate_finish": 0.1}):
+        response = client.post("/agent/calibrate/finish")
+
+    assert response.status_code == 504
+    assert not pending_results
+
+
+def test_proxy_without_agent(client: TestClient):
+    """Proxies fail fast when no agent is connected."""
+
+    response = client.post("/agent/calibrate/finish")
+    assert response.status_code == 503
+
+
+def test_heartbeat_long_poll_times_out(client: TestClient):
+    """A long-poll heartbeat with nothing queued returns after wait seconds."""
+
+    start = time.monotonic()
+    response = client.post(
+        "/agent/heartbeat", json={"agent_id": "agent-1", "wait": 0.2}
+    )
+    elapsed = time.monotonic() - start
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["commands"] == []
+    assert data["long_poll"] is True
+    assert 0.2 <= elapsed < 2.0
+    assert not heartbeat_waiters
+
+
+def test_heartbeat_long_poll_wakes_on_command(client: TestClient):
+    """Queuing a command releases a waiting long-poll heartbeat immediately."""
+
+    thread, holder = _call_in_thread(
+        client, "/agent/heartbeat", json={"agent_id": "agent-1", "wait": 10}
+    )
+
+    deadline = time.monotonic() + 2
+    while "agent-1" not in heartbeat_waiters and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    start = time.monotonic()
+    command = {"command_id": "cmd-1", "type": "calibrate_start", "params": {}}
+    queue_command("agent-1", command)
+    thread.join(timeout=5)
+
+    assert time.monotonic() - start < 1.0
+    assert holder["response"].json()["commands"] == [command]
+
+
+def test_heartbeat_long_poll_returns_stopped(client: TestClient):
+    """Stopping an agent releases its long-poll with the stop signal."""
+    thread, holder = _call_in_thread(
+        client, "/agent/heartbeat", json={"agent_id": "agent-1", "wait": 10}
+    )
+
+    deadline = time.monotonic() + 2
+    while "agent-1" not in heartbeat_waiters and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    registry.mark_stopped("agent-1")
+    thread.join(timeout=5)
+
+    assert holder["response"].json()["status"] == "stopped"
+
+
+def _answer_next_command(client: TestClient, agent_id: str) -> dict:
+    """Act as agent_id: take its next command and report success."""
+    command = _wait_for_command(agent_id)
+    client.post(
+        "/agent/heartbeat",
+        json={
+            "agent_id": agent_id,
+            "command_result": {
+                "command_id": command["command_id"],
+                "result": {"agent": agent_id},
+                "success": True,
+            },
+        },
+    )
+    return command
+
+
+def test_pair_routes_commands_to_paired_agent(client: TestClient):
+    """With several agents connected, commands follow the session pairing."""
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+    client.post("/agent/heartbeat", json={"agent_id": "agent-2"})
+
+    response = client.post(
+        "/agent/pair", json={"session_uid": "session-b", "agent_id": "agent-2"}
+    )
+    assert response.status_code == 200
+    assert registry.paired_agent("session-b") == "agent-2"
+
+    thread, holder = _call_in_thread(
+        client, "/agent/calibrate/start", params={"session_uid": "session-b"}
+    )
+    command = _answer_next_command(client, "agent-2")
+    thread.join(timeout=5)
+
+    assert command["type"] == "calibrate_start"
+    assert holder["response"].json() == {"agent": "agent-2"}
+    assert not registry.commands.get("agent-1")
+
+
+def test_unpaired_session_with_multiple_agents_conflicts(client: TestClient):
+    """Commands are never guessed onto one of several agents."""
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+    client.post("/agent/heartbeat", json={"agent_id": "agent-2"})
+
+    response = client.post("/agent/calibrate/finish", params={"session_uid": "s"})
+    assert response.status_code == 409
+    assert not registry.commands
+
+
+def test_single_agent_fallback_pairs_session(client: TestClient):
+    """With one agent connected an unpaired session is bound to it."""
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+
+    thread, holder = _call_in_thread(
+        client, "/agent/calibrate/start", params={"session_uid": "session-a"}
+    )
+    _answer_next_command(client, "agent-1")
+    thread.join(timeout=5)
+
+    assert holder["response"].status_code == 200
+    assert registry.paired_agent("session-a") == "agent-1"
+
+
+def test_heartbeat_pairs_session_and_status(client: TestClient):
+    """A heartbeat carrying both IDs pairs them; status resolves the pairing."""
+
+    client.post(
+        "/agent/heartbeat", json={"agent_id": "agent-1", "session_uid": "session-a"}
+    )
+    assert registry.paired_agent("session-a") == "agent-1"
+    assert "session-a" not in registry.agents
+
+    data = client.get("/agent/status?session_uid=session-a").json()
+    assert data["status"] == "connected"
+    assert data["agent_id"] == "agent-1"
+
+
+def test_pair_requires_connected_agent(client: TestClient):
+    response = client.post(
+        "/agent/pair", json={"session_uid": "session-a", "agent_id": "ghost"}
+    )
+    assert response.status_code == 404
+
+
+def test_paired_agent_disconnected(client: TestClient):
+    registry.agents["agent-1"] = (
+        datetime.now() - HEARTBEAT_TIMEOUT - timedelta(seconds=1)
+    )
+    client.post("/agent/heartbeat", json={"agent_id": "agent-2"})
+    registry.pair("session-a", "agent-1")
+
+    response = client.post("/agent/stop", params={"session_uid": "session-a"})
+    assert response.status_code == 503
+    assert not registry.commands
+
+
+def test_agent_metrics(client: TestClient):
+    """Registry gauges are exposed for monitoring."""
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+    queue_command("agent-1", {"command_id": "c1", "type": "calibrate_start"})
+    registry.store_result("orphan", {"success": True})
+
+    data = client.get("/agent/metrics").json()
+    assert data["agents"] == 1
+    assert data["queued_commands"] == 1
+    assert data["results"] == 1
+    assert data["stopped_agents"] == 0
+    assert data["pending_results"] == 0
+    assert data["expiry_queue"] >= 3
+
+
+def test_expiry_loop_evicts_stale_agents(client: TestClient):
+    """The background sweep drops agents whose heartbeat expired."""
+    import asyncio
+    from app.api.agent import run_expiry_loop
+
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+
+    async def sweep_once():
+        with patch.object(registry, "presence_ttl", 0):
+            registry.touch("agent-1")
+        task = asyncio.create_task(run_expiry_loop(interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(sweep_once())
+    assert "agent-1" not in registry.agents
+
+
+def test_heartbeat_with_coalesced_results(client: TestClient):
+    """Several results delivered in one heartbeat are all recorded."""
+
+    response = client.post(
+        "/agent/heartbeat",
+        json={
+            "agent_id": "agent-1",
+            "command_results": [
+                {"command_id": "c1", "result": {"n": 1}, "success": True},
+                {"command_id": "c2", "result": None, "success": False, "error": "x"},
+            ],
+        },
+    )
+    assert response.status_code == 200
+    assert registry.results["c1"]["result"] == {"n": 1}
+    assert registry.results["c2"]["error"] == "x"
+
+
+def test_results_only_heartbeat_leaves_commands_queued(client: TestClient):
+    """A results-only post stores results without taking queued commands."""
+    queue_command("agent-1", {"command_id": "next", "type": "calibrate_point"})
+
+    response = client.post(
+        "/agent/heartbeat",
+        json={
+            "agent_id": "agent-1",
+            "results_only": True,
+            "wait": 5,
+            "command_results": [{"command_id": "c1", "result": {}, "success": True}],
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["commands"] == []
+    assert registry.results["c1"]["success"] is True
+
+    response = client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+    assert [c["command_id"] for c in response.json()["commands"]] == ["next"]
@@ -0,0 +1,254 @@
+"""
+Tests for the agent registry backends (in-memory and Postgres).
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents.expiry import ExpiryQueue
+from app.agents.registry import InMemoryAgentRegistry, create_agent_registry
+from app.agents.postgres_registry import PostgresAgentRegistry
+from app.tests.conftest import TEST_DATABASE_URL, TestingSessionLocal
+
+
+class Recorder:
+    """Collects listener callbacks, which may fire on a background thread."""
+
+    def __init__(self):
+        self.values = []
+        self.event = threading.Event()
+
+    def __call__(self, value):
+        self.values.append(value)
+        self.event.set()
+
+    def wait_for(self, value, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while value not in self.values and time.monotonic() < deadline:
+            self.event.wait(0.05)
+            self.event.clear()
+        return value in self.values
+
+
+def _postgres_registry(**ttls):
+    registry = PostgresAgentRegistry(
+        database_url=TEST_DATABASE_URL, session_factory=TestingSessionLocal, **ttls
+    )
+    registry.start()
+    assert registry.listening.wait(5)
+    return registry
+
+
+@pytest.fixture(params=["memory", "postgres"])
+def agent_registry(request, db_session):
+    if request.param == "memory":
+        registry = InMemoryAgentRegistry()
+    else:
+        registry = _postgres_registry()
+    commands, results = Recorder(), Recorder()
+    registry.listen(commands, results)
+    registry.commands_seen, registry.results_seen = commands, results
+    yield registry
+    registry.stop()
+
+
+def test_create_agent_registry():
+    assert isinstance(create_agent_registry("memory"), InMemoryAgentRegistry)
+    with pytest.raises(ValueError):
+        create_agent_registry("redis")
+
+
+def test_presence(agent_registry):
+    timestamp = agent_registry.touch("agent-a")
+    agent_registry.touch("agent-b")
+
+    assert agent_registry.last_seen("agent-a") == timestamp
+    assert agent_registry.last_seen("missing") is None
+    assert agent_registry.active_agents(timedelta(seconds=30)) == [
+        "agent-a",
+        "agent-b",
+    ]
+
+    time.sleep(0.01)
+    assert agent_registry.active_agents(timedelta(0)) == []
+
+
+def test_command_queue(agent_registry):
+    agent_registry.push_command("agent-a", {"command_id": "c1", "type": "x"})
+    agent_registry.push_command("session-1", {"command_id": "c2", "type": "y"})
+    agent_registry.push_command("agent-a", {"command_id": "c3", "type": "z"})
+
+    assert agent_registry.commands_seen.wait_for("agent-a")
+    assert agent_registry.has_commands(["agent-a"])
+    assert not agent_registry.has_commands(["agent-b"])
+
+    commands = agent_registry.pop_commands(["agent-a", "session-1"])
+    command_ids = [c["command_id"] for c in commands]
+    assert sorted(command_ids) == ["c1", "c2", "c3"]
+    # Commands for one agent keep their queue order.
+    assert command_ids.index("c1") < command_ids.index("c3")
+    assert agent_registry.pop_commands(["agent-a", "session-1"]) == []
+
+
+def test_results(agent_registry):
+    payload = {"result": {"ok": True}, "success": True, "error": None}
+    agent_registry.store_result("c1", payload)
+
+    assert agent_registry.results_seen.wait_for("c1")
+    assert agent_registry.pop_result("c1") == payload
+    assert agent_registry.pop_result("c1") is None
+
+
+def test_stop_and_remove(agent_registry):
+    agent_registry.touch("agent-a")
+    agent_registry.touch("agent-b")
+    agent_registry.push_command("agent-b", {"command_id": "c1", "type": "x"})
+
+    agent_registry.mark_stopped("agent-a")
+    assert agent_registry.is_stopped(["agent-a", None])
+    assert not agent_registry.is_stopped(["agent-b"])
+    assert agent_registry.active_agents(timedelta(seconds=30)) == ["agent-b"]
+    assert agent_registry.commands_seen.wait_for("agent-a")
+
+    assert agent_registry.remove("agent-b") is True
+    assert agent_registry.remove("agent-b") is False
+    assert agent_registry.pop_commands(["agent-b"]) == []
+
+    agent_registry.clear()
+    assert not agent_registry.is_stopped(["agent-a"])
+
+
+def test_postgres_registry_shared_between_workers(db_session):
+    """Commands queued on one worker wake and reach another worker."""
+
+    worker_a = _postgres_registry()
+    worker_b = _postgres_registry()
+    woken = Recorder()
+    worker_b.listen(woken, Recorder())
+    try:
+        worker_a.push_command("agent-a", {"command_id": "c1", "type": "x"})
+        assert woken.wait_for("agent-a")
+        assert worker_b.pop_commands(["agent-a"]) == [{"command_id": "c1", "type": "x"}]
+        assert worker_a.pop_commands(["agent-a"]) == []
+    finally:
+        worker_a.stop()
+        worker_b.stop()
+
+
+def test_proxy_round_trip_with_postgres_registry(client: TestClient, monkeypatch):
+    """A proxy is resolved through LISTEN/NOTIFY when the result is stored."""
+    from app.api import agent as agent_module
+
+    registry = _postgres_registry()
+    registry.listen(agent_module._on_command_queued, agent_module._on_result_stored)
+    monkeypatch.setattr(agent_module, "registry", registry)
+
+    try:
+        client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+        holder = {}
+        thread = threading.Thread(
+            target=lambda: holder.update(
+                response=client.post("/agent/calibrate/finish")
+            )
+        )
+        thread.start()
+
+        response = client.post(
+            "/agent/heartbeat", json={"agent_id": "agent-1", "wait": 5}
+        )
+        commands = response.json()["commands"]
+        assert [c["type"] for c in commands] == ["calibrate_finish"]
+
+        client.post(
+            "/agent/heartbeat",
+            json={
+                "agent_id": "agent-1",
+                "command_result": {
+                    "command_id": commands[0]["command_id"],
+                    "result": {"status": "calibration_finished"},
+                    "success": True,
+                },
+            },
+        )
+        thread.join(timeout=5)
+
+        assert holder["response"].status_code == 200
+        assert holder["response"].json() == {"status": "calibration_finished"}
+        assert registry.pop_result(commands[0]["command_id"]) is None
+    finally:
+        registry.stop()
+
+
+def test_expiry_queue_lazy_reschedule():
+    queue = ExpiryQueue()
+    queue.schedule("a", 10, now=0)
+    queue.schedule("b", 5, now=0)
+    queue.schedule("a", 20, now=0)  # rescheduled; the first entry goes stale
+    queue.schedule("c", 1, now=0)
+    queue.cancel("c")
+
+    assert queue.pop_expired(now=4) == []
+    assert queue.pop_expired(now=15) == ["b"]
+    assert queue.pop_expired(now=25) == ["a"]
+    assert len(queue) == 0
+
+
+@pytest.mark.parametrize("backend", ["memory", "postgres"])
+def test_expire(backend, db_session):
+    ttls = dict(
+        presence_ttl=0.2,
+        command_ttl=0.2,
+        result_ttl=0.2,
+        stopped_ttl=0.2,
+        pairing_ttl=0.2,
+    )
+    if backend == "memory":
+        registry = InMemoryAgentRegistry(**ttls)
+    else:
+        registry = PostgresAgentRegistry(
+            database_url=TEST_DATABASE_URL,
+            session_factory=TestingSessionLocal,
+            **ttls,
+        )
+
+    registry.touch("stale-agent")
+    registry.push_command("stale-agent", {"command_id": "c1", "type": "x"})
+    registry.push_command("session-1", {"command_id": "c2", "type": "x"})
+    registry.store_result("orphan", {"success": True})
+    registry.mark_stopped("stopped-agent")
+    registry.pair("session-1", "stale-agent")
+
+    assert registry.expire() == {
+        "agents": 0,
+        "commands": 0,
+        "results": 0,
+        "stopped": 0,
+        "pairings": 0,
+    }
+
+    time.sleep(0.1)
+    registry.touch("live-agent")
+    time.sleep(0.15)
+
+    evicted = registry.expire()
+    assert evicted == {
+        "agents": 1,
+        "commands": 2,
+        "results": 1,
+        "stopped": 1,
+        "pairings": 1,
+    }
+    assert registry.last_seen("live-agent") is not None
+    assert registry.last_seen("stale-agent") is None
+    assert not registry.is_stopped(["stopped-agent"])
+
+    stats = registry.stats()
+    assert stats["agents"] == 1
+    assert stats["queued_commands"] == 0
+    assert stats["results"] == 0
+    assert stats["stopped_agents"] == 0
+    assert stats["pairings"] == 0
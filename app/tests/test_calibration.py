@@ -0,0 +1,489 @@
+"""
+Unit tests for the gaze calibration engine.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from app.acquisition.calibration import (
+    CALIBRATION_TARGET_ERROR,
+    CalibrationEngine,
+    HomographyModel,
+    Poly2Model,
+    apply_transform,
+    point_weight,
+    validation_error,
+)
+
+GRID = [(x, y) for y in (10, 50, 90) for x in (10, 50, 90)]
+
+
+def _engine(raw_of, points=GRID, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    engine = CalibrationEngine()
+    qualities = []
+    for x, y in points:
+        rx, ry = raw_of(x, y)
+        qualities.append(
+            engine.add_point(x, y, rx + rng.normal(0, noise), ry + rng.normal(0, noise))
+        )
+    return engine, qualities
+
+
+def test_affine_recovers_linear_mapping():
+    """Test three points give an exact affine map with the legacy A/b keys."""
+    engine, qualities = _engine(lambda x, y: (300 + 2 * x, 200 + 3 * y), GRID[:3])
+    engine.add_point(10, 50, 320, 350)
+
+    transform = engine.transform()
+
+    assert transform["model"] == "affine"
+    assert np.allclose(transform["A"], [[0.5, 0.0], [0.0, 1 / 3]], atol=1e-4)
+    assert transform["target_scale"] == 100.0
+    raw = np.array([[400.0, 350.0]])
+    assert np.allclose(apply_transform(transform, raw), [[50.0, 50.0]], atol=1e-3)
+    legacy = {"A": transform["A"], "b": transform["b"]}
+    assert np.allclose(apply_transform(legacy, raw), [[50.0, 50.0]], atol=1e-3)
+    assert qualities[0]["model"] is None
+
+
+def test_rls_matches_batch_least_squares():
+    """Test the incremental estimate equals a batch fit of the same points."""
+    engine, _ = _engine(
+        lambda x, y: (300 + 0.5 * x + 0.002 * x * x, 200 + 0.4 * y), noise=0.3
+    )
+    running = engine.models["poly2"]
+    batch = running.fit(np.asarray(engine.raw), np.asarray(engine.targets))
+
+    raw = np.asarray(engine.raw)
+    assert np.allclose(running.predict(raw), batch.predict(raw), atol=1e-3)
+
+
+def test_cross_validation_selects_poly2_for_curved_mapping():
+    """Test a quadratic distortion is picked up by the second-order model."""
+    engine, qualities = _engine(
+        lambda x, y: (300 + 0.5 * x + 0.002 * x * x, 200 + 0.4 * y), noise=0.05
+    )
+
+    quality = qualities[-1]
+    assert quality["points"] == 9
+    assert quality["model"] == "poly2"
+    assert quality["cv_error"]["poly2"] < quality["cv_error"]["affine"]
+    assert isinstance(engine.models["poly2"], Poly2Model)
+
+    transform = engine.transform()
+    raw = np.array([[300 + 0.5 * 30 + 0.002 * 900, 200 + 0.4 * 70]])
+    assert np.allclose(apply_transform(transform, raw), [[30.0, 70.0]], atol=0.5)
+
+
+def test_cross_validation_selects_homography_for_projective_mapping():
+    """Test a perspective distortion is modelled by the homography."""
+
+    def raw_of(x, y):
+        w = 1 + 0.004 * x + 0.002 * y
+        return ((300 + 1.5 * x) / w, (200 + 1.2 * y) / w)
+
+    points = GRID + [(30, 30), (70, 70), (30, 70)]
+    engine, qualities = _engine(raw_of, points, noise=0.01)
+
+    assert qualities[-1]["model"] == "homography"
+    assert isinstance(engine.models["homography"], HomographyModel)
+    assert qualities[-1]["error"] < 0.5
+
+
+def test_converged_once_error_is_stable():
+    """Test early stopping is signalled once accuracy stops improving."""
+    _, qualities = _engine(lambda x, y: (300 + 0.5 * x, 200 + 0.4 * y), noise=0.05)
+
+    assert not any(q["converged"] for q in qualities[:4])
+    assert qualities[-1]["converged"]
+
+
+def test_transform_needs_three_points():
+    """Test fitting with too few points is rejected."""
+    engine, _ = _engine(lambda x, y: (x, y), GRID[:2])
+    with pytest.raises(ValueError):
+        engine.transform()
+    with pytest.raises(ValueError):
+        CalibrationEngine().transform()
+
+
+def test_point_weight_prefers_full_steady_points():
+    """Test weights follow coverage and inverse squared dispersion."""
+    assert point_weight(30, 0.8, 30) == 1.0
+    assert point_weight(30, 4.0, 30) == pytest.approx(1 / 16)
+    assert point_weight(15, 0.8, 30) == 0.5
+    assert point_weight(0, None, 30) == 0.0
+    assert point_weight(None, None, 30) == 1.0
+
+
+def test_validation_error_in_percent_of_screen():
+    """Test a saved transform is checked against a fresh measurement."""
+    engine, _ = _engine(lambda x, y: (300 + 2 * x, 200 + 3 * y))
+    transform = engine.transform()
+
+    assert validation_error(transform, 30, 70, 360, 410) == pytest.approx(0, abs=1e-3)
+    assert validation_error(transform, 30, 70, 366, 410) == pytest.approx(3, abs=1e-3)
+
+
+def test_calibration_point_stores_sampling_quality(client, db_session):
+    """Test dispersion and sample count are kept and optional."""
+    from app.db import models
+
+    db_session.add(models.Session(session_uid="cal-session", user_id=None))
+    db_session.commit()
+
+    point = {"screen_x": 10, "screen_y": 90, "measured_x": 312.5, "measured_y": 230}
+    response = client.post(
+        "/session/cal-session/calibration/point",
+        json={**point, "dispersion": 1.25, "samples": 28},
+    )
+    assert response.status_code == 200
+    response = client.post("/session/cal-session/calibration/point", json=point)
+    assert response.status_code == 200
+
+    rows = client.get("/session/cal-session/calibration").json()
+    assert [(r["dispersion"], r["samples"]) for r in rows] == [(1.25, 28), (None, None)]
+
+
+def _user_sessions(db_session, *uids):
+    from datetime import date
+    from app.db import models
+
+    user = models.User(name="Jane Doe", birthdate=date(1995, 5, 15))
+    db_session.add(user)
+    db_session.commit()
+    sessions = [models.Session(session_uid=uid, user_id=user.id) for uid in uids]
+    db_session.add_all(sessions)
+    db_session.commit()
+    return user, sessions
+
+
+def _grid_points(noise=0.2):
+    rng = np.random.default_rng(0)
+    return [
+        {
+            "screen_x": x,
+            "screen_y": y,
+            "measured_x": 300 + 2 * x + rng.normal(0, noise),
+            "measured_y": 200 + 3 * y + rng.normal(0, noise),
+            "dispersion": 0.8,
+            "samples": 30,
+        }
+        for x, y in GRID
+    ]
+
+
+def _post_grid(db_session, session_uid):
+    """Store a 3x3 calibration grid for the session."""
+    from app.db import models
+
+    session = db_session.query(models.Session).filter_by(session_uid=session_uid).one()
+    db_session.add_all(
+        models.CalibrationPoint(session_id=session.id, **point)
+        for point in _grid_points()
+    )
+    db_session.commit()
+
+
+def test_fit_calibration_from_stored_points(client, db_session):
+    """Test the backend fits and stores the session's transform."""
+    from app.db import models
+
+    _user_sessions(db_session, "first-visit")
+    _post_grid(db_session, "first-visit")
+
+    response = client.post("/session/first-visit/calibration/fit")
+
+    assert response.status_code == 200
+    calibration = response.json()["calibration"]
+    assert calibration["source"] == "grid"
+    assert calibration["points"] == 9
+    assert calibration["valid"] is True
+    row = db_session.query(models.SessionCalibration).one()
+    transform = json.loads(row.transform)
+    assert np.allclose(
+        apply_transform(transform, [[400.0, 350.0]]), [[50.0, 50.0]], atol=0.5
+    )
+
+
+def test_fit_calibration_needs_points(client, db_session):
+    """Test fitting without enough points is rejected."""
+    _user_sessions(db_session, "empty-session")
+
+    response = client.post("/session/empty-session/calibration/fit")
+
+    assert response.status_code == 400
+
+
+def test_previous_calibration_offered_at_session_start(client, db_session):
+    """Test a returning user gets their last valid calibration."""
+    from app.db import models
+
+    _, (first, second) = _user_sessions(db_session, "first-visit", "second-visit")
+    _post_grid(db_session, "first-visit")
+    fitted = client.post("/session/first-visit/calibration/fit").json()
+
+    response = client.post("/session/start", json={"session_uid": "second-visit"})
+    assert response.status_code == 200
+    previous = response.json()["previous_calibration"]
+    assert previous["id"] == fitted["calibration"]["id"]
+    assert "transform" not in previous
+
+    response = client.get("/session/second-visit/calibration/previous")
+    assert response.json()["id"] == previous["id"]
+
+    # A session's own calibration and invalid fits are never offered.
+    response = client.get("/session/first-visit/calibration/previous")
+    assert response.status_code == 404
+    db_session.query(models.SessionCalibration).update({"valid": False})
+    db_session.commit()
+    response = client.get("/session/second-visit/calibration/previous")
+    assert response.status_code == 404
+
+
+def test_previous_calibration_is_per_user(client, db_session):
+    """Test another user's calibration is neither offered nor reusable."""
+    from app.db import models
+
+    _user_sessions(db_session, "jane-session")
+    _post_grid(db_session, "jane-session")
+    fitted = client.post("/session/jane-session/calibration/fit").json()
+    _, (other,) = _user_sessions(db_session, "john-session")
+
+    assert client.get("/session/john-session/calibration/previous").status_code == 404
+    response = client.post(
+        "/session/john-session/calibration/reuse",
+        json={"calibration_id": fitted["calibration"]["id"], "error": 1.0},
+    )
+    assert response.status_code == 404
+    assert db_session.query(models.SessionCalibration).count() == 1
+
+
+def test_reuse_calibration_records_session_transform(client, db_session):
+    """Test a validated calibration is stored for the new session."""
+    from app.db import models
+
+    _, (first, second) = _user_sessions(db_session, "first-visit", "second-visit")
+    _post_grid(db_session, "first-visit")
+    fitted = client.post("/session/first-visit/calibration/fit").json()["calibration"]
+
+    response = client.post(
+        "/session/second-visit/calibration/reuse",
+        json={"calibration_id": fitted["id"], "error": 2.5},
+    )
+
+    assert response.status_code == 200
+    reused = response.json()["calibration"]
+    assert (reused["source"], reused["error"], reused["valid"]) == ("reused", 2.5, True)
+    row = db_session.query(models.SessionCalibration).filter_by(id=reused["id"]).one()
+    assert row.session_id == second.id
+    assert row.reused_from_id == fitted["id"]
+    # The reused calibration is now the most recent one of the user.
+    response = client.post("/session/start", json={"session_uid": "first-visit"})
+    assert response.json()["previous_calibration"]["id"] == reused["id"]
+
+
+def test_reuse_calibration_over_target_error_is_not_reusable(client, db_session):
+    """Test a reuse with a poor validation error is not offered again."""
+    _user_sessions(db_session, "first-visit", "second-visit", "third-visit")
+    _post_grid(db_session, "first-visit")
+    fitted = client.post("/session/first-visit/calibration/fit").json()["calibration"]
+
+    for error in (CALIBRATION_TARGET_ERROR + 1.0, None):
+        response = client.post(
+            "/session/second-visit/calibration/reuse",
+            json={"calibration_id": fitted["id"], "error": error},
+        )
+        assert response.json()["calibration"]["valid"] is False
+
+    response = client.get("/session/third-visit/calibration/previous")
+    assert response.json()["id"] == fitted["id"]
+
+
+def test_validate_previous_calibration_dispatches_to_agent(client, db_session):
+    """Test a validation point is measured by the session's agent."""
+    import threading
+    import time
+    from app.api.agent import pending_results, registry
+
+    registry.clear()
+    pending_results.clear()
+    _user_sessions(db_session, "first-visit", "second-visit")
+    _post_grid(db_session, "first-visit")
+    fitted = client.post("/session/first-visit/calibration/fit").json()["calibration"]
+    client.post("/agent/heartbeat", json={"agent_id": "agent-1"})
+
+    holder = {}
+    thread = threading.Thread(
+        target=lambda: holder.update(
+            response=client.post(
+                "/session/second-visit/calibration/validate", json={"x": 30, "y": 70}
+            )
+        )
+    )
+    thread.start()
+    deadline = time.monotonic() + 2
+    while not registry.commands.get("agent-1") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    command = registry.commands["agent-1"][0]
+    client.post(
+        "/agent/heartbeat",
+        json={
+            "agent_id": "agent-1",
+            "command_result": {
+                "command_id": command["command_id"],
+                "result": {"error": 1.2, "valid": True},
+                "success": True,
+            },
+        },
+    )
+    thread.join(timeout=5)
+    registry.clear()
+
+    assert command["type"] == "calibrate_validate"
+    assert command["params"]["calibration_id"] == fitted["id"]
+    assert command["params"]["transform"]["model"] == "affine"
+    assert command["params"]["session_uid"] == "second-visit"
+    assert holder["response"].status_code == 200
+    assert holder["response"].json() == {
+        "error": 1.2,
+        "valid": True,
+        "calibration_id": fitted["id"],
+    }
+
+
+def test_validate_without_previous_calibration(client, db_session):
+    """Test validation is refused when there is nothing to reuse."""
+    _user_sessions(db_session, "first-visit")
+
+    response = client.post(
+        "/session/first-visit/calibration/validate", json={"x": 30, "y": 70}
+    )
+
+    assert response.status_code == 404
+
+
+def test_calibration_batch_stores_run_once(client, db_session):
+    """Test a batch upload is stored in one go and retries are ignored."""
+    from app.db import models
+
+    _user_sessions(db_session, "batch-session")
+    points = _grid_points()
+    engine = CalibrationEngine.from_points(
+        (p["screen_x"], p["screen_y"], p["measured_x"], p["measured_y"]) for p in points
+    )
+    batch = {"run_id": "run-1", "points": points, "transform": engine.transform()}
+
+    first = client.post("/session/batch-session/calibration/batch", json=batch)
+    retry = client.post("/session/batch-session/calibration/batch", json=batch)
+
+    assert first.status_code == 200
+    assert first.json()["duplicate"] is False
+    assert first.json()["agent_agrees"] is True
+    assert first.json()["calibration"]["points"] == 9
+    assert first.json()["calibration"]["valid"] is True
+    assert retry.status_code == 200
+    assert retry.json()["duplicate"] is True
+    assert retry.json()["calibration"]["id"] == first.json()["calibration"]["id"]
+    assert db_session.query(models.CalibrationPoint).count() == 9
+    assert db_session.query(models.SessionCalibration).count() == 1
+    stored = client.get("/session/batch-session/calibration").json()
+    assert stored[0]["samples"] == 30
+
+
+def test_calibration_batch_fits_without_transform(client, db_session):
+    """Test the backend fits the run's own points when no transform is sent."""
+    from app.db import models
+
+    _user_sessions(db_session, "batch-session")
+    # Points of an earlier, abandoned run must not leak into the fit.
+    client.post(
+        "/session/batch-session/calibration/point",
+        json={"screen_x": 50, "screen_y": 50, "measured_x": 0, "measured_y": 0},
+    )
+
+    response = client.post(
+        "/session/batch-session/calibration/batch",
+        json={"run_id": "run-2", "points": _grid_points()},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["calibration"]["points"] == 9
+    row = db_session.query(models.SessionCalibration).one()
+    assert row.run_id == "run-2"
+    assert np.allclose(
+        apply_transform(json.loads(row.transform), [[400.0, 350.0]]),
+        [[50.0, 50.0]],
+        atol=0.5,
+    )
+
+
+def test_calibration_batch_ignores_agent_transform(client, db_session):
+    """Test the stored transform and its validity come from the backend's fit."""
+    from app.db import models
+
+    _user_sessions(db_session, "batch-session")
+    points = _grid_points()
+    # Claims a perfect fit but maps every eye position to the screen centre.
+    bogus = {
+        "model": "affine",
+        "params": [[50.0, 50.0], [0.0, 0.0], [0.0, 0.0]],
+        "raw_center": [400.0, 350.0],
+        "raw_scale": 50.0,
+        "quality": {"error": 0.0},
+    }
+
+    response = client.post(
+        "/session/batch-session/calibration/batch",
+        json={"run_id": "run-6", "points": points, "transform": bogus},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["agent_agrees"] is False
+    row = db_session.query(models.SessionCalibration).one()
+    transform = json.loads(row.transform)
+    assert transform["quality"]["error"] != 0.0
+    assert np.allclose(
+        apply_transform(transform, [[320.0, 230.0]]), [[10.0, 10.0]], atol=0.5
+    )
+
+
+def test_calibration_batch_is_all_or_nothing(client, db_session):
+    """Test a rejected batch stores none of its points."""
+    from app.db import models
+
+    _user_sessions(db_session, "batch-session")
+
+    too_few = client.post(
+        "/session/batch-session/calibration/batch",
+        json={"run_id": "run-3", "points": _grid_points()[:2]},
+    )
+    bad_transform = client.post(
+        "/session/batch-session/calibration/batch",
+        json={"run_id": "run-4", "points": _grid_points(), "transform": {"A": 1}},
+    )
+
+    assert too_few.status_code == 400
+    assert bad_transform.status_code == 422
+    assert db_session.query(models.CalibrationPoint).count() == 0
+    assert db_session.query(models.SessionCalibration).count() == 0
+
+
+def test_reuse_calibration_is_idempotent(client, db_session):
+    """Test a retried reuse upload does not add a second row."""
+    from app.db import models
+
+    _user_sessions(db_session, "first-visit", "second-visit")
+    _post_grid(db_session, "first-visit")
+    fitted = client.post("/session/first-visit/calibration/fit").json()["calibration"]
+    body = {"calibration_id": fitted["id"], "error": 2.0, "run_id": "run-5"}
+
+    first = client.post("/session/second-visit/calibration/reuse", json=body)
+    retry = client.post("/session/second-visit/calibration/reuse", json=body)
+
+    assert retry.json()["duplicate"] is True
+    assert retry.json()["calibration"]["id"] == first.json()["calibration"]["id"]
+    assert db_session.query(models.SessionCalibration).count() == 2
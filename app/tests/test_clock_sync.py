@@ -0,0 +1,141 @@
+"""
+Unit tests for clock offset estimation and per-session storage.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.acquisition.clock_sync import ClockFilter, ntp_sample
+from app.api.agent import registry
+from app.db import models
+from app.features.clock import (
+    AGENT_CLOCK,
+    TASK_CLOCK,
+    session_clock_offsets,
+    to_backend_clock,
+)
+from app.features.report_cache import report_cache
+
+
+def test_ntp_sample_excludes_server_hold_time():
+    """Test offset and round trip of a long-polled request."""
+    # Client clock 2 s behind the backend, 50 ms each way, held 20 s.
+    t0 = 100.0
+    t1 = t0 + 2.0 + 0.05
+    t2 = t1 + 20.0
+    t3 = t2 - 2.0 + 0.05
+    offset, delay = ntp_sample(t0, t1, t2, t3)
+    assert offset == pytest.approx(2.0)
+    assert delay == pytest.approx(0.1)
+
+
+def test_clock_filter_prefers_smallest_round_trip():
+    """Test that the least delayed exchange wins and bad responses are ignored."""
+    clock = ClockFilter(size=3)
+    assert clock.estimate() is None
+
+    # Slow return path biases the offset of the first exchange.
+    assert clock.add_response(0.0, 1.0, {"server_received": 1.1, "server_sent": 1.1})
+    assert clock.add_response(
+        10.0, 10.2, {"server_received": 11.1, "server_sent": 11.1}
+    )
+    assert not clock.add_response(20.0, 20.1, {"status": "ok"})
+    assert not clock.add_response(20.0, 20.1, None)
+
+    estimate = clock.estimate()
+    assert estimate["offset"] == pytest.approx(1.0)
+    assert estimate["round_trip"] == pytest.approx(0.2)
+    assert estimate["samples"] == 2
+
+
+def test_heartbeat_stores_agent_clock(client: TestClient, db_session: Session):
+    """Test that heartbeats report server times and store the agent offset."""
+    registry.clear()
+    sess = models.Session(session_uid="clock-session")
+    db_session.add(sess)
+    db_session.commit()
+
+    heartbeat = {
+        "agent_id": "clock-agent",
+        "session_uid": "clock-session",
+        "clock": {"offset": -1.5, "round_trip": 0.02, "samples": 3},
+    }
+    response = client.post("/agent/heartbeat", json=heartbeat)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["server_sent"] >= data["server_received"]
+
+    heartbeat["clock"]["offset"] = -1.25
+    client.post("/agent/heartbeat", json=heartbeat)
+    registry.clear()
+
+    rows = db_session.query(models.SessionClockSync).all()
+    assert len(rows) == 1
+    assert rows[0].source == AGENT_CLOCK
+    assert session_clock_offsets(db_session, sess.id) == {AGENT_CLOCK: -1.25}
+
+
+def test_heartbeat_stores_only_improved_agent_clock(
+    client: TestClient, db_session: Session
+):
+    """Test that the agent offset is written only when the estimate improves."""
+    registry.clear()
+    report_cache.clear()
+    sess = models.Session(session_uid="clock-improves")
+    db_session.add(sess)
+    db_session.commit()
+
+    def beat(offset, round_trip, samples):
+        heartbeat = {
+            "agent_id": "clock-improves-agent",
+            "session_uid": "clock-improves",
+            "clock": {"offset": offset, "round_trip": round_trip, "samples": samples},
+        }
+        assert client.post("/agent/heartbeat", json=heartbeat).status_code == 200
+        db_session.expire_all()
+        return db_session.query(models.SessionClockSync).one()
+
+    assert beat(0.5, 0.02, 1).samples == 1
+
+    # Same estimate, more exchanges seen: nothing to store, cache kept.
+    report_cache.put("clock-improves", "v1", {"features": {}})
+    assert beat(0.5004, 0.03, 2).samples == 1
+    assert len(report_cache) == 1
+
+    row = beat(0.5004, 0.01, 3)
+    assert (row.round_trip, row.samples) == (0.01, 3)
+    assert len(report_cache) == 0
+
+    report_cache.put("clock-improves", "v1", {"features": {}})
+    assert beat(0.6, 0.05, 4).offset == 0.6
+    assert len(report_cache) == 0
+    registry.clear()
+
+
+def test_task_events_store_client_clock(client: TestClient, db_session: Session):
+    """Test that task event uploads store the client's clock offset."""
+    sess = models.Session(session_uid="clock-events")
+    db_session.add(sess)
+    db_session.commit()
+
+    event = {"session_uid": "clock-events", "timestamp": 1.0, "event_type": "response"}
+    response = client.post(
+        "/session/events/batch",
+        json={"events": [event], "clock": {"offset": 0.25, "round_trip": 0.01}},
+    )
+    assert response.status_code == 200
+    assert "server_received" in response.json()
+    assert session_clock_offsets(db_session, sess.id) == {TASK_CLOCK: 0.25}
+
+    response = client.post(
+        "/session/event", json={**event, "clock": {"offset": 0.5, "round_trip": 0.01}}
+    )
+    assert response.status_code == 200
+    assert session_clock_offsets(db_session, sess.id) == {TASK_CLOCK: 0.5}
+
+
+def test_to_backend_clock():
+    """Test the vectorized timestamp correction."""
+    assert to_backend_clock([1.0, 2.0], 0.5).tolist() == [1.5, 2.5]
+    assert to_backend_clock([1.0, 2.0], None).tolist() == [1.0, 2.0]
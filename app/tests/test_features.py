@@ -0,0 +1,424 @@
+"""
+Unit tests for features API endpoints.
+"""
+
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+import json
+import numpy as np
+import time
+
+from app.db import models
+from app.features.config import (
+    CURRENT_FEATURE_VERSION,
+    FEATURE_CONFIGS,
+    FeatureConfig,
+    get_feature_config,
+    register_feature_config,
+)
+from app.features.loader import load_session_samples
+from app.features.pupillometry import compute_pupil_features
+from app.features.report_cache import ReportCache, report_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_report_cache():
+    """Clear the session report cache around each test."""
+    report_cache.clear()
+    yield
+    report_cache.clear()
+
+
+@pytest.fixture
+def session_with_data(db_session: Session):
+    """Create a user session with gaze samples and Go/No-Go events."""
+    user = models.User(name="John Doe", birthdate=date(1990, 1, 1))
+    db_session.add(user)
+    db_session.commit()
+
+    session = models.Session(session_uid="features-session", user_id=user.id)
+    db_session.add(session)
+    db_session.commit()
+    start = time.time() + 10
+
+    for i in range(40):
+        sample = {
+            "session_uid": "features-session",
+            "timestamp": start + i * 0.05,
+            "left_eye": {"x": 100.0 + (i // 10) * 80.0, "y": 200.0},
+            "right_eye": {"x": 300.0, "y": 200.0},
+            "blink": i == 20,
+        }
+        db_session.add(models.Results(session_id=session.id, data=json.dumps(sample)))
+
+    events = [
+        (0.1, "stimulus_onset", "O", None),
+        (0.5, "response", "O", True),
+        (1.0, "stimulus_onset", "X", None),
+        (1.6, "response", "X", True),
+    ]
+    for offset, event_type, stimulus, response in events:
+        db_session.add(
+            models.TaskEvent(
+                session_id=session.id,
+                timestamp=start + offset,
+                event_type=event_type,
+                stimulus=stimulus,
+                response=response,
+            )
+        )
+    db_session.commit()
+    return session
+
+
+@pytest.fixture
+def alternate_feature_version():
+    """Register a second feature version for the duration of a test."""
+    config = register_feature_config(
+        FeatureConfig(version="test-alt", fixation_threshold=500.0)
+    )
+    yield config
+    FEATURE_CONFIGS.pop(config.version, None)
+
+
+def test_compute_session_features(
+    client: TestClient, db_session: Session, session_with_data
+):
+    """Test computing features stores a row for the current version."""
+    response = client.post("/features/compute/features-session")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "session_features_computed"
+    assert data["feature_version"] == CURRENT_FEATURE_VERSION
+
+    sf = (
+        db_session.query(models.SessionFeatures)
+        .filter_by(session_id=session_with_data.id)
+        .one()
+    )
+    assert sf.feature_version == CURRENT_FEATURE_VERSION
+    assert json.loads(sf.feature_config)["fixation_threshold"] == 50.0
+    assert sf.total_blinks == 1
+    assert sf.omission_errors == 0
+
+
+def test_compute_session_features_sampling_from_batch_stats(
+    client: TestClient, db_session: Session, session_with_data
+):
+    """Test the reported frame pacing determines the session sampling rate."""
+    for frames, achieved, jitter, dropped in ((30, 20.0, 2.0, 0), (10, 10.0, 6.0, 4)):
+        db_session.add(
+            models.AcquisitionBatchStats(
+                session_id=session_with_data.id,
+                frames=frames,
+                target_fps=20.0,
+                achieved_fps=achieved,
+                jitter_ms=jitter,
+                dropped_frames=dropped,
+            )
+        )
+    db_session.commit()
+
+    client.post("/features/compute/features-session")
+    report = client.get("/features/sessions/features-session").json()
+
+    # 40 frames over 1.5 s + 1.0 s of acquisition
+    assert report["sampling_rate"] == pytest.approx(16.0)
+    assert report["sampling_jitter_ms"] == pytest.approx(3.0)
+    assert report["dropped_frames"] == 4
+
+
+def test_compute_session_features_sampling_from_timestamps(
+    client: TestClient, db_session: Session, session_with_data
+):
+    """Test sessions without batch stats estimate the rate from timestamps."""
+    client.post("/features/compute/features-session")
+
+    sf = (
+        db_session.query(models.SessionFeatures)
+        .filter_by(session_id=session_with_data.id)
+        .one()
+    )
+    assert sf.sampling_rate == pytest.approx(20.0)
+    assert sf.dropped_frames is None
+
+
+def test_compute_session_features_skips_existing_version(
+    client: TestClient, session_with_data
+):
+    """Test a second compute for the same version is skipped unless forced."""
+    client.post("/features/compute/features-session")
+
+    response = client.post("/features/compute/features-session")
+    assert response.json()["status"] == "session_features_cached"
+
+    response = client.post("/features/compute/features-session?force=true")
+    assert response.json()["status"] == "session_features_computed"
+
+
+def test_compute_session_features_trace(client: TestClient, session_with_data):
+    """Test a traced computation returns phase timings and trial outcomes."""
+    response = client.post("/features/compute/features-session?trace=true")
+    assert response.status_code == 200
+
+    trace = response.json()["trace"]
+    assert {"load", "parse", "task", "gaze", "pupil"} <= set(trace["spans_ms"])
+    outcomes = {(t["condition"], t["outcome"]) for t in trace["trials"]}
+    assert outcomes == {("go", "correct"), ("nogo", "correct_inhibition")}
+
+    response = client.post("/features/compute/features-session?force=true")
+    assert "trace" not in response.json()
+
+
+def test_compute_session_features_unknown_version(
+    client: TestClient, session_with_data
+):
+    """Test computing with an unregistered feature version."""
+    response = client.post("/features/compute/features-session?version=missing")
+    assert response.status_code == 400
+    assert "Unknown feature version" in response.json()["detail"]
+
+
+def test_compare_feature_versions(
+    client: TestClient, session_with_data, alternate_feature_version
+):
+    """Test two feature versions are stored and listed side by side."""
+    client.post("/features/compute/features-session")
+    client.post("/features/compute/features-session?version=test-alt")
+
+    response = client.get("/features/sessions/features-session/versions")
+    assert response.status_code == 200
+    versions = {v["feature_version"]: v for v in response.json()["versions"]}
+    assert set(versions) == {CURRENT_FEATURE_VERSION, "test-alt"}
+    assert versions["test-alt"]["config"]["fixation_threshold"] == 500.0
+    assert (
+        versions["test-alt"]["features"]["fixation_count"]
+        <= versions[CURRENT_FEATURE_VERSION]["features"]["fixation_count"]
+    )
+
+    response = client.get("/features/sessions/features-session?version=test-alt")
+    assert response.status_code == 200
+    assert response.json()["feature_version"] == "test-alt"
+
+
+def test_compute_session_features_screen_gaze(
+    client: TestClient, db_session: Session, session_with_data
+):
+    """Test calibrated screen-space gaze drives fixations from version 3 on."""
+    rows = db_session.query(models.Results).filter_by(session_id=session_with_data.id)
+    for row in rows:
+        sample = json.loads(row.data)
+        # The eyes move in camera space but the gaze stays on one screen spot.
+        sample["gaze"] = {"x": 0.5, "y": 0.5}
+        row.data = json.dumps(sample)
+    db_session.commit()
+
+    client.post("/features/compute/features-session")
+    client.post("/features/compute/features-session?version=2")
+
+    screen = client.get("/features/sessions/features-session").json()
+    camera = client.get("/features/sessions/features-session?version=2").json()
+
+    assert screen["gaze_space"] == "screen"
+    assert screen["fixation_count"] == 1
+    assert screen["gaze_dispersion"] == 0.0
+    assert camera["gaze_space"] == "camera"
+    assert camera["fixation_count"] > 1
+
+
+def test_compute_session_features_without_calibration_uses_camera(
+    client: TestClient, db_session: Session, session_with_data
+):
+    """Test uncalibrated sessions fall back to camera-space gaze."""
+    client.post("/features/compute/features-session")
+
+    sf = (
+        db_session.query(models.SessionFeatures)
+        .filter_by(session_id=session_with_data.id)
+        .one()
+    )
+    assert sf.gaze_space == "camera"
+
+
+def test_get_session_features_not_computed(client: TestClient, session_with_data):
+    """Test getting features before they are computed."""
+    response = client.get("/features/sessions/features-session")
+    assert response.status_code == 404
+
+
+def test_compute_pupil_features_per_condition():
+    """Test task-evoked pupil responses are separated by condition."""
+    rate = 50.0
+    timestamps = np.arange(0.0, 30.0, 1.0 / rate)
+    onsets = np.arange(2.0, 28.0, 2.0)
+    is_go = np.arange(len(onsets)) % 2 == 0
+
+    pupil = np.full_like(timestamps, 5.0)
+    for onset, go in zip(onsets, is_go):
+        amplitude = 0.5 if go else 1.0
+        pupil += amplitude * np.exp(-(((timestamps - onset - 0.6) / 0.15) ** 2))
+
+    blinks = np.zeros_like(timestamps, dtype=bool)
+    blink_idx = int(4.0 * rate)
+    pupil[blink_idx - 3 : blink_idx + 1] = np.nan
+    blinks[blink_idx] = True
+
+    features = compute_pupil_features(
+        timestamps, pupil, blinks, onsets, is_go, get_feature_config()
+    )
+
+    assert features["pupil_go_epochs"] == is_go.sum()
+    assert features["pupil_nogo_epochs"] == (~is_go).sum()
+    assert features["pupil_go_peak_dilation"] == pytest.approx(0.5, abs=0.05)
+    assert features["pupil_nogo_peak_dilation"] == pytest.approx(1.0, abs=0.05)
+    assert features["pupil_go_peak_latency"] == pytest.approx(0.6, abs=0.05)
+    assert features["pupil_nogo_auc"] > features["pupil_go_auc"] > 0
+    assert features["pupil_mean_size"] > 5.0
+
+
+def test_compute_pupil_features_without_pupil_data():
+    """Test pupil features are empty when no pupil size was recorded."""
+    timestamps = np.arange(0.0, 5.0, 0.05)
+    features = compute_pupil_features(
+        timestamps,
+        np.full_like(timestamps, np.nan),
+        np.zeros_like(timestamps, dtype=bool),
+        np.array([1.0]),
+        np.array([True]),
+        get_feature_config(),
+    )
+    assert all(value is None for value in features.values())
+
+
+def test_get_session_features_etag(client: TestClient, session_with_data):
+    """Test unchanged reports are answered with 304 Not Modified."""
+    client.post("/features/compute/features-session")
+
+    response = client.get("/features/sessions/features-session")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.json()["name"] == "John Doe"
+
+    response = client.get(
+        "/features/sessions/features-session", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    response = client.get(
+        "/features/sessions/features-session", headers={"If-None-Match": '"stale"'}
+    )
+    assert response.status_code == 200
+
+
+def test_session_report_invalidated(client: TestClient, session_with_data):
+    """Test cached reports are dropped on recompute and new task events."""
+    client.post("/features/compute/features-session")
+    response = client.get("/features/sessions/features-session")
+    assert response.json()["go_trial_count"] == 1
+    assert len(report_cache) == 1
+
+    client.post("/features/compute/features-session?force=true")
+    assert len(report_cache) == 0
+
+    client.get("/features/sessions/features-session")
+    client.post(
+        "/session/event",
+        json={
+            "session_uid": "features-session",
+            "timestamp": time.time() + 20,
+            "event_type": "stimulus_onset",
+            "stimulus": "O",
+        },
+    )
+    assert len(report_cache) == 0
+    response = client.get("/features/sessions/features-session")
+    assert response.json()["go_trial_count"] == 2
+
+
+def test_trial_count_uses_task_clock(client: TestClient, session_with_data, db_session):
+    """Test that event timestamps are compared to the session start on the backend clock."""
+    # The client clock runs an hour behind the backend.
+    for event in session_with_data.events:
+        event.timestamp -= 3600
+    db_session.commit()
+    client.post("/features/compute/features-session")
+    assert (
+        client.get("/features/sessions/features-session").json()["go_trial_count"] == 0
+    )
+
+    db_session.add(
+        models.SessionClockSync(
+            session_id=session_with_data.id, source="task", offset=3600.0
+        )
+    )
+    db_session.commit()
+    report_cache.clear()
+    response = client.get("/features/sessions/features-session")
+    assert response.json()["go_trial_count"] == 1
+
+
+def test_report_cache_bounds():
+    """Test the report cache evicts by size and expires by TTL."""
+    cache = ReportCache(maxsize=2, ttl=60)
+    cache.put("a", "1", {"v": 1})
+    cache.put("b", "1", {"v": 2})
+    cache.get("a", "1")
+    cache.put("c", "1", {"v": 3})
+    assert cache.get("b", "1") is None
+    assert cache.get("a", "1") is not None
+
+    expired = ReportCache(maxsize=2, ttl=-1)
+    expired.put("a", "1", {"v": 1})
+    assert expired.get("a", "1") is None
+
+
+def test_load_session_samples_in_chunks(db_session: Session, session_with_data):
+    """Test samples are streamed into column arrays across chunk boundaries."""
+    db_session.add(
+        models.Results(
+            session_id=session_with_data.id,
+            data=json.dumps(
+                {
+                    "session_uid": "features-session",
+                    "timestamp": 5000.0,
+                    "left_eye": {"x": None, "y": None, "pupil_size": 3.5},
+                    "right_eye": {"x": 310.0, "y": 210.0},
+                }
+            ),
+        )
+    )
+    db_session.commit()
+
+    samples = load_session_samples(db_session, session_with_data.id, chunk_size=7)
+
+    assert len(samples) == 41
+    assert samples.blink.sum() == 1
+    assert np.isnan(samples.left_x[-1])
+    assert samples.pupil[-1] == 3.5
+    assert np.isnan(samples.pupil[0])
+
+    gaze_x, gaze_y = samples.gaze()
+    assert gaze_x[0] == 100.0
+    assert (gaze_x[-1], gaze_y[-1]) == (310.0, 210.0)
+    assert not samples.has_screen_gaze
+
+
+def test_trial_count_ignores_task_clock_without_clock_correction(
+    client: TestClient, session_with_data, db_session
+):
+    """Test that reports of versions without clock correction ignore clock syncs."""
+    client.post("/features/compute/features-session?version=3")
+    report = client.get("/features/sessions/features-session?version=3").json()
+
+    db_session.add(
+        models.SessionClockSync(
+            session_id=session_with_data.id, source="task", offset=-3600.0
+        )
+    )
+    db_session.commit()
+    report_cache.clear()
+    response = client.get("/features/sessions/features-session?version=3")
+    assert response.json()["go_trial_count"] == report["go_trial_count"] == 1
@@ -6,9 +6,11 @@ import pytest
 from datetime import date, datetime
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
+from unittest.mock import patch
 
 from app.api.intake import IntakeData, IntakeResponse
 from app.db import models
+from app.utils.encryption import blind_index, credential_hash
 
 
 def test_create_intake_new_user(client: TestClient, db_session: Session):
@@ -56,6 +58,77 @@ def test_create_intake_new_user(client: TestClient, db_session: Session):
     assert intake.symptom_group == "Low"
 
 
+def test_create_intake_is_atomic(client: TestClient, db_session: Session):
+    """Test that a failing intake insert leaves no orphan user or session."""
+    intake_data = {
+        "name": "Jane Orphan",
+        "birthdate": "1990-01-01",
+        "answers": [0, 1, 2, 3, 4, 0],
+    }
+    with patch.object(models, "Intake", side_effect=RuntimeError("boom")):
+        response = client.post("/intake/", json=intake_data)
+    assert response.status_code == 500
+
+    assert db_session.query(models.User).count() == 0
+    assert db_session.query(models.Session).count() == 0
+
+
+def test_bulk_intake_import(client: TestClient, db_session: Session):
+    """Test importing many intakes in one request."""
+    records = [
+        {
+            "name": f"Patient {i}",
+            "birthdate": f"19{50 + i % 40}-02-03",
+            "answers": [i % 5, 4, 4, 0, 1, 2],
+            "created_at": "2024-05-01T10:00:00",
+        }
+        for i in range(60)
+    ]
+    response = client.post("/intake/bulk", json={"records": records})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 60
+    assert len(data["records"]) == 60
+
+    assert db_session.query(models.User).count() == 60
+    assert db_session.query(models.Intake).count() == 60
+    for i, imported in enumerate(data["records"]):
+        user = db_session.get(models.User, imported["user_id"])
+        assert user.name == f"Patient {i}"
+        assert user.birthdate == date(1950 + i % 40, 2, 3)
+        assert user.pseudonym_id.startswith("PSEUDO-")
+        assert user.name_index == blind_index(f"patient {i}")
+        assert user.name_tokens is None
+        assert user.credential_hash == credential_hash(user.name, user.birthdate)
+        intake = (
+            db_session.query(models.Intake)
+            .filter_by(session_uid=imported["session_uid"])
+            .one()
+        )
+        assert intake.user_id == user.id
+        assert intake.total_score == i % 5 + 11
+        assert intake.symptom_group == ("High" if i % 5 >= 3 else "Low")
+        assert intake.created_at == datetime(2024, 5, 1, 10, 0)
+    session = (
+        db_session.query(models.Session)
+        .filter_by(session_uid=data["records"][0]["session_uid"])
+        .one()
+    )
+    assert session.status == "imported"
+
+
+def test_bulk_intake_validation(client: TestClient, db_session: Session):
+    """Test that an invalid record rejects the whole import."""
+    records = [
+        {"name": "Valid", "birthdate": "1990-01-01", "answers": [0] * 6},
+        {"name": "Invalid", "birthdate": "1990-01-01", "answers": [0] * 5},
+    ]
+    response = client.post("/intake/bulk", json={"records": records})
+    assert response.status_code == 422
+    assert client.post("/intake/bulk", json={"records": []}).status_code == 422
+    assert db_session.query(models.User).count() == 0
+
+
 def test_create_intake_existing_user(client: TestClient, db_session: Session):
     """Test creating intake for an existing user."""
     # Create a user first
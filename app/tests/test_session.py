@@ -74,6 +74,32 @@ def test_session_stop(client: TestClient, db_session: Session):
     assert session.stopped_at is not None
 
 
+def test_session_stop_only_stops_paired_agent(client: TestClient, db_session: Session):
+    """Stopping a session queues the stop for its paired agent only."""
+    from app.api.agent import registry
+
+    registry.clear()
+    registry.touch("agent-1")
+    registry.touch("agent-2")
+    registry.pair("test-session-uid", "agent-2")
+    db_session.add(
+        models.Session(session_uid="test-session-uid", user_id=None, status="active")
+    )
+    db_session.commit()
+
+    try:
+        response = client.post(
+            "/session/stop", json={"session_uid": "test-session-uid"}
+        )
+        assert response.status_code == 200
+
+        assert [c["type"] for c in registry.commands["agent-2"]] == ["stop_acquisition"]
+        assert not registry.commands.get("agent-1")
+        assert registry.paired_agent("test-session-uid") is None
+    finally:
+        registry.clear()
+
+
 def test_session_stop_nonexistent(client: TestClient):
     """Test stopping a non-existent session."""
     response = client.post("/session/stop", json={"session_uid": "non-existent"})
@@ -103,3 +129,49 @@ def test_session_stop_requires_session_uid(client: TestClient):
     """Test that stopping a session requires session_uid."""
     response = client.post("/session/stop", json={})
     assert response.status_code == 422  # Validation error
+
+
+def test_log_events_batch(client: TestClient, db_session: Session):
+    """Test logging several task events in one request."""
+    for uid in ("batch-a", "batch-b"):
+        db_session.add(models.Session(session_uid=uid))
+    db_session.commit()
+
+    events = [
+        {
+            "session_uid": "batch-a" if i % 2 else "batch-b",
+            "timestamp": 1000.0 + i,
+            "event_type": "stimulus_onset" if i % 2 else "response",
+            "stimulus": "Go",
+            "response": None if i % 2 else True,
+        }
+        for i in range(10)
+    ]
+    response = client.post("/session/events/batch", json={"events": events})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "events_logged"
+    assert data["count"] == 10
+
+    stored = db_session.query(models.TaskEvent).order_by(models.TaskEvent.timestamp)
+    assert [e.timestamp for e in stored] == [e["timestamp"] for e in events]
+    sess = db_session.query(models.Session).filter_by(session_uid="batch-a").first()
+    assert len(sess.events) == 5
+
+
+def test_log_events_batch_unknown_session(client: TestClient, db_session: Session):
+    """Test that a batch naming an unknown session stores nothing."""
+    db_session.add(models.Session(session_uid="batch-known"))
+    db_session.commit()
+
+    events = [
+        {"session_uid": uid, "timestamp": 1.0, "event_type": "response"}
+        for uid in ("batch-known", "batch-missing")
+    ]
+    response = client.post("/session/events/batch", json={"events": events})
+    assert response.status_code == 404
+    assert "batch-missing" in response.json()["detail"]
+    assert db_session.query(models.TaskEvent).count() == 0
+
+    response = client.post("/session/events/batch", json={"events": []})
+    assert response.status_code == 422
@@ -0,0 +1,156 @@
+"""
+Unit tests for the Go/No-Go trial scheduler (app/tasks/task_manager.py).
+"""
+
+import pytest
+
+from app.tasks.task_manager import (
+    GO_STIMULUS,
+    NOGO_STIMULUS,
+    GoNoGoTask,
+    build_schedule,
+    jitter_stats,
+    wait_until,
+)
+
+
+class FakeClock:
+    """Clock that advances by `tick` on every reading and by the slept time."""
+
+    def __init__(self, start=100.0, tick=0.0001):
+        self.now = start
+        self.tick = tick
+        self.sleeps = []
+
+    def __call__(self):
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_build_schedule_is_counterbalanced_and_seeded():
+    """Test that the No-Go count is exact and the order depends only on the seed."""
+    schedule = build_schedule(200, 0.8, 0.5, 1.0, response_window=1.0, seed=7)
+    stimuli = [trial["stimulus"] for trial in schedule]
+    assert stimuli.count(NOGO_STIMULUS) == 40
+    assert stimuli.count(GO_STIMULUS) == 160
+    assert [trial["onset"] for trial in schedule[:3]] == [0.0, 2.5, 5.0]
+
+    again = build_schedule(200, 0.8, 0.5, 1.0, response_window=1.0, seed=7)
+    assert [trial["stimulus"] for trial in again] == stimuli
+    other = build_schedule(200, 0.8, 0.5, 1.0, response_window=1.0, seed=8)
+    assert [trial["stimulus"] for trial in other] != stimuli
+
+
+def test_wait_until_sleeps_then_spins():
+    """Test that a wait sleeps short of the deadline and never returns early."""
+    clock = FakeClock()
+    deadline = clock.now + 0.5
+    reached = wait_until(deadline, clock, clock.sleep, spin=0.002)
+    assert reached >= deadline
+    assert reached - deadline < 0.001
+    assert clock.sleeps and sum(clock.sleeps) < 0.5
+
+
+def test_run_keeps_onsets_on_schedule():
+    """Test that a slow caller does not delay later trials beyond the ISI."""
+    clock = FakeClock()
+    shown = []
+    task = GoNoGoTask(
+        trials=5,
+        go_prob=0.6,
+        stim_duration=0.5,
+        isi=1.0,
+        response_window=1.0,
+        seed=1,
+        display=shown.append,
+        poll_response=lambda timeout: clock.sleep(timeout) or False,
+        clock=clock,
+        sleep=clock.sleep,
+        wall_clock=lambda: 1000.0,
+    )
+
+    trials = []
+    for trial in task.run():
+        trials.append(trial)
+        clock.sleep(0.3)  # e.g. queuing events between trials
+
+    onsets = [trial["onset"] for trial in trials]
+    assert onsets == pytest.approx([1000.0 + 2.5 * i for i in range(5)], abs=1e-3)
+    assert all(trial["response"] is False and trial["rt"] is None for trial in trials)
+    assert trials[0]["response_time"] == pytest.approx(1001.5, abs=1e-3)
+    assert shown[:2] == [task.schedule[0]["stimulus"], None]
+
+    jitter = task.jitter()
+    assert jitter["trials"] == 5
+    assert 0 <= jitter["max_ms"] < 1
+
+
+def test_run_measures_reaction_time_from_onset():
+    """Test that a press during the stimulus gives its RT and clears on time."""
+    clock = FakeClock()
+    events = []
+
+    def press(timeout):
+        clock.sleep(min(timeout, 0.25))
+        return True
+
+    task = GoNoGoTask(
+        trials=1,
+        go_prob=1.0,
+        stim_duration=0.5,
+        isi=1.0,
+        display=lambda stimulus: events.append((stimulus, clock.now)),
+        poll_response=press,
+        clock=clock,
+        sleep=clock.sleep,
+        wall_clock=lambda: 0.0,
+    )
+    (trial,) = list(task.run())
+    assert trial["response"] is True
+    assert trial["rt"] == pytest.approx(0.25, abs=1e-3)
+    assert trial["response_time"] == pytest.approx(0.25, abs=1e-3)
+    (shown, on), (cleared, off) = events
+    assert shown == GO_STIMULUS and cleared is None
+    assert off - on == pytest.approx(0.5, abs=1e-3)
+
+
+def test_jitter_stats():
+    """Test onset jitter summary statistics."""
+    assert jitter_stats([])["mean_ms"] is None
+    stats = jitter_stats([0.001, 0.002, -0.003])
+    assert stats["trials"] == 3
+    assert stats["mean_ms"] == pytest.approx(0.0)
+    assert stats["max_ms"] == pytest.approx(3.0)
+    assert stats["p95_ms"] == pytest.approx(3.0)
+
+
+def test_run_counts_display_latency_in_onset():
+    """Test that the onset is read after the stimulus has been drawn."""
+    clock = FakeClock()
+
+    def slow_display(stimulus):
+        if stimulus:
+            clock.sleep(0.005)
+
+    def press(timeout):
+        clock.sleep(min(timeout, 0.2))
+        return True
+
+    task = GoNoGoTask(
+        trials=1,
+        go_prob=1.0,
+        stim_duration=0.5,
+        isi=1.0,
+        display=slow_display,
+        poll_response=press,
+        clock=clock,
+        sleep=clock.sleep,
+        wall_clock=lambda: 0.0,
+    )
+    (trial,) = list(task.run())
+    assert trial["onset_error_ms"] == pytest.approx(5.0, abs=0.5)
+    assert trial["rt"] == pytest.approx(0.2, abs=1e-3)
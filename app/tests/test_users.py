@@ -7,8 +7,24 @@ from datetime import date, datetime
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 import json
+from unittest.mock import patch
 
 from app.db import models
+from app.utils import encryption
+from app.utils.encryption import (
+    blind_index,
+    credential_hash,
+    decrypt,
+    name_query_tokens,
+    name_tokens,
+    normalize_name,
+)
+
+
+@pytest.fixture
+def ngram_search(monkeypatch):
+    """Turn on partial name search (n-gram tokens) for users created in the test."""
+    monkeypatch.setattr(encryption, "NAME_NGRAM_SEARCH", True)
 
 
 def test_search_users(client: TestClient, db_session: Session):
@@ -61,6 +77,91 @@ def test_search_users_partial_match(client: TestClient, db_session: Session):
     assert len(response.json()) == 1
 
 
+def test_search_users_without_ngrams_stores_no_tokens(
+    client: TestClient, db_session: Session
+):
+    """Test that n-gram tokens are only stored when partial search is on."""
+    user = models.User(name="John Doe", birthdate=date(1990, 1, 1))
+    db_session.add(user)
+    db_session.commit()
+    assert user.name_index == blind_index("john doe")
+    assert user.name_tokens is None
+
+    response = client.get("/users/search?name=ohn%20d")
+    assert [u["name"] for u in response.json()] == ["John Doe"]
+
+
+def test_search_users_ngram_mode(client: TestClient, db_session: Session, monkeypatch):
+    """Test partial matches with n-gram tokens, short queries and missing tokens."""
+    older = models.User(name="Johnny Appleseed", birthdate=date(1985, 3, 20))
+    db_session.add(older)
+    db_session.commit()
+    assert older.name_tokens is None
+
+    monkeypatch.setattr(encryption, "NAME_NGRAM_SEARCH", True)
+    user = models.User(name="John Doe", birthdate=date(1990, 1, 1))
+    db_session.add(user)
+    db_session.commit()
+    assert user.name_tokens == name_tokens("John Doe")
+
+    for query in ("ohn", "oh", "John"):
+        response = client.get(f"/users/search?name={query}")
+        assert [u["name"] for u in response.json()] == ["John Doe", "Johnny Appleseed"]
+    response = client.get("/users/search?name=doe")
+    assert [u["name"] for u in response.json()] == ["John Doe"]
+
+
+def test_name_blind_index_tokens(ngram_search):
+    """Test name normalisation and n-gram tokens for partial matches."""
+    assert normalize_name("  JOHN   Doe ") == "john doe"
+    tokens = set(name_tokens("John Doe"))
+    assert len(tokens) == len("john doe") - 2
+    for query in ("ohn", "John", "n d", "JOHN DOE"):
+        assert set(name_query_tokens(query)) <= tokens
+    assert not set(name_query_tokens("jane")) <= tokens
+    for query in (" ", "j", "oh"):
+        assert name_query_tokens(query) == []
+
+
+def test_name_query_tokens_off_by_default():
+    """Test that partial search tokens are opt-in."""
+    assert not encryption.NAME_NGRAM_SEARCH
+    assert name_query_tokens("John") == []
+
+
+def test_search_users_uses_blind_index(
+    client: TestClient, db_session: Session, ngram_search
+):
+    """Test that search decrypts only candidate users."""
+    for i in range(20):
+        db_session.add(models.User(name=f"Person {i}", birthdate=date(1990, 1, 1)))
+    john = models.User(name="John Doe", birthdate=date(1990, 1, 1))
+    db_session.add(john)
+    db_session.commit()
+
+    assert john.name_index == blind_index("john doe")
+    assert "John" not in john._name_encrypted
+
+    with patch("app.db.models.decrypt", wraps=decrypt) as mock_decrypt:
+        response = client.get("/users/search?name=ohn%20d")
+    assert [user["name"] for user in response.json()] == ["John Doe"]
+    # One candidate: its name and birthdate, not every user's name.
+    assert mock_decrypt.call_count < 10
+
+
+def test_search_users_finds_unindexed_users(client: TestClient, db_session: Session):
+    """Test that users not yet backfilled are still found."""
+    user = models.User(name="Legacy Person", birthdate=date(1980, 1, 1))
+    db_session.add(user)
+    db_session.commit()
+    user.name_index = None
+    user.name_tokens = None
+    db_session.commit()
+
+    response = client.get("/users/search?name=legacy")
+    assert [u["name"] for u in response.json()] == ["Legacy Person"]
+
+
 def test_search_users_no_results(client: TestClient):
     """Test searching for users that don't exist."""
     response = client.get("/users/search?name=Nonexistent")
@@ -173,3 +274,50 @@ def test_get_user_results_no_sessions(client: TestClient, db_session: Session):
     data = response.json()
     assert data["user_id"] == user.id
     assert len(data["sessions"]) == 0
+
+
+def test_results_by_credentials(client: TestClient, db_session: Session):
+    """Test the credential lookup uses the hash and decrypts only the match."""
+    for i in range(20):
+        db_session.add(models.User(name=f"Person {i}", birthdate=date(1990, 1, 1)))
+    user = models.User(name="John Doe", birthdate=date(1990, 1, 1))
+    db_session.add(user)
+    db_session.commit()
+    assert user.credential_hash == credential_hash("john doe", "1990-01-01")
+
+    with patch("app.db.models.decrypt", wraps=decrypt) as mock_decrypt:
+        response = client.get(
+            "/users/results/by-credentials?name=%20JOHN%20DOE&birthdate=1990-01-01"
+        )
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user.id
+    assert mock_decrypt.call_count < 10
+
+    response = client.get(
+        "/users/results/by-credentials?name=John%20Doe&birthdate=1990-01-02"
+    )
+    assert response.status_code == 404
+
+
+def test_results_by_credentials_unhashed_user(client: TestClient, db_session: Session):
+    """Test that users without a credential hash yet are still found."""
+    user = models.User(name="Legacy Person", birthdate=date(1980, 1, 1))
+    db_session.add(user)
+    db_session.commit()
+    user.credential_hash = None
+    db_session.commit()
+
+    response = client.get(
+        "/users/results/by-credentials?name=Legacy%20Person&birthdate=1980-01-01"
+    )
+    assert response.status_code == 200
+    assert response.json()["user_id"] == user.id
+
+
+def test_credential_hash_follows_setters(db_session: Session):
+    """Test the credential hash is kept in step with name and birthdate."""
+    user = models.User(name="John Doe", birthdate=date(1990, 1, 1))
+    user.name = "Jane Doe"
+    assert user.credential_hash == credential_hash("Jane Doe", date(1990, 1, 1))
+    user.birthdate = date(1991, 2, 3)
+    assert user.credential_hash == credential_hash("Jane Doe", date(1991, 2, 3))
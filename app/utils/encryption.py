@@ -4,9 +4,15 @@ Uses Fernet symmetric encryption to encrypt personal data at rest.
 """
 
 from cryptography.fernet import Fernet
+import hashlib
+import hmac
 import os
 import secrets
 import string
+import time
+import unicodedata
+from datetime import date
+from typing import Iterable, List, Optional
 
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
 
@@ -41,6 +47,110 @@ except Exception as e:
     )
 
 
+# Blind indexes are keyed HMACs, so equal values can be looked up in SQL
+# without storing the names. They are deterministic: a database dump still
+# shows which users share a name, and n-gram tokens expose how often each
+# n-gram occurs, enough for frequency analysis to recover common names. The
+# key is BLIND_INDEX_KEY, or derived from ENCRYPTION_KEY; changing it means
+# re-running scripts/migrate_name_blind_index.py --all.
+BLIND_INDEX_KEY = (
+    os.getenv("BLIND_INDEX_KEY", "").strip().encode()
+    or hmac.new(
+        ENCRYPTION_KEY.encode(), b"zapgaze blind index", hashlib.sha256
+    ).digest()
+)
+
+# Indexed partial name search stores blind-indexed n-grams of every name,
+# which leak more than the exact index, so it is off unless
+# NAME_NGRAM_SEARCH is set; without it /users/search decrypts and scans every
+# name. Turning it on (or off) means re-running
+# migrate_name_blind_index.py --all.
+NAME_NGRAM_SEARCH = os.getenv("NAME_NGRAM_SEARCH", "").strip().lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Length of the indexed n-grams. Shorter queries are answered by a scan.
+NAME_NGRAM_SIZE = 3
+# Hex characters kept per n-gram token. Collisions only add candidates,
+# which are checked after decryption.
+NGRAM_TOKEN_LENGTH = 16
+
+
+def normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive form of a name used for lookups."""
+    return " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+
+
+def blind_index(value: str) -> str:
+    """
+    Keyed hash of a value for equality lookups.
+
+    Args:
+        value: Plain text, already normalised
+
+    Returns:
+        Hex HMAC-SHA256 of the value
+    """
+    return hmac.new(BLIND_INDEX_KEY, value.encode(), hashlib.sha256).hexdigest()
+
+
+def _ngram_token(gram: str) -> str:
+    return blind_index(f"ngram:{gram}")[:NGRAM_TOKEN_LENGTH]
+
+
+def name_tokens(name: str) -> List[str]:
+    """Blind-indexed NAME_NGRAM_SIZE-grams of a normalised name."""
+    name = normalize_name(name)
+    n = NAME_NGRAM_SIZE
+    return sorted({_ngram_token(name[i : i + n]) for i in range(len(name) - n + 1)})
+
+
+def name_query_tokens(query: str) -> List[str]:
+    """
+    Tokens a name containing `query` must have. Empty when partial search is
+    off (NAME_NGRAM_SEARCH) or the query is shorter than NAME_NGRAM_SIZE;
+    such queries cannot use the index.
+    """
+    if not NAME_NGRAM_SEARCH:
+        return []
+    return name_tokens(query)
+
+
+def name_search_fields(name: str) -> dict:
+    """
+    Blind index columns of a User for the given plain text name; name_tokens
+    is None unless NAME_NGRAM_SEARCH is on.
+    """
+    return {
+        "name_index": blind_index(normalize_name(name)),
+        "name_tokens": name_tokens(name) if NAME_NGRAM_SEARCH else None,
+    }
+
+
+def credential_hash(name: str, birthdate) -> Optional[str]:
+    """
+    Blind index of a user's (name, birthdate) pair, for the results lookup
+    by credentials.
+
+    Args:
+        name: Plain text name; normalised like name_index
+        birthdate: date or ISO date string
+
+    Returns:
+        Hex HMAC, or None if either value is missing or not a valid date
+    """
+    name = normalize_name(name)
+    if not name or not birthdate:
+        return None
+    if isinstance(birthdate, str):
+        try:
+            birthdate = date.fromisoformat(birthdate.strip())
+        except ValueError:
+            return None
+    return blind_index(f"credential:{name}|{birthdate.isoformat()}")
+
+
 def encrypt(data: str) -> str:
     """
     Encrypt a string using Fernet symmetric encryption.
@@ -56,6 +166,26 @@ def encrypt(data: str) -> str:
     return cipher.encrypt(data.encode()).decode()
 
 
+def encrypt_many(values: Iterable[str]) -> List[str]:
+    """
+    Encrypt many strings, e.g. for a bulk import.
+
+    Every token still gets its own IV, but the whole batch shares one
+    timestamp and the per-call setup of encrypt(). Empty values stay "".
+
+    Args:
+        values: Plain text strings to encrypt
+
+    Returns:
+        Encrypted strings in the same order
+    """
+    now = int(time.time())
+    return [
+        cipher.encrypt_at_time(value.encode(), now).decode() if value else ""
+        for value in values
+    ]
+
+
 def decrypt(encrypted_data: str) -> str:
     """
     Decrypt a string that was encrypted with encrypt().
@@ -1,4 +1,4 @@
-import { FC, useState, useEffect, useCallback } from "react";
+import { FC, useState, useEffect, useCallback, useRef } from "react";
 import { Link, useNavigate } from "react-router-dom";
 import styles from "./TestPage.module.css";
 import EscapeConfirmationModal from "../components/modals/EscapeConfirmationModal";
@@ -6,6 +6,7 @@ import AgentInstallModal from "../components/modals/AgentInstallModal";
 import AgentStatusChecker from "../components/AgentStatusChecker";
 import { ASRS_QUESTIONS, ASRS_OPTIONS } from "./IntakeQuestionnairePage";
 import { apiCall, getApiBaseUrl } from "../utils/api";
+import { ClockFilter } from "../utils/clockSync";
 
 const CONFIG = {
   RESPONSE_TIME_LIMIT: 2000,
@@ -62,6 +63,10 @@ const TestPage: FC = () => {
   // Backend integration state
   const [sessionUid, setSessionUid] = useState<string | null>(null);
   const [calibrationError, setCalibrationError] = useState<string | null>(null);
+  // A returning user's last calibration, checked at a few dots before
+  // falling back to the full grid.
+  const [previousCalibration, setPreviousCalibration] = useState<any | null>(null);
+  const [validationStep, setValidationStep] = useState(0);
   const [acquisitionStarted, setAcquisitionStarted] = useState(false);
   const [isStartingTest, setIsStartingTest] = useState(false);
   const [isInitializingCamera, setIsInitializingCamera] = useState(false);
@@ -86,6 +91,34 @@ const TestPage: FC = () => {
     { x: 10, y: 50 }, // Left-center
   ];
 
+  // Dots used to check a previous calibration (away from the grid corners)
+  const validationDots: CalibrationPoint[] = [
+    { x: 30, y: 30 },
+    { x: 70, y: 70 },
+  ];
+
+  const sessionQuery = () =>
+    sessionUid ? `?session_uid=${encodeURIComponent(sessionUid)}` : "";
+
+  // Bind this session to the agent running on this machine so commands are
+  // not routed to another test taker's agent. Best effort: if the local agent
+  // cannot be reached directly the backend falls back to the only connected agent.
+  const pairAgent = async () => {
+    if (!sessionUid) return;
+    try {
+      const agentInfo = await fetch(`${CONFIG.AGENT_BASE_URL}/`, {
+        signal: AbortSignal.timeout(2000),
+      }).then((res) => res.json());
+      if (!agentInfo?.agent_id) return;
+      await apiCall(`${CONFIG.API_BASE_URL}/agent/pair`, {
+        method: "POST",
+        body: JSON.stringify({ session_uid: sessionUid, agent_id: agentInfo.agent_id }),
+      });
+    } catch (error) {
+      console.warn("Could not pair session with local agent:", error);
+    }
+  };
+
   const startCalibration = async () => {
     if (!agentConnected) {
       setShowAgentInstallModal(true);
@@ -100,12 +133,17 @@ const TestPage: FC = () => {
     const maxRetries = 30; // 30 attempts = ~30 seconds max
     let retryCount = 0;
 
+    await pairAgent();
+
     const tryStartCalibration = async (): Promise<void> => {
       try {
-        await apiCall(`${CONFIG.API_BASE_URL}/agent/calibrate/start`, {
+        const url = `${CONFIG.API_BASE_URL}/agent/calibrate/start${sessionQuery()}`;
+        await apiCall(url, {
           method: "POST",
         });
         console.log("Calibration started successfully");
+        setPreviousCalibration(await fetchPreviousCalibration());
+        setValidationStep(0);
         setIsInitializingCamera(false);
       } catch (error: any) {
         retryCount++;
@@ -141,6 +179,32 @@ const TestPage: FC = () => {
     tryStartCalibration();
   };
 
+  const fetchPreviousCalibration = async () => {
+    if (!sessionUid) return null;
+    try {
+      const url = `${CONFIG.API_BASE_URL}/session/${encodeURIComponent(sessionUid)}/calibration/previous`;
+      return await apiCall(url);
+    } catch (error) {
+      // 404: first visit or no recent valid calibration
+      return null;
+    }
+  };
+
+  const validateCalibrationPoint = async (point: CalibrationPoint) => {
+    const url = `${CONFIG.API_BASE_URL}/session/${encodeURIComponent(sessionUid ?? "")}/calibration/validate`;
+    const response = await apiCall(url, {
+      method: "POST",
+      body: JSON.stringify({
+        x: point.x,
+        y: point.y,
+        duration: CONFIG.CALIBRATION_POINT_DURATION / 1000,
+        samples: 30,
+      }),
+    });
+    console.log("Calibration check:", response);
+    return response;
+  };
+
   const recordCalibrationPoint = async (point: CalibrationPoint) => {
     try {
       const response = await apiCall(`${CONFIG.API_BASE_URL}/agent/calibrate/point`, {
@@ -164,7 +228,8 @@ const TestPage: FC = () => {
 
   const finishCalibration = async () => {
     try {
-      const response = await apiCall(`${CONFIG.API_BASE_URL}/agent/calibrate/finish`, {
+      const url = `${CONFIG.API_BASE_URL}/agent/calibrate/finish${sessionQuery()}`;
+      const response = await apiCall(url, {
         method: "POST",
       });
 
@@ -211,7 +276,8 @@ const TestPage: FC = () => {
 
   const stopAcquisition = async () => {
     try {
-      const response = await apiCall(`${CONFIG.API_BASE_URL}/agent/stop`, {
+      const url = `${CONFIG.API_BASE_URL}/agent/stop${sessionQuery()}`;
+      const response = await apiCall(url, {
         method: "POST",
       });
 
@@ -259,18 +325,31 @@ const TestPage: FC = () => {
     }
   };
 
+  const clockFilter = useRef(new ClockFilter());
+
+  // Event timestamps are on this browser's clock; each event carries the
+  // current offset estimate and its response refines it.
+  const postEvent = async (event: Record<string, unknown>) => {
+    const sent = Date.now() / 1000;
+    const data = await apiCall(`${CONFIG.API_BASE_URL}/session/event`, {
+      method: "POST",
+      body: JSON.stringify({
+        ...event,
+        session_uid: sessionUid,
+        clock: clockFilter.current.estimate(),
+      }),
+    });
+    clockFilter.current.addResponse(sent, Date.now() / 1000, data);
+  };
+
   const logStimulusOnset = async (stimulus: string) => {
     if (!sessionUid) return;
 
     try {
-      await apiCall(`${CONFIG.API_BASE_URL}/session/event`, {
-        method: "POST",
-        body: JSON.stringify({
-          session_uid: sessionUid,
-          timestamp: Date.now() / 1000,
-          event_type: "stimulus_onset",
-          stimulus: stimulus,
-        }),
+      await postEvent({
+        timestamp: Date.now() / 1000,
+        event_type: "stimulus_onset",
+        stimulus: stimulus,
       });
     } catch (error) {
       console.error("Failed to log stimulus onset:", error);
@@ -281,15 +360,11 @@ const TestPage: FC = () => {
     if (!sessionUid) return;
 
     try {
-      await apiCall(`${CONFIG.API_BASE_URL}/session/event`, {
-        method: "POST",
-        body: JSON.stringify({
-          session_uid: sessionUid,
-          timestamp: Date.now() / 1000,
-          event_type: "response",
-          stimulus: stimulus,
-          response: response,
-        }),
+      await postEvent({
+        timestamp: Date.now() / 1000,
+        event_type: "response",
+        stimulus: stimulus,
+        response: response,
       });
     } catch (error) {
       console.error("Failed to log response:", error);
@@ -444,7 +519,11 @@ const TestPage: FC = () => {
         calibrationStep === 0 &&
         (event.key === "Enter" || event.key === " ")
       ) {
-        setCalibrationStep(1);
+        if (previousCalibration && validationStep === 0) {
+          setValidationStep(1);
+        } else {
+          setCalibrationStep(1);
+        }
       } else if (phase === "practice-complete") {
         if (event.key === "Enter") {
           startMainTest();
@@ -524,28 +603,67 @@ const TestPage: FC = () => {
     isPractice,
     agentConnected,
     trials,
+    previousCalibration,
+    validationStep,
   ]);
 
+  useEffect(() => {
+    if (phase !== "calibration") return;
+    if (validationStep < 1 || validationStep > validationDots.length) return;
+    // Any failed check falls back to the full grid.
+    const fallBackToGrid = (reason: unknown) => {
+      console.log("Previous calibration not reused:", reason);
+      setPreviousCalibration(null);
+      setValidationStep(0);
+      setCalibrationStep(1);
+    };
+    const doCheck = async () => {
+      try {
+        const response = await validateCalibrationPoint(validationDots[validationStep - 1]);
+        if (!response?.valid) {
+          fallBackToGrid(response);
+          return;
+        }
+        if (validationStep < validationDots.length) {
+          setTimeout(() => setValidationStep(validationStep + 1), CONFIG.CALIBRATION_POINT_DURATION);
+          return;
+        }
+        await finishCalibration();
+        setValidationStep(0);
+        setCalibrationStep(9 as CalibrationStep);
+      } catch (error) {
+        fallBackToGrid(error);
+      }
+    };
+    doCheck();
+    return undefined;
+  }, [phase, validationStep]);
+
   useEffect(() => {
     if (phase !== "calibration") return;
     if (calibrationStep < 1 || calibrationStep > 8) return;
+    // Move to the next dot, or finish once all dots are done or the agent
+    // reports that the fit has converged.
+    const advanceCalibration = async (response: any) => {
+      if (calibrationStep < 8 && !response?.quality?.converged) {
+        setTimeout(
+          () => setCalibrationStep((calibrationStep + 1) as CalibrationStep),
+          CONFIG.CALIBRATION_POINT_DURATION
+        );
+        return;
+      }
+      await finishCalibration();
+      setTimeout(
+        () => setCalibrationStep(9 as CalibrationStep),
+        CONFIG.CALIBRATION_POINT_DURATION
+      );
+    };
     const doStep = async () => {
       try {
         const currentPoint = calibrationDots[calibrationStep - 1];
-        await recordCalibrationPoint(currentPoint);
+        const response = await recordCalibrationPoint(currentPoint);
         setCalibrationError(null);
-        if (calibrationStep < 8) {
-          setTimeout(
-            () => setCalibrationStep((calibrationStep + 1) as CalibrationStep),
-            CONFIG.CALIBRATION_POINT_DURATION
-          );
-        } else {
-          await finishCalibration();
-          setTimeout(
-            () => setCalibrationStep(9 as CalibrationStep),
-            CONFIG.CALIBRATION_POINT_DURATION
-          );
-        }
+        await advanceCalibration(response);
       } catch (error: any) {
         console.error("Calibration point error:", error);
         const errorMessage = error?.message || "Calibration point failed";
@@ -557,20 +675,9 @@ const TestPage: FC = () => {
           const doRetry = async () => {
             try {
               const currentPoint = calibrationDots[calibrationStep - 1];
-              await recordCalibrationPoint(currentPoint);
+              const response = await recordCalibrationPoint(currentPoint);
               setCalibrationError(null);
-              if (calibrationStep < 8) {
-                setTimeout(
-                  () => setCalibrationStep((calibrationStep + 1) as CalibrationStep),
-                  CONFIG.CALIBRATION_POINT_DURATION
-                );
-              } else {
-                await finishCalibration();
-                setTimeout(
-                  () => setCalibrationStep(9 as CalibrationStep),
-                  CONFIG.CALIBRATION_POINT_DURATION
-                );
-              }
+              await advanceCalibration(response);
             } catch (retryError) {
               setCalibrationError(
                 `Point ${calibrationStep} failed after retry. Please check your camera connection and try again.`
@@ -855,6 +962,15 @@ const TestPage: FC = () => {
     return (
       <div className={styles.container}>
         <div className={styles.calibrationGrid}>
+          {validationStep > 0 && validationStep <= validationDots.length && (
+            <div
+              className={styles.calibrationDot}
+              style={{
+                left: `${validationDots[validationStep - 1].x}%`,
+                top: `${validationDots[validationStep - 1].y}%`,
+              }}
+            />
+          )}
           {calibrationStep > 0 && calibrationStep <= 8 && (
             <div
               className={styles.calibrationDot}
@@ -866,7 +982,7 @@ const TestPage: FC = () => {
           )}
         </div>
 
-        {calibrationStep === 0 && (
+        {calibrationStep === 0 && validationStep === 0 && (
           <div className={styles.calibrationInstructions}>
             <h2>Calibration</h2>
             {isInitializingCamera ? (
@@ -877,6 +993,11 @@ const TestPage: FC = () => {
             ) : (
               <>
                 <p>We need to calibrate your gaze. Please follow the dots as they appear.</p>
+                {previousCalibration && (
+                  <p>
+                    Welcome back! We will first check your previous calibration with two dots.
+                  </p>
+                )}
                 <p>
                   Press <strong>[Space]</strong> or <strong>[Enter]</strong> to start.
                 </p>
@@ -928,6 +1049,14 @@ const TestPage: FC = () => {
           </div>
         )}
 
+        {validationStep > 0 && (
+          <div className={styles.calibrationProgress}>
+            <p>
+              Checking your previous calibration: dot {validationStep} of {validationDots.length}
+            </p>
+          </div>
+        )}
+
         <EscapeConfirmationModal
           show={showEscapeConfirmation}
           onCancel={handleEscapeCancel}
@@ -0,0 +1,40 @@
+/**
+ * Clock offset estimation against the backend (see app/acquisition/clock_sync.py)
+ *
+ * Task event responses carry the backend's receive and send times. Together
+ * with when the request left and the answer arrived they give an NTP-style
+ * offset; the sample with the smallest round trip among the recent ones is
+ * sent along with the next event.
+ */
+
+export interface ClockEstimate {
+  offset: number;
+  round_trip: number;
+  samples: number;
+}
+
+const CLOCK_FILTER_SIZE = 8;
+
+export class ClockFilter {
+  private samples: { offset: number; delay: number }[] = [];
+  private count = 0;
+
+  /** Add an exchange; responses without server times are ignored. */
+  addResponse(sent: number, answered: number, data: any): void {
+    const received = Number(data?.server_received);
+    const serverSent = Number(data?.server_sent);
+    if (!Number.isFinite(received) || !Number.isFinite(serverSent)) return;
+
+    const offset = (received - sent + (serverSent - answered)) / 2;
+    const delay = Math.max(0, answered - sent - (serverSent - received));
+    this.samples.push({ offset, delay });
+    if (this.samples.length > CLOCK_FILTER_SIZE) this.samples.shift();
+    this.count += 1;
+  }
+
+  estimate(): ClockEstimate | null {
+    if (this.samples.length === 0) return null;
+    const best = this.samples.reduce((a, b) => (b.delay < a.delay ? b : a));
+    return { offset: best.offset, round_trip: best.delay, samples: this.count };
+  }
+}
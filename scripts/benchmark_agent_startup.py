@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Measure the local agent's cold start.
+
+Phases, each timed from process launch:
+1. import   - importing agent.local_agent (fresh interpreter)
+2. bind     - port accepting connections
+3. register - first POST /agent/register seen by the backend
+4. model    - /status reports the FaceMesh model as "ready"
+5. frame    - first frame analysed by the adapter (separate process, uses
+              the webcam when available, otherwise a blank frame)
+
+The backend is replaced by a stub HTTP server so the numbers do not depend
+on network latency.
+
+Usage:
+    python scripts/benchmark_agent_startup.py [--runs 3] [--port 9100]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import agent.local_agent
+print(time.perf_counter() - start)
+"""
+
+FRAME_SNIPPET = """
+import time
+start = time.perf_counter()
+from agent.local_agent import ResourceManager
+resources = ResourceManager()
+adapter = resources.get_adapter()
+try:
+    camera = resources.acquire_camera()
+    frame = camera.get_frame()
+except Exception:
+    frame = None
+if frame is None:
+    import numpy as np
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+adapter.analyze_frame(frame)
+print(time.perf_counter() - start)
+resources.close_camera()
+"""
+
+
+class StubBackend(BaseHTTPRequestHandler):
+    """Answers the agent's register/heartbeat calls and records arrivals."""
+
+    registered_at = None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path == "/agent/register" and StubBackend.registered_at is None:
+            StubBackend.registered_at = time.perf_counter()
+        if self.path == "/agent/heartbeat":
+            # Behave like a backend without long-polling, without blocking.
+            body = {"status": "ok", "commands": []}
+        else:
+            body = {"status": "registered"}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_DELETE(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_snippet(name: str, snippet: str):
+    output = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    if output.returncode != 0:
+        error = (output.stderr.strip().splitlines() or ["unknown error"])[-1]
+        print(f"⚠️  {name} phase failed: {error}")
+        return None
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def port_open(port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.05)
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def model_state(port: int):
+    try:
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{port}/status", timeout=1
+        ) as response:
+            return json.load(response).get("model")
+    except OSError:
+        return None
+
+
+def measure_server(port: int, backend_port: int, timeout: float) -> dict:
+    StubBackend.registered_at = None
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "BACKEND_URL": f"http://127.0.0.1:{backend_port}",
+    }
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "agent.local_agent:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    timings = {}
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                print(f"⚠️  Agent exited early with code {proc.returncode}")
+                break
+            now = time.perf_counter()
+            if "bind" not in timings and port_open(port):
+                timings["bind"] = now - start
+            if "register" not in timings and StubBackend.registered_at:
+                timings["register"] = StubBackend.registered_at - start
+            if "bind" in timings and "model" not in timings:
+                state = model_state(port)
+                if state == "ready":
+                    timings["model"] = time.perf_counter() - start
+                elif state == "error":
+                    timings["model"] = None
+            if len(timings) == 3:
+                break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    backend = ThreadingHTTPServer(("127.0.0.1", 0), StubBackend)
+    threading.Thread(target=backend.serve_forever, daemon=True).start()
+    backend_port = backend.server_address[1]
+
+    results = {"import": [], "bind": [], "register": [], "model": [], "frame": []}
+    for run in range(1, args.runs + 1):
+        timings = {"import": run_snippet("import", IMPORT_SNIPPET)}
+        timings.update(measure_server(args.port, backend_port, args.timeout))
+        timings["frame"] = run_snippet("frame", FRAME_SNIPPET)
+        for phase, value in timings.items():
+            if value is not None:
+                results[phase].append(value)
+        print(f"run {run}/{args.runs} done")
+
+    backend.shutdown()
+
+    print(f"\n{'phase':<10} {'median':>8} {'min':>8} {'max':>8}  (seconds)")
+    for phase, values in results.items():
+        if not values:
+            print(f"{phase:<10} {'n/a':>8}")
+            continue
+        print(
+            f"{phase:<10} {statistics.median(values):>8.3f} "
+            f"{min(values):>8.3f} {max(values):>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
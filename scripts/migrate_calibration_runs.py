@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Add calibration run ids for idempotent batch uploads.
+
+The agent now uploads all points of a calibration run together with the
+fitted transform in one request (POST /session/{uid}/calibration/batch),
+identified by a run_id so that retried uploads are stored only once.
+Existing rows keep NULL.
+
+Usage:
+    docker-compose exec backend python scripts/migrate_calibration_runs.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db import models
+from app.db.database import engine
+
+
+def migrate_calibration_runs():
+    """Add run_id to calibration_points and session_calibrations."""
+    print("=" * 60)
+    print("Calibration Run Migration")
+    print("=" * 60)
+
+    try:
+        print("\nStep 1: Creating session_calibrations table...")
+        models.SessionCalibration.__table__.create(bind=engine, checkfirst=True)
+        print("  ✓ Table ready")
+
+        with engine.connect() as conn:
+            print("\nStep 2: Adding run_id columns...")
+            conn.execute(
+                text(
+                    "ALTER TABLE calibration_points "
+                    "ADD COLUMN IF NOT EXISTS run_id VARCHAR"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_calibration_points_run_id "
+                    "ON calibration_points (run_id)"
+                )
+            )
+            conn.execute(
+                text(
+                    "ALTER TABLE session_calibrations "
+                    "ADD COLUMN IF NOT EXISTS run_id VARCHAR"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS uq_session_calibrations_run "
+                    "ON session_calibrations (session_id, run_id)"
+                )
+            )
+            conn.commit()
+            print("  ✓ Columns and indexes added")
+
+        print("\n" + "=" * 60)
+        print("✓ Migration completed successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_calibration_runs())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Add dispersion and samples columns to calibration_points.
+
+The agent now rejects blink frames and outliers when sampling a calibration
+target and reports how steady the kept eye centres were (dispersion, in
+pixels) and how many were kept. Points from older agents keep NULL.
+
+Usage:
+    docker-compose exec backend python scripts/migrate_calibration_sampling.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db.database import engine
+
+
+def migrate_calibration_sampling():
+    """Add the sampling quality columns to calibration_points."""
+    print("=" * 60)
+    print("Calibration Sampling Migration")
+    print("=" * 60)
+
+    try:
+        with engine.connect() as conn:
+            print("\nStep 1: Adding dispersion and samples columns...")
+            conn.execute(
+                text(
+                    "ALTER TABLE calibration_points "
+                    "ADD COLUMN IF NOT EXISTS dispersion FLOAT"
+                )
+            )
+            conn.execute(
+                text(
+                    "ALTER TABLE calibration_points "
+                    "ADD COLUMN IF NOT EXISTS samples INTEGER"
+                )
+            )
+            conn.commit()
+            print("  ✓ Columns added")
+
+        print("\n" + "=" * 60)
+        print("✓ Migration completed successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_calibration_sampling())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Add the credential hash used by /users/results/by-credentials and backfill it.
+
+The endpoint used to decrypt the name and birthdate of every user until one
+matched. Users now carry a keyed hash of (normalised name, birthdate) in an
+indexed column, set whenever either value is set, so the lookup is one
+indexed query plus one decryption to confirm. This script adds the column
+and computes it for existing users, in batches. Pass --all to recompute
+every user, e.g. after changing BLIND_INDEX_KEY or ENCRYPTION_KEY.
+
+Usage:
+    docker-compose exec backend python scripts/migrate_credential_hash.py [--all]
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.db import models
+from app.db.database import engine
+from app.utils.encryption import credential_hash
+
+BATCH_SIZE = 500
+
+
+def migrate_credential_hash(rebuild: bool = False):
+    """Add credential_hash to users and fill it in."""
+    print("=" * 60)
+    print("User Credential Hash Migration")
+    print("=" * 60)
+
+    try:
+        with engine.connect() as conn:
+            print("\nStep 1: Adding credential_hash column...")
+            conn.execute(
+                text(
+                    "ALTER TABLE users ADD COLUMN IF NOT EXISTS credential_hash VARCHAR"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_users_credential_hash "
+                    "ON users (credential_hash)"
+                )
+            )
+            conn.commit()
+            print("  ✓ Column and index added")
+
+        print("\nStep 2: Backfilling users...")
+        db = sessionmaker(bind=engine)()
+        updated = skipped = 0
+        last_id = 0
+        try:
+            while True:
+                query = db.query(models.User).filter(models.User.id > last_id)
+                if not rebuild:
+                    query = query.filter(models.User.credential_hash.is_(None))
+                users = query.order_by(models.User.id).limit(BATCH_SIZE).all()
+                if not users:
+                    break
+                for user in users:
+                    key = credential_hash(user.name, user.birthdate)
+                    if key is None:
+                        skipped += 1
+                        continue
+                    user.credential_hash = key
+                    updated += 1
+                last_id = users[-1].id
+                db.commit()
+                print(f"  … {updated} users hashed")
+        finally:
+            db.close()
+        print(f"  ✓ Hashed {updated} users")
+        if skipped:
+            print(f"  ⊙ Skipped {skipped} users without name or birthdate")
+
+        print("\n" + "=" * 60)
+        print("✓ Migration completed successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_credential_hash(rebuild="--all" in sys.argv[1:]))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Migrate the session_features table to versioned feature rows.
+
+This script:
+1. Adds the feature_version, feature_config and computed_at columns
+2. Adds the pupillometry feature columns
+3. Replaces the unique constraint on session_id with one on
+   (session_id, feature_version)
+
+Existing rows are assigned feature version "1", which matches the thresholds
+they were computed with.
+
+Usage:
+    docker-compose exec backend python scripts/migrate_feature_versions.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db.database import engine
+
+PUPIL_COLUMNS = {
+    "pupil_mean_size": "DOUBLE PRECISION",
+    "pupil_go_peak_dilation": "DOUBLE PRECISION",
+    "pupil_go_peak_latency": "DOUBLE PRECISION",
+    "pupil_go_auc": "DOUBLE PRECISION",
+    "pupil_go_epochs": "INTEGER",
+    "pupil_nogo_peak_dilation": "DOUBLE PRECISION",
+    "pupil_nogo_peak_latency": "DOUBLE PRECISION",
+    "pupil_nogo_auc": "DOUBLE PRECISION",
+    "pupil_nogo_epochs": "INTEGER",
+}
+
+
+def migrate_feature_versions():
+    """Add versioning columns and constraints to session_features."""
+    print("=" * 60)
+    print("Session Features Versioning Migration")
+    print("=" * 60)
+
+    try:
+        with engine.connect() as conn:
+            print("\nStep 1: Adding versioning columns...")
+            conn.execute(
+                text(
+                    "ALTER TABLE session_features "
+                    "ADD COLUMN IF NOT EXISTS feature_version VARCHAR NOT NULL DEFAULT '1'"
+                )
+            )
+            conn.execute(
+                text(
+                    "ALTER TABLE session_features "
+                    "ADD COLUMN IF NOT EXISTS feature_config VARCHAR"
+                )
+            )
+            conn.execute(
+                text(
+                    "ALTER TABLE session_features "
+                    "ADD COLUMN IF NOT EXISTS computed_at TIMESTAMP DEFAULT now()"
+                )
+            )
+            conn.commit()
+            print("  ✓ Columns added")
+
+            print("\nStep 2: Adding pupillometry columns...")
+            for column, column_type in PUPIL_COLUMNS.items():
+                conn.execute(
+                    text(
+                        f"ALTER TABLE session_features "
+                        f"ADD COLUMN IF NOT EXISTS {column} {column_type}"
+                    )
+                )
+            conn.commit()
+            print("  ✓ Columns added")
+
+            print("\nStep 3: Replacing unique constraint on session_id...")
+            conn.execute(
+                text(
+                    "ALTER TABLE session_features "
+                    "DROP CONSTRAINT IF EXISTS session_features_session_id_key"
+                )
+            )
+            result = conn.execute(
+                text("""
+                SELECT 1 FROM pg_constraint
+                WHERE conname = 'uq_session_features_version'
+            """)
+            )
+            if result.first() is None:
+                conn.execute(
+                    text(
+                        "ALTER TABLE session_features "
+                        "ADD CONSTRAINT uq_session_features_version "
+                        "UNIQUE (session_id, feature_version)"
+                    )
+                )
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_session_features_session_id "
+                    "ON session_features (session_id)"
+                )
+            )
+            conn.commit()
+            print("  ✓ Constraint updated")
+
+        print("\n" + "=" * 60)
+        print("✓ Migration completed successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_feature_versions())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Add the blind index for user name search and backfill it.
+
+Users carry a keyed hash of their normalised name (name_index) and, when
+NAME_NGRAM_SEARCH is on, of its n-grams (name_tokens, GIN indexed), which
+GET /users/search then looks up instead of decrypting every name. This script
+adds the columns and computes them for existing users, in batches. Pass
+--all to recompute every user, e.g. after changing BLIND_INDEX_KEY or
+ENCRYPTION_KEY, or after turning NAME_NGRAM_SEARCH on or off.
+
+Usage:
+    docker-compose exec backend python scripts/migrate_name_blind_index.py [--all]
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app.db import models
+from app.db.database import engine
+from app.utils.encryption import name_search_fields
+
+BATCH_SIZE = 500
+
+
+def migrate_name_blind_index(rebuild: bool = False):
+    """Add name_index/name_tokens to users and fill them in."""
+    print("=" * 60)
+    print("User Name Blind Index Migration")
+    print("=" * 60)
+
+    try:
+        with engine.connect() as conn:
+            print("\nStep 1: Adding blind index columns...")
+            conn.execute(
+                text("ALTER TABLE users ADD COLUMN IF NOT EXISTS name_index VARCHAR")
+            )
+            conn.execute(
+                text("ALTER TABLE users ADD COLUMN IF NOT EXISTS name_tokens VARCHAR[]")
+            )
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_users_name_index "
+                    "ON users (name_index)"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE INDEX IF NOT EXISTS ix_users_name_tokens "
+                    "ON users USING gin (name_tokens)"
+                )
+            )
+            conn.commit()
+            print("  ✓ Columns and indexes added")
+
+        print("\nStep 2: Backfilling users...")
+        db = sessionmaker(bind=engine)()
+        updated = 0
+        last_id = 0
+        try:
+            while True:
+                query = db.query(models.User).filter(models.User.id > last_id)
+                if not rebuild:
+                    query = query.filter(models.User.name_index.is_(None))
+                users = query.order_by(models.User.id).limit(BATCH_SIZE).all()
+                if not users:
+                    break
+                for user in users:
+                    name = user.name
+                    if name:
+                        for column, value in name_search_fields(name).items():
+                            setattr(user, column, value)
+                        updated += 1
+                last_id = users[-1].id
+                db.commit()
+                print(f"  … {updated} users indexed")
+        finally:
+            db.close()
+        print(f"  ✓ Indexed {updated} users")
+
+        print("\n" + "=" * 60)
+        print("✓ Migration completed successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_name_blind_index(rebuild="--all" in sys.argv[1:]))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Add acquisition sampling metadata.
+
+This script:
+1. Creates the acquisition_batch_stats table (frame pacing reported by the
+   agent with each batch)
+2. Adds the sampling_rate, sampling_jitter_ms and dropped_frames columns to
+   session_features
+
+Existing feature rows keep NULL sampling values until they are recomputed.
+
+Usage:
+    docker-compose exec backend python scripts/migrate_sampling_metadata.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db import models
+from app.db.database import engine
+
+SAMPLING_COLUMNS = {
+    "sampling_rate": "DOUBLE PRECISION",
+    "sampling_jitter_ms": "DOUBLE PRECISION",
+    "dropped_frames": "INTEGER",
+}
+
+
+def migrate_sampling_metadata():
+    """Create the batch stats table and add sampling columns to features."""
+    print("=" * 60)
+    print("Acquisition Sampling Metadata Migration")
+    print("=" * 60)
+
+    try:
+        print("\nStep 1: Creating acquisition_batch_stats table...")
+        models.AcquisitionBatchStats.__table__.create(bind=engine, checkfirst=True)
+        print("  ✓ Table ready")
+
+        with engine.connect() as conn:
+            print("\nStep 2: Adding sampling columns to session_features...")
+            for column, column_type in SAMPLING_COLUMNS.items():
+                conn.execute(
+                    text(
+                        f"ALTER TABLE session_features "
+                        f"ADD COLUMN IF NOT EXISTS {column} {column_type}"
+                    )
+                )
+            conn.commit()
+            print("  ✓ Columns added")
+
+        print("\n" + "=" * 60)
+        print("✓ Migration completed successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_sampling_metadata())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Add the gaze_space column to session_features.
+
+Feature version 3 computes fixation and saccade features from the agent's
+calibrated, screen-normalised gaze when a session has it. gaze_space records
+which coordinates ("screen" or "camera") a feature row was computed from.
+Existing rows keep NULL, which means camera space.
+
+Usage:
+    docker-compose exec backend python scripts/migrate_screen_gaze.py
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+from app.db.database import engine
+
+
+def migrate_screen_gaze():
+    """Add the gaze_space column to session_features."""
+    print("=" * 60)
+    print("Screen-Space Gaze Migration")
+    print("=" * 60)
+
+    try:
+        with engine.connect() as conn:
+            print("\nStep 1: Adding gaze_space column...")
+            conn.execute(
+                text(
+                    "ALTER TABLE session_features "
+                    "ADD COLUMN IF NOT EXISTS gaze_space VARCHAR"
+                )
+            )
+            conn.commit()
+            print("  ✓ Column added")
+
+        print("\n" + "=" * 60)
+        print("✓ Migration completed successfully!")
+        print("=" * 60)
+        return 0
+
+    except Exception as e:
+        print(f"\n✗ Error: {e}")
+        import traceback
+
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(migrate_screen_gaze())